@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-17 14:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrator', '0001_initial'),
+        ('school', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='academicyear',
+            index=models.Index(fields=['-start_year', '-id'], name='academic_year_start_idx'),
+        ),
+    ]
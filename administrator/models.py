@@ -13,6 +13,9 @@ class AcademicYear(models.Model):
 
     class Meta:
         ordering = ['-start_year']  # Latest academic year first
+        indexes = [
+            models.Index(fields=['-start_year', '-id'], name='academic_year_start_idx'),
+        ]
 
     def __str__(self):
         return f"{self.start_year}/{self.end_year}"
@@ -3,13 +3,16 @@ from rest_framework.response import Response
 from rest_framework import generics, permissions, status
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
 import logging
 
 from .models import AcademicYear
+from edu_performance_monitoring_app.pagination import KeysetPagination
 from student_performance.models import TeacherLevelClass, TeacherAssignmentHistory, Subject, Class, Student, StudentParentRelation, ClassEnrollment
 from student_performance.serializers import TeacherLevelClassSerializer
 from user_auth.models import User
 from user_auth.serializers import UserSerializer
+from user_auth.utils import serializable_users
 from .serializers import AssignSubjectsToTeachersSerializer, AcademicYearSerializer
 from user_auth.permissions import IsAdmin, IsTeacherOrAdmin, IsTeacherOrAdminInSchoolOrCampus, IsRegisteredInSchoolOrCampus
 
@@ -137,6 +140,11 @@ class UpdateTeacherSubjectsView(APIView):
             )
         
 
+class AcademicYearPagination(KeysetPagination):
+    """Academic years page latest year first, like AcademicYear.Meta.ordering."""
+    ordering = ('-start_year', '-id')
+
+
 # Create and List Academic Years
 class AcademicYearListCreateView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -154,9 +162,10 @@ class AcademicYearListCreateView(APIView):
         return super().get_permissions()
 
     def get(self, request):
-        academic_years = AcademicYear.objects.all()
+        paginator = AcademicYearPagination()
+        academic_years = paginator.paginate_queryset(AcademicYear.objects.all(), request, view=self)
         serializer = AcademicYearSerializer(academic_years, many=True)
-        return Response(serializer.data)
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request):
         # Check if the request contains a list (bulk create) or a single object
@@ -366,42 +375,49 @@ class ParentsByClassView(APIView):
     
 class ParentsView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsTeacherOrAdmin | IsAdmin]
+
     def get(self, request):
-        # Fetch all users with the 'Parent' role
-        parents = User.objects.filter(roles__name='Parent')
+        """
+        Parents of the caller's school and campus with their children, one cursor page at a time
+        (`?cursor=`, `?page_size=`). Each page takes two queries: the parents and their children.
+        """
+        user = request.user
+        parents = User.objects.filter(
+            roles__name='Parent', school_id=user.school_id, campus_id=user.campus_id
+        ).prefetch_related(
+            Prefetch(
+                'children_relations',
+                queryset=StudentParentRelation.objects.select_related('student').order_by('created_at', 'id'),
+            )
+        )
 
-        print()
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(parents, request, view=self)
 
-        if not parents.exists():
+        if not page and not request.query_params.get(paginator.cursor_query_param):
             return Response({"message": "No parents found."}, status=status.HTTP_404_NOT_FOUND)
 
         # Structure the response data
         data = []
-        for parent in parents:
-            parent_info = {
+        for parent in page:
+            data.append({
                 "id": parent.id,
                 "name": parent.username,
                 "profile_pic": parent.profile_picture.url if parent.profile_picture else None,
                 "email": parent.email,
                 "phone": parent.phone,
                 "is_active": parent.is_active,
-                "children": []
-            }
-
-            # Fetch children associated with this parent
-            relations = StudentParentRelation.objects.filter(parent=parent).select_related('student')
-            for relation in relations:
-                student = relation.student
-                student_info = {
-                    "student_id": student.id,
-                    "student_name": student.username,
-                    "profile_pic": student.profile_picture.url if student.profile_picture else None,
-                }
-                parent_info["children"].append(student_info)
-
-            data.append(parent_info)
-
-        return Response(data, status=status.HTTP_200_OK)
+                "children": [
+                    {
+                        "student_id": relation.student.id,
+                        "student_name": relation.student.username,
+                        "profile_pic": relation.student.profile_picture.url if relation.student.profile_picture else None,
+                    }
+                    for relation in parent.children_relations.all()
+                ],
+            })
+
+        return paginator.get_paginated_response(data)
 
 # 
 class TeacherListView(generics.ListAPIView):
@@ -410,9 +426,10 @@ class TeacherListView(generics.ListAPIView):
     """
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        return User.objects.filter(roles__name="Teacher")
+        return serializable_users(User.objects.filter(roles__name="Teacher"))
 
 
 class StudentListView(generics.ListAPIView):
@@ -421,9 +438,10 @@ class StudentListView(generics.ListAPIView):
     """
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        return User.objects.filter(roles__name="Student")
+        return serializable_users(User.objects.filter(roles__name="Student"))
 
 
 # Update User Details
@@ -13,5 +13,10 @@ class Announcement(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='announcement_created_idx'),
+        ]
+
     def __str__(self):
         return self.title
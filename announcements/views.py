@@ -3,6 +3,7 @@ from rest_framework.response import Response
 from rest_framework import status, permissions
 
 from .models import Announcement
+from edu_performance_monitoring_app.pagination import KeysetPagination
 from .serializers import AnnouncementSerializer
 from user_auth.permissions import IsAdmin, IsTeacherOrAdmin
 
@@ -28,7 +29,7 @@ class AnnouncementAPIView(APIView):
         """
         Retrieve one or all announcements.
         If `announcement_id` is provided, fetch a single announcement.
-        Otherwise, fetch all announcements.
+        Otherwise, fetch all announcements, newest first, one cursor page at a time.
         """
         if announcement_id:
             try:
@@ -38,9 +39,10 @@ class AnnouncementAPIView(APIView):
             except Announcement.DoesNotExist:
                 return Response({'error': 'Announcement not found'}, status=status.HTTP_404_NOT_FOUND)
         else:
-            announcements = Announcement.objects.all().order_by('-created_at')
+            paginator = KeysetPagination()
+            announcements = paginator.paginate_queryset(Announcement.objects.all(), request, view=self)
             serializer = AnnouncementSerializer(announcements, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return paginator.get_paginated_response(serializer.data)
 
     def post(self, request):
         """
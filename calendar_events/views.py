@@ -6,6 +6,7 @@ from rest_framework.permissions import IsAuthenticated
 
 from .models import CalendarEvent
 from .serializers import CalendarEventSerializer
+from edu_performance_monitoring_app.pagination import KeysetPagination
 from user_auth.permissions import IsParent, IsHeadmaster, IsTeacher
 
 class CalendarEventListCreateView(generics.ListCreateAPIView):
@@ -14,6 +15,7 @@ class CalendarEventListCreateView(generics.ListCreateAPIView):
     """
     serializer_class = CalendarEventSerializer
     permission_classes = [IsAuthenticated, IsHeadmaster | IsTeacher | IsParent]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         """
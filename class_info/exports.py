@@ -0,0 +1,198 @@
+import csv
+import datetime
+import re
+import zipfile
+from decimal import Decimal
+from itertools import chain
+from xml.sax.saxutils import escape
+
+from student_performance.models import Assessment
+
+EXPORT_CHUNK_SIZE = 2000
+
+CLASS_EXPORT_COLUMNS = [
+    ('Student', 'student__username'),
+    ('Subject', 'subject__name'),
+    ('Assessment', 'assessment_name__name'),
+    ('Term', 'term__name'),
+    ('Topic', 'topic'),
+    ('Obtained Marks', 'obtained_marks'),
+    ('Total Marks', 'total_marks'),
+    ('Date', 'date'),
+]
+
+
+def class_export_rows(class_id):
+    """Assessment rows of a class as tuples, streamed from a server-side cursor in chunks."""
+    return (
+        Assessment.objects.filter(class_id=class_id)
+        .order_by('student__username', 'subject__name', 'date', 'id')
+        .values_list(*[field for _, field in CLASS_EXPORT_COLUMNS])
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+class _Echo:
+    """Pseudo-buffer whose write() returns the value, so csv.writer produces lines for a generator."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(header, rows):
+    writer = csv.writer(_Echo())
+    for row in chain([header], rows):
+        yield writer.writerow(row)
+
+
+class _ZipSink:
+    """
+    Write-only, non-seekable file object for zipfile. zipfile then writes data descriptors
+    instead of seeking back, and whatever it wrote so far can be drained to the client.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="{sheet_name}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '<Relationship Id="rId2" Target="styles.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"/>'
+        '</Relationships>'
+    ),
+    # Cell formats: 0 general, 1 date (built-in number format 14), 2 date and time (22)
+    'xl/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="3">'
+        '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="22" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '</cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    ),
+}
+
+# Characters XML 1.0 does not allow, even escaped
+_ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+# Longest text Excel keeps in a cell; longer cells are truncated
+XLSX_MAX_CELL_LENGTH = 32767
+# Day 0 of Excel's (1900) date system, as serial numbers count it
+_EXCEL_EPOCH = datetime.datetime(1899, 12, 30)
+_DATE_STYLE, _DATETIME_STYLE = 1, 2
+
+
+def _excel_serial(value):
+    if isinstance(value, datetime.datetime):
+        delta = value.replace(tzinfo=None) - _EXCEL_EPOCH
+        return delta.days + delta.seconds / 86400
+    return (value - _EXCEL_EPOCH.date()).days
+
+
+def _column_letter(index):
+    letters = ''
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xlsx_row(row_number, values):
+    cells = []
+    for column, value in enumerate(values, start=1):
+        if value is None:
+            continue
+        ref = f'{_column_letter(column)}{row_number}'
+        if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+            cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+        elif isinstance(value, datetime.date):
+            style = _DATETIME_STYLE if isinstance(value, datetime.datetime) else _DATE_STYLE
+            cells.append(f'<c r="{ref}" s="{style}"><v>{_excel_serial(value)}</v></c>')
+        else:
+            text = escape(_ILLEGAL_XML_CHARS.sub('', str(value))[:XLSX_MAX_CELL_LENGTH])
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row r="{row_number}">{"".join(cells)}</row>'
+
+
+def stream_xlsx(header, rows, sheet_name='Sheet1', flush_every=500):
+    """
+    Yield an .xlsx workbook with a single sheet, piece by piece.
+
+    Cells are written as inline strings, plain numbers and dates (serial numbers with a
+    date format), so no shared-strings table has to be held in memory, and the zip is built on a non-seekable sink: memory stays flat
+    however many rows there are and nothing is written to disk.
+
+    openpyxl (used for reading uploads) is deliberately not used here: its write-only
+    workbook spools the sheet to a temporary file and only zips it in save(), so the
+    response could not start before the last row was written.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_PARTS.items():
+            archive.writestr(name, content.format(sheet_name=escape(sheet_name, {'"': '&quot;'})))
+        yield sink.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            for row_number, values in enumerate(chain([header], rows), start=1):
+                sheet.write(_xlsx_row(row_number, values).encode())
+                if row_number % flush_every == 0:
+                    yield sink.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.drain()
@@ -0,0 +1,121 @@
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from class_info.exports import CLASS_EXPORT_COLUMNS, class_export_rows, stream_csv, stream_xlsx
+from student_performance.models import Assessment
+
+MODES = ['pandas', 'openpyxl', 'csv', 'xlsx']
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+def peak_rss_kb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare peak RSS, duration and time to the first byte of exporting one class: the previous pandas "
+        "export (DataFrame, temporary .xlsx file read back into memory), an openpyxl write-only workbook "
+        "saved to a temporary file and sent from there, and the streaming CSV and XLSX exporters. "
+        "Each mode runs in a fresh interpreter, since a process's peak RSS never goes down."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--class-id', help='Class to export (defaults to the class with the most assessments).')
+        parser.add_argument('--mode', choices=MODES, help='Run a single mode in this process and print its result as JSON.')
+
+    def handle(self, *args, **options):
+        class_id = options['class_id'] or self.largest_class()
+
+        if options['mode']:
+            self.stdout.write(json.dumps(self.run_mode(options['mode'], class_id)))
+            return
+
+        self.stdout.write(f"Class {class_id}: {Assessment.objects.filter(class_id=class_id).count()} assessment(s)")
+        self.stdout.write(f"{'mode':<10}{'peak RSS +MB':>14}{'seconds':>10}{'first byte s':>14}{'output MB':>11}")
+        for mode in MODES:
+            completed = subprocess.run(
+                [sys.executable, '-m', 'django', 'benchmark_class_export', '--mode', mode, '--class-id', str(class_id)],
+                capture_output=True, text=True, env=os.environ,
+            )
+            if completed.returncode:
+                raise CommandError(f"{mode} run failed:\n{completed.stderr}")
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            self.stdout.write(
+                f"{mode:<10}{result['rss_growth_kb'] / 1024:>14.1f}{result['seconds']:>10.2f}"
+                f"{result['first_byte_seconds']:>14.2f}{result['bytes'] / 1024 / 1024:>11.2f}"
+            )
+
+    def largest_class(self):
+        row = (
+            Assessment.objects.filter(class_id__isnull=False).values('class_id')
+            .annotate(count=Count('id')).order_by('-count').first()
+        )
+        if not row:
+            raise CommandError("No assessments found; generate data first with the generate_synthetic_data command.")
+        return row['class_id']
+
+    def run_mode(self, mode, class_id):
+        """Consume the mode's output chunks as a response would, noting when the first one is ready."""
+        baseline = peak_rss_kb()
+        started = time.perf_counter()
+        written, first_byte = 0, None
+        for chunk in getattr(self, f"export_{mode}")(class_id):
+            if first_byte is None and chunk:
+                first_byte = time.perf_counter() - started
+            written += len(chunk)
+        return {
+            'mode': mode,
+            'rss_growth_kb': peak_rss_kb() - baseline,
+            'seconds': time.perf_counter() - started,
+            'first_byte_seconds': first_byte or 0,
+            'bytes': written,
+        }
+
+    def export_pandas(self, class_id):
+        # What export_class_data used to do: whole DataFrame, temp file in the cwd, read back
+        import pandas as pd
+
+        rows = Assessment.objects.filter(class_id=class_id).values(*[field for _, field in CLASS_EXPORT_COLUMNS])
+        file_path = f"{uuid.uuid4()}.xlsx"
+        try:
+            pd.DataFrame(rows).to_excel(file_path, index=False)
+            with open(file_path, 'rb') as f:
+                yield f.read()
+        finally:
+            os.remove(file_path)
+
+    def export_openpyxl(self, class_id):
+        # Write-only keeps rows out of memory, but the sheet is spooled to disk and the zip is
+        # only built by save(), so nothing can be sent before the last row is written
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append([title for title, _ in CLASS_EXPORT_COLUMNS])
+        for row in class_export_rows(class_id):
+            sheet.append(row)
+        with tempfile.TemporaryFile() as f:
+            workbook.save(f)
+            f.seek(0)
+            while chunk := f.read(FILE_CHUNK_SIZE):
+                yield chunk
+
+    def export_csv(self, class_id):
+        header = [title for title, _ in CLASS_EXPORT_COLUMNS]
+        return (line.encode() for line in stream_csv(header, class_export_rows(class_id)))
+
+    def export_xlsx(self, class_id):
+        header = [title for title, _ in CLASS_EXPORT_COLUMNS]
+        return stream_xlsx(header, class_export_rows(class_id))
@@ -1,3 +1,48 @@
-from django.test import TestCase
+import datetime
+import io
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import SimpleTestCase
+from openpyxl import load_workbook
+
+from .exports import XLSX_MAX_CELL_LENGTH, stream_csv, stream_xlsx
+
+
+class StreamXlsxTests(SimpleTestCase):
+    def read(self, header, rows, **kwargs):
+        workbook = load_workbook(io.BytesIO(b''.join(stream_xlsx(header, rows, **kwargs))))
+        return [list(row) for row in workbook.active.iter_rows(values_only=True)]
+
+    def test_cell_values_and_types_survive_a_round_trip(self):
+        header = ['Text', 'Control', 'Empty', 'Marks', 'Count', 'Date', 'Recorded']
+        row = [
+            '<b>Tom & "Jerry"</b>', 'tab\tbell\x07end', None, Decimal('12.50'), 7,
+            datetime.date(2025, 3, 14), datetime.datetime(2025, 3, 14, 9, 30),
+        ]
+
+        read_header, read_row = self.read(header, [row])
+
+        self.assertEqual(read_header, header)
+        self.assertEqual(read_row, [
+            '<b>Tom & "Jerry"</b>', 'tab\tbellend', None, 12.5, 7,
+            datetime.datetime(2025, 3, 14), datetime.datetime(2025, 3, 14, 9, 30),
+        ])
+
+    def test_long_text_is_truncated_to_the_excel_limit(self):
+        _, (cell,) = self.read(['Comments'], [['x' * (XLSX_MAX_CELL_LENGTH + 10)]])
+
+        self.assertEqual(len(cell), XLSX_MAX_CELL_LENGTH)
+
+    def test_rows_are_streamed_in_chunks(self):
+        rows = [[f"student{index}", index] for index in range(1200)]
+
+        chunks = list(stream_xlsx(['Student', 'Marks'], rows, flush_every=500))
+        read = self.read(['Student', 'Marks'], rows)
+
+        self.assertGreater(len(chunks), 3)
+        self.assertEqual(read[1:], rows)
+
+    def test_csv_has_one_line_per_row(self):
+        lines = list(stream_csv(['Student', 'Marks'], [['ama', Decimal('9.5')], ['kofi', None]]))
+
+        self.assertEqual(lines, ['Student,Marks\r\n', 'ama,9.5\r\n', 'kofi,\r\n'])
@@ -3,6 +3,6 @@ from . import views
 
 urlpatterns = [
     path('get-class-info/<int:class_id>/', views.get_class_info, name='get-class-info'),
-    path('get-class-performance/<int:class_id>/', views.get_class_performance, name='get-class-performance'),
-    path('download-class-performance/<int:class_id>/', views.export_class_data, name='download-class-performance'),
+    path('get-class-performance/<uuid:class_id>/', views.get_class_performance, name='get-class-performance'),
+    path('download-class-performance/<uuid:class_id>/', views.export_class_data, name='download-class-performance'),
 ]
\ No newline at end of file
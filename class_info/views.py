@@ -1,17 +1,18 @@
-import pandas as pd
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from django.db.models import Avg, Count, Q
-from io import BytesIO
-import uuid
-import os
-import mimetypes
-from django.http import FileResponse
-from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Avg, Sum, DecimalField, ExpressionWrapper
+from django.db.models.functions import NullIf
+from django.http import StreamingHttpResponse
 
-from user_auth.permissions import IsHeadmaster, IsTeacher
-from student_performance.models import ClassEnrollment, Assessment, TeacherLevelClass
+from user_auth.permissions import IsHeadmaster, IsTeacher, IsRegisteredInSchoolOrCampus
+from student_performance.models import Class, ClassEnrollment, Assessment, TeacherLevelClass, ClassPerformanceSummary
+from .exports import CLASS_EXPORT_COLUMNS, class_export_rows, stream_csv, stream_xlsx
+
+EXPORT_FORMATS = {
+    'xlsx': (stream_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'csv': (stream_csv, 'text/csv'),
+}
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated, IsTeacher | IsHeadmaster])
@@ -40,23 +41,27 @@ def get_class_info(request, class_id):
 @api_view(['GET'])
 def get_class_performance(request, class_id):
     try:
-        # Get class assessments
-        assessments = Assessment.objects.filter(class_id=class_id)
-        
+        # Subject averages and grade bands come from the pre-aggregated class summaries
+        summaries = ClassPerformanceSummary.objects.filter(class_id=class_id)
+
         # Average performance across subjects
-        avg_performance = assessments.values('subject__name').annotate(avg_score=Avg('obtained_marks'))
-        
+        avg_performance = summaries.values('subject__name').annotate(
+            avg_score=ExpressionWrapper(
+                Sum('obtained_sum') / NullIf(Sum('marked_count'), 0), output_field=DecimalField(max_digits=14, decimal_places=2)
+            )
+        ).order_by('subject__name')
+
         # Top performers (students with average score > 85)
-        top_performers = assessments.values('student_id', 'student_id__name').annotate(avg_score=Avg('obtained_marks')).filter(avg_score__gt=85).order_by('-avg_score')
-        
+        top_performers = Assessment.objects.filter(class_id=class_id).values('student_id', 'student__username').annotate(avg_score=Avg('obtained_marks')).filter(avg_score__gt=85).order_by('-avg_score')
+
         # Grade distribution
-        grade_distribution = assessments.values('subject__name').annotate(
-            A_grade=Count('obtained_marks', filter=Q(obtained_marks__gte=80)),
-            B_grade=Count('obtained_marks', filter=Q(obtained_marks__gte=70, obtained_marks__lt=80)),
-            C_grade=Count('obtained_marks', filter=Q(obtained_marks__gte=60, obtained_marks__lt=70)),
-            D_grade=Count('obtained_marks', filter=Q(obtained_marks__gte=50, obtained_marks__lt=60)),
-            F_grade=Count('obtained_marks', filter=Q(obtained_marks__lt=50)),
-        )
+        grade_distribution = summaries.values('subject__name').annotate(
+            A_grade=Sum('grade_a'),
+            B_grade=Sum('grade_b'),
+            C_grade=Sum('grade_c'),
+            D_grade=Sum('grade_d'),
+            F_grade=Sum('grade_f'),
+        ).order_by('subject__name')
         
         return Response({
             'average_performance': avg_performance,
@@ -67,54 +72,28 @@ def get_class_performance(request, class_id):
         return Response({"error": "Data not found"}, status=404)
 
 @api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, IsRegisteredInSchoolOrCampus])
 def export_class_data(request, class_id):
-    try:
-        # Fetching the data to export
-        assessments = Assessment.objects.filter(class_id=class_id).values(
-            'student_id__name', 'subject__name', 'assessment_type', 'obtained_marks', 'total_marks'
-        )
-        df = pd.DataFrame(assessments) 
-        
-        # Convert to Excel
-        file_path = f'class_{class_id}_performance.xlsx'
-        df.to_excel(file_path, index=False)
-        
-        with open(file_path, 'rb') as f:
-            response = Response(f.read(), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-            response['Content-Disposition'] = f'attachment; filename={file_path}'
-            return response
-    except Exception as e:
-        return Response({"error": str(e)}, status=500)
+    """
+    Download the assessments of a class as .xlsx (default) or CSV (?file_format=csv).
+    Rows are streamed from the database to the client in chunks, so memory use doesn't
+    grow with the size of the class and no file is written to disk.
+    """
+    file_format = request.query_params.get('file_format', 'xlsx').lower()
+    if file_format not in EXPORT_FORMATS:
+        return Response({"error": f"file_format must be one of {', '.join(EXPORT_FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
 
-@api_view(['GET'])
-def export_class_data(request, class_id):
-    try:
-        # Fetching the data to export
-        assessments = Assessment.objects.filter(class_id=class_id).values(
-            'student_id__name', 'subject__name', 'assessment_type', 'obtained_marks', 'total_marks'
-        )
-        
-        file_path = generate_excel_file(assessments)
-        
-        with open(file_path, 'rb') as f:
-            mime_type, _ = mimetypes.guess_type(file_path)
-            response = FileResponse(f, content_type=mime_type)
-            response['Content-Disposition'] = f'attachment; filename={os.path.basename(file_path)}'
-            return response
-    
-    except ObjectDoesNotExist:
-        return Response({"error": "Assessment not found"}, status=404)
-    except Exception as e:
-        return Response({"error": str(e)}, status=500)
-    
-    finally:
-        # Remove the generated file
-        if 'file_path' in locals() and os.path.exists(file_path):
-            os.remove(file_path)
+    user = request.user
+    class_instance = Class.objects.filter(id=class_id).values('school_id', 'campus_id').first()
+    if not class_instance:
+        return Response({"error": "Class not found"}, status=status.HTTP_404_NOT_FOUND)
+    if not user.is_superuser and (
+        class_instance['school_id'] != user.school_id or class_instance['campus_id'] != user.campus_id
+    ):
+        return Response({"error": "You can only export classes of your school and campus."}, status=status.HTTP_403_FORBIDDEN)
 
-def generate_excel_file(assessments):
-    """Generate Excel file from assessments data"""
-    df = pd.DataFrame(assessments)
-    file_path = f"{uuid.uuid4()}.xlsx"
-    df.to_excel(file_path, index=False)
-    return file_path
\ No newline at end of file
+    stream, content_type = EXPORT_FORMATS[file_format]
+    header = [title for title, _ in CLASS_EXPORT_COLUMNS]
+    response = StreamingHttpResponse(stream(header, class_export_rows(class_id)), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename=class_{class_id}_performance.{file_format}'
+    return response
@@ -0,0 +1,124 @@
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only cursor pagination over a composite key (by default newest `created_at`
+    first, `id` as tie-breaker).
+
+    Unlike DRF's CursorPagination, which positions on the first ordering field only and
+    skips ties with an OFFSET, the cursor holds the full key of the last row, so every
+    page is one `WHERE key < cursor ORDER BY key LIMIT n` no matter how deep it is or how
+    many rows share a timestamp. NULL sorts as the largest value, as in PostgreSQL's
+    default index order, so a plain (or all-DESC) index on the key serves the ORDER BY.
+    Views needing another key subclass this and set `ordering`.
+    """
+    ordering = ('-created_at', '-id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        page_size = getattr(settings, 'API_PAGE_SIZE', 50)
+        max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 500)
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return page_size
+        return min(requested, max_page_size) if requested > 0 else page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*[
+            F(field[1:]).desc(nulls_first=True) if field.startswith('-') else F(field).asc(nulls_last=True)
+            for field in self.ordering
+        ])
+        position = self.decode_cursor(request)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.after(position))
+            except ValidationError:
+                # A tampered cursor value that doesn't fit the field type
+                raise NotFound(self.invalid_cursor_message)
+
+        # One extra row tells whether there is a next page without a COUNT
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def after(self, position):
+        """Q matching the rows that come strictly after `position` in self.ordering."""
+        branches = []
+        ties = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            descending = field.startswith('-')
+            if value is None:
+                # NULL is the largest value: in descending order every non-NULL value follows it
+                if descending:
+                    branches.append(ties & Q(**{f'{name}__isnull': False}))
+                ties &= Q(**{f'{name}__isnull': True})
+            else:
+                if descending:
+                    branches.append(ties & Q(**{f'{name}__lt': value}))
+                else:
+                    branches.append(ties & (Q(**{f'{name}__gt': value}) | Q(**{f'{name}__isnull': True})))
+                ties &= Q(**{name: value})
+        if not branches:
+            return Q(pk__in=[])
+
+        condition = reduce(or_, branches)
+        leading, value = self.ordering[0], position[0]
+        if leading.startswith('-') and value is not None:
+            # Redundant bound on the leading field that the planner can turn into an index range
+            condition &= Q(**{f'{leading[1:]}__lte': value})
+        return condition
+
+    def encode_cursor(self, instance):
+        position = [getattr(instance, field.lstrip('-')) for field in self.ordering]
+        raw = json.dumps([value if value is None else str(value) for value in position])
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -67,6 +67,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'school.middleware.QueryInstrumentationMiddleware',  # First, so it times the whole stack
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -104,7 +105,7 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.BasicAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.TokenAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'user_auth.authentication.RoleClaimsJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -249,6 +250,49 @@ MEDIA_ROOT = BASE_DIR / 'static/media'
 
 AUTH_USER_MODEL = 'user_auth.User'
 
+# ProcessedMarks refresh queue
+# 'sync' recalculates inside the request, 'thread' drains the queue in a background thread
+# after PROCESSED_MARKS_REFRESH_DELAY seconds, 'worker' leaves it to `manage.py drain_processed_marks --loop`
+PROCESSED_MARKS_REFRESH_MODE = os.getenv('PROCESSED_MARKS_REFRESH_MODE', 'thread')
+PROCESSED_MARKS_REFRESH_DELAY = float(os.getenv('PROCESSED_MARKS_REFRESH_DELAY', 2))
+
+# Per-request query count, SQL time, N+1 detection and serializer time (Server-Timing header)
+# Statements repeated REQUEST_INSTRUMENTATION_DUPLICATE_THRESHOLD+ times in one request are logged as N+1 suspects
+REQUEST_INSTRUMENTATION = os.getenv('REQUEST_INSTRUMENTATION', str(DEBUG)) == 'True'
+REQUEST_INSTRUMENTATION_DUPLICATE_THRESHOLD = int(os.getenv('REQUEST_INSTRUMENTATION_DUPLICATE_THRESHOLD', 3))
+
+# Subdomain -> School resolution in SubdomainMiddleware goes through an in-process LRU with a TTL
+# (seconds), optionally backed by a shared Django cache alias (e.g. a Redis cache) across workers
+TENANT_CACHE_ENABLED = os.getenv('TENANT_CACHE_ENABLED', 'True') == 'True'
+TENANT_CACHE_TTL = int(os.getenv('TENANT_CACHE_TTL', 300))
+TENANT_CACHE_MAXSIZE = int(os.getenv('TENANT_CACHE_MAXSIZE', 1024))
+TENANT_CACHE_ALIAS = os.getenv('TENANT_CACHE_ALIAS')
+
+# Rows per page of keyset-paginated list endpoints; clients may ask for up to API_MAX_PAGE_SIZE with ?page_size=
+API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', 50))
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', 500))
+
+# Seconds the headmaster dashboard statistics of a campus are cached (0 disables the cache)
+HEADMASTER_DASHBOARD_CACHE_TTL = int(os.getenv('HEADMASTER_DASHBOARD_CACHE_TTL', 60))
+
+# Bulk user creation hashes default passwords in a pool of PASSWORD_HASHING_WORKERS processes
+# (0 = one per CPU, 1 = no pool), handing each worker PASSWORD_HASHING_BATCH_SIZE passwords at a time
+PASSWORD_HASHING_WORKERS = int(os.getenv('PASSWORD_HASHING_WORKERS', 0))
+PASSWORD_HASHING_BATCH_SIZE = int(os.getenv('PASSWORD_HASHING_BATCH_SIZE', 16))
+
+# Spreadsheet uploads are imported in the background: 'thread' runs queued ImportJobs in a thread of the
+# web process, 'worker' leaves them to `manage.py run_import_jobs --loop`. A running job whose progress
+# hasn't moved for IMPORT_JOB_STALE_AFTER seconds is considered abandoned and picked up again.
+IMPORT_JOB_MODE = os.getenv('IMPORT_JOB_MODE', 'thread')
+IMPORT_JOB_STALE_AFTER = int(os.getenv('IMPORT_JOB_STALE_AFTER', 1800))
+
+# Month (1-12) academic years start in; performance summaries file an assessment under the academic
+# year its date falls in, e.g. with 9 an assessment of March 2025 belongs to 2024/2025
+ACADEMIC_YEAR_START_MONTH = int(os.getenv('ACADEMIC_YEAR_START_MONTH', 9))
+
+# Upper bound in seconds for generating a campus timetable (the solver usually stops well before)
+TIMETABLE_SOLVER_TIME_LIMIT = int(os.getenv('TIMETABLE_SOLVER_TIME_LIMIT', 10))
+
 CORS_ORIGIN_ALLOW_ALL = True
 
 # Default primary key field type
@@ -0,0 +1,75 @@
+import base64
+import datetime
+import json
+from urllib.parse import parse_qs, urlparse
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from student_performance.models import Class
+
+from .pagination import KeysetPagination
+
+
+class OldestFirstPagination(KeysetPagination):
+    ordering = ('created_at', 'id')
+
+
+def cursor(position):
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+@override_settings(API_PAGE_SIZE=3, API_MAX_PAGE_SIZE=4)
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.noon = timezone.make_aware(datetime.datetime(2025, 1, 6, 12))
+        self.classes = Class.objects.bulk_create([Class(name=f"Class {index}") for index in range(7)])
+        # Five rows share a timestamp, two have none
+        Class.objects.filter(id__in=[c.id for c in self.classes[:5]]).update(created_at=self.noon)
+        Class.objects.filter(id__in=[c.id for c in self.classes[5:]]).update(created_at=None)
+
+    def paginate(self, pagination_class=KeysetPagination, **params):
+        paginator = pagination_class()
+        page = paginator.paginate_queryset(Class.objects.all(), Request(self.factory.get('/classes/', params)))
+        return page, paginator
+
+    def walk(self, pagination_class=KeysetPagination, **params):
+        """Ids of every row, following the next links page by page."""
+        seen = []
+        while True:
+            page, paginator = self.paginate(pagination_class, **params)
+            seen += [c.id for c in page]
+            next_link = paginator.get_next_link()
+            if not next_link:
+                return seen
+            params['cursor'] = parse_qs(urlparse(next_link).query)['cursor'][0]
+
+    def test_rows_sharing_a_timestamp_are_paged_without_gaps_or_repeats(self):
+        Class.objects.update(created_at=self.noon)
+
+        seen = self.walk()
+
+        self.assertEqual(seen, sorted((c.id for c in self.classes), reverse=True))
+
+    def test_nulls_sort_as_the_largest_value_in_both_directions(self):
+        rows = list(Class.objects.values_list('created_at', 'id'))
+        ascending = sorted(rows, key=lambda row: (row[0] is None, row[0] or self.noon, row[1]))
+
+        self.assertEqual(self.walk(), [row_id for _, row_id in reversed(ascending)])
+        self.assertEqual(self.walk(OldestFirstPagination), [row_id for _, row_id in ascending])
+
+    def test_tampered_cursor_is_not_found(self):
+        for tampered in ('not base64!', cursor({'created_at': None}), cursor([None]), cursor(['yesterday', str(self.classes[0].id)])):
+            with self.subTest(cursor=tampered), self.assertRaises(NotFound):
+                self.paginate(cursor=tampered)
+
+    def test_page_size_is_clamped(self):
+        for requested, expected in (('100', 4), ('2', 2), ('0', 3), ('many', 3)):
+            with self.subTest(page_size=requested):
+                page, paginator = self.paginate(page_size=requested)
+                self.assertEqual(len(page), expected)
+                self.assertTrue(paginator.has_next)
@@ -0,0 +1,76 @@
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Func, IntegerField, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from student_performance.models import Assessment, Class
+from user_auth.models import Role
+
+DASHBOARD_ROLES = {'Teacher': 'teachers', 'Parent': 'parents', 'Student': 'students'}
+
+
+def _count(queryset):
+    """Scalar COUNT(*) subquery, so extra counters ride along in the same statement."""
+    return Coalesce(
+        Subquery(queryset.order_by().annotate(count=Func(F('pk'), function='COUNT')).values('count')[:1]),
+        0,
+        output_field=IntegerField(),
+    )
+
+
+def _dashboard_cache_key(school_id, campus_id):
+    return f"headmaster-dashboard:{school_id}:{campus_id}"
+
+
+def dashboard_statistics(school_id, campus_id):
+    """
+    Headcounts per role and gender, class count and assessment activity of one school campus.
+
+    Everything comes from a single statement: the role/gender counts are conditional
+    aggregates over the Role table (so every role yields a row even with no users) and the
+    class and assessment counters are scalar subqueries on those rows.
+    """
+    tenant = Q(users__school_id=school_id, users__campus_id=campus_id)
+    today = timezone.localdate()
+    assessments = Assessment.objects.filter(school_id=school_id, campus_id=campus_id)
+
+    rows = Role.objects.filter(name__in=DASHBOARD_ROLES).values('name').annotate(
+        total=Count('users', filter=tenant, distinct=True),
+        male=Count('users', filter=tenant & Q(users__gender='Male'), distinct=True),
+        female=Count('users', filter=tenant & Q(users__gender='Female'), distinct=True),
+        classes=_count(Class.objects.filter(school_id=school_id, campus_id=campus_id)),
+        assessments_total=_count(assessments),
+        assessments_unmarked=_count(assessments.filter(obtained_marks__isnull=True)),
+        assessments_last_7_days=_count(assessments.filter(created_at__gte=today - datetime.timedelta(days=7))),
+        assessments_last_30_days=_count(assessments.filter(created_at__gte=today - datetime.timedelta(days=30))),
+    )
+
+    data = {key: {'total': 0, 'male': 0, 'female': 0} for key in DASHBOARD_ROLES.values()}
+    data['classes'] = {'total': 0}
+    data['assessments'] = {'total': 0, 'unmarked': 0, 'last_7_days': 0, 'last_30_days': 0}
+    for row in rows:
+        data[DASHBOARD_ROLES[row['name']]] = {'total': row['total'], 'male': row['male'], 'female': row['female']}
+        data['classes'] = {'total': row['classes']}
+        data['assessments'] = {
+            'total': row['assessments_total'],
+            'unmarked': row['assessments_unmarked'],
+            'last_7_days': row['assessments_last_7_days'],
+            'last_30_days': row['assessments_last_30_days'],
+        }
+    return data
+
+
+def cached_dashboard_statistics(school_id, campus_id):
+    """dashboard_statistics() cached per campus for HEADMASTER_DASHBOARD_CACHE_TTL seconds."""
+    ttl = getattr(settings, 'HEADMASTER_DASHBOARD_CACHE_TTL', 60)
+    if not ttl:
+        return dashboard_statistics(school_id, campus_id)
+    key = _dashboard_cache_key(school_id, campus_id)
+    data = cache.get(key)
+    if data is None:
+        data = dashboard_statistics(school_id, campus_id)
+        cache.set(key, data, ttl)
+    return data
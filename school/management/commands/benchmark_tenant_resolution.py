@@ -0,0 +1,47 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from school.middleware import SubdomainMiddleware
+from school.models import School
+from school.tenant_cache import tenant_cache
+
+
+class Command(BaseCommand):
+    help = "Compare SubdomainMiddleware tenant resolution with the tenant cache disabled (one query per request) and enabled."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000, help='Requests per mode.')
+        parser.add_argument('--schools', type=int, default=50, help='Distinct school subdomains to rotate through.')
+
+    def handle(self, *args, **options):
+        subdomains = list(School.objects.order_by('subdomain').values_list('subdomain', flat=True)[:options['schools']])
+        if not subdomains:
+            raise CommandError("No schools found; generate data first with the generate_synthetic_data command.")
+
+        factory = RequestFactory()
+        middleware = SubdomainMiddleware(lambda request: HttpResponse())
+        requests = [
+            factory.get('/api/', HTTP_HOST=f"{subdomains[index % len(subdomains)]}.performaedu.local")
+            for index in range(options['requests'])
+        ]
+
+        self.stdout.write(f"{'mode':<10}{'mean us':>10}{'p95 us':>10}{'queries':>10}")
+        for mode, enabled in [('query', False), ('cached', True)]:
+            tenant_cache.clear()
+            with override_settings(TENANT_CACHE_ENABLED=enabled), CaptureQueriesContext(connection) as queries:
+                timings = []
+                for request in requests:
+                    started = time.perf_counter()
+                    middleware(request)
+                    timings.append((time.perf_counter() - started) * 1_000_000)
+            timings.sort()
+            self.stdout.write(
+                f"{mode:<10}{statistics.fmean(timings):>10.1f}{timings[int(0.95 * (len(timings) - 1))]:>10.1f}"
+                f"{len(queries.captured_queries):>10}"
+            )
@@ -1,6 +1,16 @@
+import logging
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+from threading import Lock, local
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
 from django.http import Http404
-from .models import School
-from threading import local
+from .tenant_cache import resolve_school
+
+logger = logging.getLogger(__name__)
 
 _thread_locals = local()
 
@@ -17,13 +27,153 @@ class SubdomainMiddleware:
         
         if len(domain_parts) > 2:  # e.g., schoolname.maindomain.com
             subdomain = domain_parts[0]
-            try:
-                school = School.objects.get(subdomain=subdomain)
-                _thread_locals.school = school
-            except School.DoesNotExist:
+            # Resolved from the tenant cache, so the lookup costs no query on the hot path
+            school = resolve_school(subdomain)
+            if school is None:
                 raise Http404("School not found for this subdomain")
+            _thread_locals.school = school
         else:
             _thread_locals.school = None  # Main domain (e.g., maindomain.com)
 
         response = self.get_response(request)
-        return response
\ No newline at end of file
+        return response
+
+class RequestStats:
+    """Database and serializer timings collected while handling one request."""
+
+    def __init__(self):
+        self.queries = []  # (sql, duration_ms)
+        self.serializer_ms = 0.0
+        self.serializer_depth = 0
+
+    @property
+    def sql_ms(self):
+        return sum(duration for _, duration in self.queries)
+
+    def duplicates(self, threshold):
+        """SQL statements executed at least `threshold` times (same SQL, any params), most repeated first."""
+        counts = Counter(sql for sql, _ in self.queries)
+        return [(sql, count) for sql, count in counts.most_common() if count >= threshold]
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook; sees SQL with placeholders, so N+1 loops share one key
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, (time.perf_counter() - started) * 1000))
+
+
+_stats_lock = Lock()
+_url_stats = defaultdict(lambda: {
+    'requests': 0, 'queries': 0, 'max_queries': 0, 'sql_ms': 0.0,
+    'serializer_ms': 0.0, 'duration_ms': 0.0, 'duplicated_requests': 0,
+})
+
+
+def get_request_stats():
+    """Stats of the request being handled by this thread, or None outside instrumented requests."""
+    return getattr(_thread_locals, 'request_stats', None)
+
+
+def get_url_stats():
+    """Per URL name totals and averages since the process started (or the last reset)."""
+    with _stats_lock:
+        snapshot = {name: dict(values) for name, values in _url_stats.items()}
+    for values in snapshot.values():
+        requests = values['requests'] or 1
+        for key in ['queries', 'sql_ms', 'serializer_ms', 'duration_ms']:
+            values[f'avg_{key}'] = round(values[key] / requests, 2)
+            values[key] = round(values[key], 2)
+    return snapshot
+
+
+def reset_url_stats():
+    with _stats_lock:
+        _url_stats.clear()
+
+
+def _instrument_serializers():
+    """Time BaseSerializer.data; nested `.data` calls are counted once, as part of the outermost serializer."""
+    from rest_framework.serializers import BaseSerializer
+
+    if getattr(BaseSerializer.data.fget, '_instrumented', False):
+        return
+    original = BaseSerializer.data.fget
+
+    def timed_data(self):
+        stats = get_request_stats()
+        if stats is None:
+            return original(self)
+        stats.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return original(self)
+        finally:
+            stats.serializer_depth -= 1
+            if not stats.serializer_depth:
+                stats.serializer_ms += (time.perf_counter() - started) * 1000
+
+    timed_data._instrumented = True
+    BaseSerializer.data = property(timed_data)
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Records the query count, SQL time, repeated (N+1) queries and serializer time of every
+    request. The numbers are returned in a Server-Timing header (plus X-Query-Count and
+    X-Duplicate-Queries) and aggregated per URL name, see get_url_stats().
+
+    Enabled with the REQUEST_INSTRUMENTATION setting; should be listed first in MIDDLEWARE.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.duplicate_threshold = getattr(settings, 'REQUEST_INSTRUMENTATION_DUPLICATE_THRESHOLD', 3)
+        _instrument_serializers()
+
+    def __call__(self, request):
+        stats = RequestStats()
+        _thread_locals.request_stats = stats
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            _thread_locals.request_stats = None
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        duplicates = stats.duplicates(self.duplicate_threshold)
+        sql_ms = stats.sql_ms
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={sql_ms:.1f};desc="{len(stats.queries)} queries"',
+            f'ser;dur={stats.serializer_ms:.1f};desc="serializers"',
+            f'total;dur={duration_ms:.1f}',
+        ])
+        response['X-Query-Count'] = str(len(stats.queries))
+        response['X-Duplicate-Queries'] = str(sum(count for _, count in duplicates))
+
+        match = getattr(request, 'resolver_match', None)
+        url_name = (match.view_name if match else None) or request.path
+        if duplicates:
+            sql, count = duplicates[0]
+            logger.warning(
+                f"{url_name}: {len(duplicates)} statement(s) repeated {self.duplicate_threshold}+ times "
+                f"({len(stats.queries)} queries in total), most repeated x{count}: {sql[:300]}"
+            )
+
+        with _stats_lock:
+            values = _url_stats[url_name]
+            values['requests'] += 1
+            values['queries'] += len(stats.queries)
+            values['max_queries'] = max(values['max_queries'], len(stats.queries))
+            values['sql_ms'] += sql_ms
+            values['serializer_ms'] += stats.serializer_ms
+            values['duration_ms'] += duration_ms
+            values['duplicated_requests'] += 1 if duplicates else 0
+
+        return response
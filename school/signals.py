@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import School
+from .tenant_cache import invalidate_school
+
+
+@receiver(pre_save, sender=School)
+def remember_previous_subdomain(sender, instance, **kwargs):
+    """Keep the stored subdomain so a renamed school is also evicted under its old name."""
+    instance._previous_subdomain = (
+        School.objects.filter(pk=instance.pk).values_list('subdomain', flat=True).first()
+        if not instance._state.adding else None
+    )
+
+
+@receiver(post_save, sender=School)
+@receiver(post_delete, sender=School)
+def invalidate_tenant_cache(sender, instance, **kwargs):
+    """
+    Evict the school from the tenant cache now and again once the transaction commits,
+    so a request racing the write can't re-cache the old row for a full TTL.
+    """
+    previous = getattr(instance, '_previous_subdomain', None)
+    invalidate_school(instance, previous)
+    transaction.on_commit(lambda: invalidate_school(instance, previous))
@@ -0,0 +1,117 @@
+import copy
+import logging
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import School
+
+logger = logging.getLogger(__name__)
+
+# Cached for unknown subdomains too, so requests for them don't hit the database either
+_MISSING = object()
+
+
+class TenantCache:
+    """
+    Thread-safe LRU mapping subdomain -> School with a per-entry TTL.
+
+    Entries are dropped when a School is saved or deleted (see school.signals). Other
+    processes only see such changes once their own entries expire, so the TTL bounds
+    how long a renamed or deleted school can still be resolved by another worker.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # subdomain -> (expires_at, School or _MISSING)
+        self._lock = Lock()
+
+    def get(self, subdomain):
+        """Return the cached School, _MISSING for a known-unknown subdomain, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(subdomain)
+            if entry is None:
+                return None
+            expires_at, school = entry
+            if expires_at < time.monotonic():
+                del self._entries[subdomain]
+                return None
+            self._entries.move_to_end(subdomain)
+            return school
+
+    def set(self, subdomain, school):
+        with self._lock:
+            self._entries[subdomain] = (time.monotonic() + self.ttl, school)
+            self._entries.move_to_end(subdomain)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, subdomain=None, school_id=None):
+        """Drop the entry for a subdomain and/or every entry pointing at a school id."""
+        with self._lock:
+            self._entries.pop(subdomain, None)
+            if school_id is not None:
+                for key, (_, school) in list(self._entries.items()):
+                    if school is not _MISSING and school.pk == school_id:
+                        del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+tenant_cache = TenantCache(
+    maxsize=getattr(settings, 'TENANT_CACHE_MAXSIZE', 1024),
+    ttl=getattr(settings, 'TENANT_CACHE_TTL', 300),
+)
+
+
+def _shared_cache():
+    alias = getattr(settings, 'TENANT_CACHE_ALIAS', None)
+    return caches[alias] if alias else None
+
+
+def _shared_key(subdomain):
+    return f"tenant:subdomain:{subdomain}"
+
+
+def resolve_school(subdomain):
+    """
+    Return the School for a subdomain, or None if there is none.
+
+    Looks in the in-process LRU first, then in the shared cache backend (when
+    TENANT_CACHE_ALIAS is set) and only queries the database on a miss in both.
+    """
+    if not getattr(settings, 'TENANT_CACHE_ENABLED', True):
+        return School.objects.filter(subdomain=subdomain).first()
+
+    school = tenant_cache.get(subdomain)
+    if school is None:
+        shared = _shared_cache()
+        school = shared.get(_shared_key(subdomain)) if shared else None
+        if school is None:
+            school = School.objects.filter(subdomain=subdomain).first() or _MISSING
+            if shared:
+                shared.set(_shared_key(subdomain), school if school is not _MISSING else False, tenant_cache.ttl)
+        elif school is False:
+            school = _MISSING
+        tenant_cache.set(subdomain, school)
+
+    # Hand out copies so a request mutating its School can't change what other requests see
+    return None if school is _MISSING else copy.copy(school)
+
+
+def invalidate_school(school, *subdomains):
+    """Forget a school under its current subdomain and any previous ones."""
+    subdomains = {subdomain for subdomain in (school.subdomain, *subdomains) if subdomain}
+    tenant_cache.invalidate(school_id=school.pk)
+    shared = _shared_cache()
+    for subdomain in subdomains:
+        tenant_cache.invalidate(subdomain=subdomain)
+        if shared:
+            shared.delete(_shared_key(subdomain))
+    logger.debug(f"Invalidated tenant cache for school {school.pk} ({', '.join(sorted(subdomains))})")
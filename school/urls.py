@@ -4,4 +4,5 @@ from . import views
 urlpatterns = [
     path('school-signup/', views.SchoolSignupView.as_view(), name='school-signup'),
     path('schools/', views.SchoolListView.as_view(), name='schools'),
+    path('instrumentation/stats/', views.InstrumentationStatsView.as_view(), name='instrumentation-stats'),
 ]
\ No newline at end of file
@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from rest_framework import status, permissions
 import logging
 
+from .middleware import get_url_stats, reset_url_stats
 from .models import School, Campus
 from .serializers import SchoolSerializer, CampusSerializer
 
@@ -79,4 +80,17 @@ class SchoolListView(APIView):
             return Response(serializer.data, status=status.HTTP_200_OK)
         except Exception as e:
             logger.error(f"Error fetching schools: {str(e)}")
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class InstrumentationStatsView(APIView):
+    """Per URL name request instrumentation totals for this process, most queries per request first."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        stats = sorted(get_url_stats().items(), key=lambda item: item[1]['avg_queries'], reverse=True)
+        return Response([{'url_name': name, **values} for name, values in stats], status=status.HTTP_200_OK)
+
+    def delete(self, request):
+        reset_url_stats()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,298 @@
+import datetime
+import uuid
+import logging
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Q, prefetch_related_objects
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Class, Subject, TeacherLevelClass, Assessment, AssessmentName, Terms
+from .refresh_queue import enqueue_processed_marks_refresh
+from user_auth.models import User
+
+logger = logging.getLogger(__name__)
+
+BULK_BATCH_SIZE = 500
+
+# Assessment.total_marks/obtained_marks are DecimalField(max_digits=5, decimal_places=2)
+MAX_MARKS = Decimal('999.99')
+
+
+def _parse_uuid(value):
+    """Return a UUID for `value`, or None if it is missing or malformed."""
+    if isinstance(value, uuid.UUID):
+        return value
+    try:
+        return uuid.UUID(str(value))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def _parse_marks(value, default='0.00'):
+    """Convert a mark to a 2dp Decimal, returning None if it is not a valid mark."""
+    value = value if value not in [None, ""] else default
+    try:
+        marks = Decimal(str(value)).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        return None
+    if marks < 0 or marks > MAX_MARKS:
+        return None
+    return marks
+
+
+def _parse_date(value):
+    """A date from YYYY-MM-DD, None if missing, False if it is not a valid date."""
+    if value in [None, ""]:
+        return None
+    if isinstance(value, datetime.date):
+        return value
+    try:
+        return parse_date(str(value)) or False
+    except ValueError:
+        return False
+
+
+def get_teacher_assignments(teacher, class_ids, subject_ids):
+    """
+    Return the set of (class_id, subject_id) pairs the teacher is assigned to teach,
+    resolved in a single query over the TeacherLevelClass.subjects_taught table.
+    """
+    through = TeacherLevelClass.subjects_taught.through
+    return set(
+        through.objects.filter(
+            teacherlevelclass__teacher=teacher,
+            teacherlevelclass__class_id__in=class_ids,
+            subject_id__in=subject_ids,
+        ).values_list('teacherlevelclass__class_id', 'subject_id')
+    )
+
+
+def bulk_create_assessments(teacher, assessments_data):
+    """
+    Create assessments for whole classes in a fixed number of queries.
+
+    Classes, subjects, students, assessment names, terms and the teacher's
+    assignments are resolved with one `__in` query each, marks are validated in
+    memory and every valid row is saved with `bulk_create` inside one transaction.
+    Invalid rows are reported in `errors` without stopping the rest.
+
+    Returns a (created_assessments, errors) tuple.
+    """
+    school = teacher.school
+    campus = teacher.campus
+    errors = []
+
+    # Pass 1: collect every id referenced by the payload
+    class_ids, subject_ids, student_ids, name_ids, term_ids = set(), set(), set(), set(), set()
+    for data in assessments_data:
+        class_ids.add(_parse_uuid(data.get('class_id')))
+        subject_ids.add(_parse_uuid(data.get('subject')))
+        name_ids.add(_parse_uuid(data.get('assessment_name', data.get('assessment_type'))))
+        term_ids.add(_parse_uuid(data.get('term')))
+        for student_data in data.get('student_marks', []):
+            student_ids.add(_parse_uuid(student_data.get('id')))
+    for ids in (class_ids, subject_ids, student_ids, name_ids, term_ids):
+        ids.discard(None)
+
+    # Pass 2: resolve everything with tenancy checks in a handful of queries
+    classes = {c.id: c for c in Class.objects.filter(id__in=class_ids, school=school, campus=campus)}
+    subjects = {s.id: s for s in Subject.objects.filter(id__in=subject_ids, school=school, campus=campus)}
+    students = {
+        s.id: s for s in User.objects.filter(id__in=student_ids, roles__name='Student', school=school, campus=campus)
+    }
+    # Names and terms may be shared by the whole school or be global, but never another school's
+    shared = Q(school__isnull=True) | Q(school=school, campus__isnull=True) | Q(school=school, campus=campus)
+    assessment_names = AssessmentName.objects.filter(shared).in_bulk(name_ids)
+    terms = Terms.objects.filter(shared).in_bulk(term_ids)
+    assignments = get_teacher_assignments(teacher, classes.keys(), subjects.keys())
+
+    # Pass 3: validate in memory and build unsaved instances
+    assessments = []
+    for data in assessments_data:
+        class_id = data.get('class_id')
+        subject_id = data.get('subject')
+        class_obj = classes.get(_parse_uuid(class_id))
+        subject = subjects.get(_parse_uuid(subject_id))
+
+        if not class_obj:
+            errors.append({'error': f"Class ID {class_id} does not exist in this school and campus.", 'class_id': class_id})
+            continue
+        if not subject:
+            errors.append({'error': f"Subject ID {subject_id} does not exist in this school and campus.", 'subject': subject_id})
+            continue
+        if (class_obj.id, subject.id) not in assignments:
+            errors.append({
+                'error': f'Teacher is not assigned to teach subject ID {subject_id} in class ID {class_id} at this school/campus.',
+                'class_id': class_id,
+                'subject': subject_id,
+            })
+            continue
+
+        name_id = data.get('assessment_name', data.get('assessment_type'))
+        assessment_name = assessment_names.get(_parse_uuid(name_id))
+        if name_id and not assessment_name:
+            errors.append({'error': f"Assessment name ID {name_id} does not exist in this school and campus.", 'class_id': class_id, 'subject': subject_id})
+            continue
+
+        term_id = data.get('term')
+        term = terms.get(_parse_uuid(term_id))
+        if term_id and not term:
+            errors.append({'error': f"Term ID {term_id} does not exist in this school and campus.", 'class_id': class_id, 'subject': subject_id})
+            continue
+
+        date = _parse_date(data.get('date'))
+        if date is False:
+            errors.append({'error': f"Invalid date {data.get('date')!r}, expected YYYY-MM-DD.", 'class_id': class_id, 'subject': subject_id})
+            continue
+
+        total_marks = _parse_marks(data.get('total_marks'))
+        if total_marks is None:
+            errors.append({'error': f"Invalid total marks for class ID {class_id}, subject ID {subject_id}.", 'class_id': class_id, 'subject': subject_id})
+            continue
+
+        for student_data in data.get('student_marks', []):
+            student_id = student_data.get('id')
+            student = students.get(_parse_uuid(student_id))
+            if not student:
+                errors.append({'error': f"Student ID {student_id} does not exist in this school and campus.", 'student_id': student_id})
+                continue
+
+            obtained_marks = _parse_marks(student_data.get('obtained_marks'))
+            if obtained_marks is None or obtained_marks > total_marks:
+                errors.append({'error': f"Invalid marks format for student ID {student_id}.", 'student_id': student_id})
+                continue
+
+            assessments.append(Assessment(
+                student=student,
+                class_id=class_obj,
+                teacher=teacher,
+                subject=subject,
+                school=school,
+                campus=campus,
+                total_marks=total_marks,
+                topic=data.get('topic'),
+                assessment_name=assessment_name,
+                term=term,
+                date=date,
+                obtained_marks=obtained_marks,
+            ))
+
+    if assessments:
+        with transaction.atomic():
+            Assessment.objects.bulk_create(assessments, batch_size=BULK_BATCH_SIZE)
+            # bulk_create skips post_save, so queue the ProcessedMarks refresh explicitly
+            enqueue_processed_marks_refresh(
+                {(a.student_id, a.class_id_id, a.term_id) for a in assessments}
+            )
+
+    # Every row shares the same school instance, so its campuses are loaded once for serialization
+    if assessments and school:
+        prefetch_related_objects([school], 'campuses')
+
+    logger.info(f"Teacher {teacher} created {len(assessments)} assessment(s) with {len(errors)} error(s)")
+    return assessments, errors
+
+
+def bulk_update_assessments(teacher, assessments_data):
+    """
+    Apply a batch of assessment corrections in a fixed number of queries.
+
+    All referenced assessments are fetched in one query keyed by id, classes,
+    subjects and students are resolved with one `__in` query each, the teacher's
+    assignment is checked once per (class, subject) pair, and the changes are
+    written with a single `bulk_update` followed by one coalesced ProcessedMarks refresh.
+
+    Returns an (updated_assessments, errors) tuple.
+    """
+    errors = []
+    required = ['assessment_id', 'class_id', 'subject', 'student', 'school', 'campus']
+
+    items = []
+    for data in assessments_data:
+        if not all(data.get(field) for field in required):
+            errors.append({'detail': 'Missing required fields in request data.', 'assessment_id': data.get('assessment_id')})
+            continue
+        items.append(data)
+
+    assessment_ids = {_parse_uuid(data['assessment_id']) for data in items} - {None}
+    class_ids = {_parse_uuid(data['class_id']) for data in items} - {None}
+    subject_ids = {_parse_uuid(data['subject']) for data in items} - {None}
+    student_ids = {_parse_uuid(data['student']) for data in items} - {None}
+
+    assessments = {
+        a.id: a for a in Assessment.objects.filter(id__in=assessment_ids).select_related(
+            'student', 'class_id', 'teacher', 'subject', 'assessment_name', 'term', 'school', 'campus'
+        ).prefetch_related('school__campuses')
+    }
+    classes = {c.id: c for c in Class.objects.filter(id__in=class_ids)}
+    subjects = {s.id: s for s in Subject.objects.filter(id__in=subject_ids)}
+    students = {s.id: s for s in User.objects.filter(id__in=student_ids, roles__name='Student')}
+    assignments = get_teacher_assignments(teacher, classes.keys(), subjects.keys())
+
+    updated = {}
+    refresh_keys = set()
+    today = timezone.now().date()
+    for data in items:
+        assessment_id = data['assessment_id']
+        class_id = data['class_id']
+        subject_id = data['subject']
+        student_id = data['student']
+
+        class_instance = classes.get(_parse_uuid(class_id))
+        subject_instance = subjects.get(_parse_uuid(subject_id))
+        student_instance = students.get(_parse_uuid(student_id))
+        assessment = assessments.get(_parse_uuid(assessment_id))
+
+        if not class_instance:
+            errors.append({'detail': f'Class with ID {class_id} not found.', 'assessment_id': assessment_id})
+            continue
+        if not student_instance:
+            errors.append({'detail': f'Student with ID {student_id} not found.', 'assessment_id': assessment_id})
+            continue
+        if not subject_instance:
+            errors.append({'detail': f'Subject with ID {subject_id} not found.', 'assessment_id': assessment_id})
+            continue
+        if not assessment or str(assessment.school_id) != str(data['school']) or str(assessment.campus_id) != str(data['campus']):
+            errors.append({'detail': f'Assessment with ID {assessment_id} does not exist in the specified school and campus.', 'assessment_id': assessment_id})
+            continue
+
+        # Ensure the teacher is assigned to teach this subject in the class
+        if (class_instance.id, subject_instance.id) not in assignments:
+            errors.append({'detail': f'Teacher is not assigned to teach subject {subject_id} in class {class_id}.', 'assessment_id': assessment_id})
+            continue
+
+        obtained_marks = data.get('obtained_marks')
+        if obtained_marks not in [None, ""]:
+            obtained_marks = _parse_marks(obtained_marks)
+            if obtained_marks is None or obtained_marks > assessment.total_marks:
+                errors.append({'assessment_id': assessment_id, 'errors': {'obtained_marks': ['Invalid marks.']}})
+                continue
+        else:
+            obtained_marks = None
+
+        # Both the old and the new (student, class, term) keys need their marks recalculated
+        refresh_keys.add((assessment.student_id, assessment.class_id_id, assessment.term_id))
+
+        assessment.obtained_marks = obtained_marks
+        assessment.student = student_instance
+        assessment.teacher = teacher
+        assessment.subject = subject_instance
+        assessment.class_id = class_instance
+        assessment.updated_at = today
+        updated[assessment.id] = assessment
+
+        refresh_keys.add((assessment.student_id, assessment.class_id_id, assessment.term_id))
+
+    if updated:
+        with transaction.atomic():
+            Assessment.objects.bulk_update(
+                list(updated.values()),
+                ['obtained_marks', 'student', 'teacher', 'subject', 'class_id', 'updated_at'],
+                batch_size=BULK_BATCH_SIZE,
+            )
+            enqueue_processed_marks_refresh(refresh_keys)
+
+    logger.info(f"Teacher {teacher} updated {len(updated)} assessment(s) with {len(errors)} error(s)")
+    return list(updated.values()), errors
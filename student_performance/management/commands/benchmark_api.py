@@ -0,0 +1,197 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from school.models import School
+from student_performance.models import AssessmentName, ClassEnrollment, ClassSubject, ProcessedMarksRefresh, TeacherLevelClass, Terms
+from student_performance.refresh_queue import WORKER, _flush_pending_keys, _pending_keys, drain_processed_marks_queue
+from user_auth.models import User
+from user_auth.tokens import create_jwt_pair_for_user
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the hot API endpoints through the DRF test client against the current database and report "
+        "p50/p95 latency and query counts per endpoint. ProcessedMarks refreshes a request queues are "
+        "drained right after it and reported separately. Writes are rolled back after every request. "
+        "Populate the database with the generate_synthetic_data command first."
+    )
+
+    ENDPOINTS = [
+        'create_assessments',
+        'get_students_by_class_id',
+        'historical_subject_performance',
+        'headmaster_dashboard',
+        'parents',
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', help='Subdomain of the school to benchmark (defaults to the first synthetic school).')
+        parser.add_argument('--requests', type=int, default=20, help='Measured requests per endpoint.')
+        parser.add_argument('--warmup', type=int, default=2, help='Unmeasured requests per endpoint.')
+        parser.add_argument('--endpoint', action='append', dest='endpoints', choices=self.ENDPOINTS, help='Only benchmark these endpoints.')
+        parser.add_argument('--no-subdomain', action='store_true', help='Send requests to the bare host instead of the school subdomain.')
+        parser.add_argument('--output', help='Write the report as JSON to this path.')
+
+    def handle(self, *args, **options):
+        school = self.get_school(options['school'])
+        context = self.build_context(school)
+        self.drain_queue()
+        host = 'testserver' if options['no_subdomain'] else f"{school.subdomain}.performaedu.local"
+
+        results = {}
+        for name in options['endpoints'] or self.ENDPOINTS:
+            request = getattr(self, f"request_{name}")(context)
+            results[name] = self.run_endpoint(request, host, options['warmup'], options['requests'])
+
+        self.stdout.write(
+            f"{'endpoint':<34}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}{'status':>10}"
+            f"{'refresh p50 ms':>16}{'refresh queries':>17}"
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<34}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['queries']:>9}"
+                f"{','.join(str(code) for code in result['status_codes']):>10}"
+                f"{result['refresh_p50_ms']:>16.2f}{result['refresh_queries']:>17}"
+            )
+
+        if options['output']:
+            report = {'vendor': connection.vendor, 'school': school.subdomain, 'host': host, 'endpoints': results}
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+    def get_school(self, subdomain):
+        schools = School.objects.order_by('subdomain')
+        school = schools.filter(subdomain=subdomain).first() if subdomain else schools.filter(subdomain__startswith='synthetic-').first()
+        if not school:
+            raise CommandError("School not found; generate data first with the generate_synthetic_data command.")
+        return school
+
+    def drain_queue(self):
+        """Work off refreshes queued before the run, so measured drains only see the request's own keys."""
+        queued = ProcessedMarksRefresh.objects.count()
+        if queued:
+            self.stdout.write(f"Draining {queued} queued ProcessedMarks refresh key(s) before measuring")
+            while drain_processed_marks_queue():
+                pass
+
+    def refresh_pending(self):
+        """
+        Queue and drain the ProcessedMarks refreshes the request asked for. They are queued on commit,
+        which never comes for a rolled back request, so this does inside the transaction what the
+        on_commit flush and the drain (thread or worker) would do after a real one. In 'sync' mode the
+        request already recalculated and nothing is pending.
+        """
+        if not _pending_keys():
+            return
+        # Flush without scheduling a background drain; the drain runs right here instead
+        with override_settings(PROCESSED_MARKS_REFRESH_MODE=WORKER):
+            _flush_pending_keys()
+        while drain_processed_marks_queue():
+            pass
+
+    def build_context(self, school):
+        """Pick the users and records of one campus that every endpoint request is built from."""
+        assignment = TeacherLevelClass.objects.filter(school=school).select_related('teacher', 'class_id').order_by('id').first()
+        if not assignment:
+            raise CommandError(f"School {school.subdomain} has no teacher assigned to a class.")
+        class_instance = assignment.class_id
+        campus_users = User.objects.filter(school=school, campus=class_instance.campus_id).order_by('email')
+
+        def user_with_role(role):
+            user = campus_users.filter(roles__name=role).first()
+            if not user:
+                raise CommandError(f"No user with role {role} in the benchmark campus.")
+            return user
+
+        return {
+            'teacher': assignment.teacher,
+            'headmaster': user_with_role('Headmaster'),
+            'admin': user_with_role('Admin'),
+            'class': class_instance,
+            'subject_id': assignment.subjects_taught.values_list('id', flat=True).first()
+            or ClassSubject.objects.filter(class_id=class_instance).values_list('subject_id', flat=True).first(),
+            'term_id': Terms.objects.filter(campus=class_instance.campus_id).values_list('id', flat=True).first(),
+            'assessment_name_id': AssessmentName.objects.filter(name='Exercise').values_list('id', flat=True).first(),
+            'student_ids': list(
+                ClassEnrollment.objects.filter(class_id=class_instance).values_list('student_id', flat=True)
+            ),
+        }
+
+    # Each request_* method returns (user, method, path, payload)
+
+    def request_create_assessments(self, context):
+        payload = {'assessments': [{
+            'class_id': str(context['class'].id),
+            'subject': str(context['subject_id']),
+            'term': str(context['term_id']),
+            'assessment_name': str(context['assessment_name_id']),
+            'total_marks': '20',
+            'topic': 'Benchmark',
+            'student_marks': [{'id': str(student_id), 'obtained_marks': '15'} for student_id in context['student_ids']],
+        }]}
+        return context['teacher'], 'post', '/api/create-student-assessments/', payload
+
+    def request_get_students_by_class_id(self, context):
+        return context['teacher'], 'get', f"/api/get-students/?class_id={context['class'].id}", None
+
+    def request_historical_subject_performance(self, context):
+        return context['teacher'], 'get', f"/api/historical-subject-performances/{context['student_ids'][0]}/", None
+
+    def request_headmaster_dashboard(self, context):
+        return context['headmaster'], 'get', '/api/headmaster-dashboard/statistics/', None
+
+    def request_parents(self, context):
+        return context['admin'], 'get', '/api/parents/', None
+
+    def run_endpoint(self, request, host, warmup, requests):
+        user, method, path, payload = request
+        client = APIClient(HTTP_HOST=host, raise_request_exception=False)
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {create_jwt_pair_for_user(user)['access_token']}")
+
+        timings, query_counts, status_codes = [], [], set()
+        refresh_timings, refresh_query_counts = [], []
+        for index in range(warmup + requests):
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    response = getattr(client, method)(path, payload, format='json')
+                    elapsed = (time.perf_counter() - started) * 1000
+                with CaptureQueriesContext(connection) as refresh_queries:
+                    started = time.perf_counter()
+                    self.refresh_pending()
+                    refresh_elapsed = (time.perf_counter() - started) * 1000
+                # Keep the dataset identical between requests and runs
+                transaction.set_rollback(True)
+
+            if index < warmup:
+                continue
+            timings.append(elapsed)
+            query_counts.append(len(queries.captured_queries))
+            status_codes.add(response.status_code)
+            refresh_timings.append(refresh_elapsed)
+            refresh_query_counts.append(len(refresh_queries.captured_queries))
+
+        return {
+            'path': path,
+            'p50_ms': statistics.median(timings),
+            'p95_ms': percentile(timings, 0.95),
+            'mean_ms': statistics.fmean(timings),
+            'queries': max(query_counts),
+            'status_codes': sorted(status_codes),
+            'refresh_p50_ms': statistics.median(refresh_timings),
+            'refresh_p95_ms': percentile(refresh_timings, 0.95),
+            'refresh_queries': max(refresh_query_counts),
+            'requests': requests,
+        }
@@ -0,0 +1,142 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Avg, Count, ExpressionWrapper, F, FloatField
+
+from student_performance.models import Assessment
+from student_performance.performance_summary import aggregate_class_performance
+
+EXERCISE_NAMES = ['Exercise', 'Assignment']
+
+
+# Each scenario mirrors the Assessment filters of one analytics view, parameterised by a sampled assessment row
+SCENARIOS = {
+    # get_student_assessments
+    'student_assessments': lambda row: Assessment.objects.filter(
+        school_id=row['school_id'], campus_id=row['campus_id'], student_id=row['student_id'],
+        term_id=row['term_id'], subject_id=row['subject_id'], assessment_name_id=row['assessment_name_id'],
+    ),
+    # get_student_exams_assessments
+    'student_exam_assessments': lambda row: Assessment.objects.filter(
+        school_id=row['school_id'], campus_id=row['campus_id'], student_id=row['student_id'],
+        subject_id=row['subject_id'], assessment_name_id=row['assessment_name_id'],
+    ),
+    # WeightedTopicPerformanceView
+    'student_topic_performance': lambda row: Assessment.objects.filter(
+        student_id=row['student_id'], class_id=row['class_id_id'], subject_id=row['subject_id'],
+        term_id=row['term_id'], assessment_name__name__in=EXERCISE_NAMES,
+    ).values('topic', 'assessment_name__name').annotate(count=Count('id'), average_marks=Avg('obtained_marks')),
+    # TopicPerformanceView
+    'class_topic_performance': lambda row: Assessment.objects.filter(
+        class_id=row['class_id_id'], subject_id=row['subject_id'], term_id=row['term_id'],
+        assessment_name__name__in=EXERCISE_NAMES,
+    ).values('topic', 'assessment_name__name').annotate(average_score=Avg(
+        ExpressionWrapper(F('obtained_marks') * 100.0 / F('total_marks'), output_field=FloatField())
+    )),
+    # HistoricalPerformanceView
+    'student_history': lambda row: Assessment.objects.filter(
+        student_id=row['student_id'], school_id=row['school_id'], campus_id=row['campus_id'],
+    ).values('subject_id', 'term_id').annotate(average_marks=Avg('obtained_marks')),
+    # build_processed_marks
+    'processed_marks_rebuild': lambda row: Assessment.objects.filter(
+        class_id=row['class_id_id'], term_id=row['term_id'], student__isnull=False, obtained_marks__isnull=False,
+    ).values_list('student_id', 'subject_id', 'assessment_name_id', 'obtained_marks', 'total_marks', 'date'),
+    # refresh_class_performance_summary
+    'class_performance_summary': lambda row: aggregate_class_performance(row['class_id_id'], [row['term_id']]),
+}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the Assessment queries behind the analytics views and record their query plans. "
+        "Use --without-indexes to measure the same queries with the Assessment Meta.indexes dropped "
+        "(inside a transaction that is rolled back; this locks the table, so only run it on a benchmark database)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=20, help='Assessment rows sampled as query parameters.')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per sample and scenario.')
+        parser.add_argument('--scenario', action='append', dest='scenarios', choices=sorted(SCENARIOS), help='Only run these scenarios.')
+        parser.add_argument('--without-indexes', action='store_true', help='Drop the Assessment Meta.indexes for the duration of the run.')
+        parser.add_argument('--output', help='Write the report as JSON to this path.')
+        parser.add_argument('--compare', help='JSON report of a previous run to compare against.')
+
+    def handle(self, *args, **options):
+        samples = list(
+            Assessment.objects.filter(student__isnull=False, class_id__isnull=False, term__isnull=False)
+            .order_by('?')
+            .values('school_id', 'campus_id', 'student_id', 'class_id_id', 'subject_id', 'term_id', 'assessment_name_id')[:options['samples']]
+        )
+        if not samples:
+            raise CommandError("No assessments to sample; generate data first with the generate_synthetic_data command.")
+
+        scenarios = {name: SCENARIOS[name] for name in (options['scenarios'] or SCENARIOS)}
+
+        with transaction.atomic():
+            if options['without_indexes']:
+                self.drop_indexes()
+            results = {name: self.run_scenario(query, samples, options['repeat']) for name, query in scenarios.items()}
+            # Never keep the dropped indexes (or anything else) from a benchmark run
+            transaction.set_rollback(True)
+
+        report = {
+            'vendor': connection.vendor,
+            'indexes': 'without' if options['without_indexes'] else 'with',
+            'assessments': Assessment.objects.count(),
+            'samples': len(samples),
+            'repeat': options['repeat'],
+            'scenarios': results,
+        }
+
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)['scenarios']
+
+        self.stdout.write(f"{'scenario':<28}{'median ms':>12}{'p95 ms':>12}{'rows':>8}" + (f"{'baseline':>12}{'speedup':>10}" if baseline else ''))
+        for name, result in results.items():
+            line = f"{name:<28}{result['median_ms']:>12.3f}{result['p95_ms']:>12.3f}{result['rows']:>8}"
+            if baseline and name in baseline:
+                before = baseline[name]['median_ms']
+                line += f"{before:>12.3f}{(before / result['median_ms'] if result['median_ms'] else 0):>9.1f}x"
+            self.stdout.write(line)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2, default=str)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+    def drop_indexes(self):
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            for index in Assessment._meta.indexes:
+                cursor.execute(f"DROP INDEX {quote(index.name)}")
+        self.stdout.write(f"Dropped {len(Assessment._meta.indexes)} Assessment index(es) for this run.")
+
+    def run_scenario(self, query, samples, repeat):
+        timings = []
+        rows = []
+        for row in samples:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                result = list(query(row))
+                timings.append((time.perf_counter() - started) * 1000)
+            rows.append(len(result))
+
+        explain_options = {'analyze': True, 'buffers': True} if connection.vendor == 'postgresql' else {}
+        return {
+            'median_ms': statistics.median(timings),
+            'p95_ms': percentile(timings, 0.95),
+            'mean_ms': statistics.fmean(timings),
+            'runs': len(timings),
+            'rows': round(statistics.fmean(rows)),  # Average rows returned per sample
+            'plan': query(samples[0]).explain(**explain_options),
+        }
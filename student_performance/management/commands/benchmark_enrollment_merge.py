@@ -0,0 +1,111 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+
+from student_performance.models import Class, ClassEnrollment
+from student_performance.rollover import PROMOTED, REPEATED, merge_into_existing
+from user_auth.models import User
+
+
+def legacy_merge(target_class, student_ids, school_id, campus_id):
+    """The per-student loop merge_promoted_repeated_students used to run, kept for comparison."""
+    for student_id in student_ids:
+        student = User.objects.get(id=student_id, roles__name="Student")
+        enrollments = ClassEnrollment.objects.filter(
+            student=student, class_id=target_class, status__in=[PROMOTED, REPEATED],
+            school_id=school_id, campus_id=campus_id,
+        )
+        if not enrollments.exists():
+            raise ValueError(f"Student {student_id} is not enrolled as 'promoted' or 'repeated' in this class.")
+        enrollments.update(status='existing')
+
+
+def bulk_merge(target_class, student_ids, school_id, campus_id):
+    ineligible, _ = merge_into_existing(target_class, student_ids, school_id, campus_id)
+    if ineligible:
+        raise ValueError(f"Students cannot be merged: {ineligible}")
+
+
+IMPLEMENTATIONS = {'legacy': legacy_merge, 'bulk': bulk_merge}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time merging promoted/repeated students of one class back into 'existing', the per-student loop "
+        "against the single UPDATE. The students are marked promoted before every run and everything is "
+        "rolled back afterwards. Populate the database with the generate_synthetic_data command first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=200, help='Students merged per run.')
+        parser.add_argument('--class-id', help='Class to merge into (defaults to the class with the most enrollments).')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per implementation.')
+        parser.add_argument('--output', help='Write the report as JSON to this path.')
+
+    def handle(self, *args, **options):
+        target_class = self.get_class(options['class_id'])
+        student_ids = list(
+            ClassEnrollment.objects.filter(
+                class_id=target_class, school_id=target_class.school_id, campus_id=target_class.campus_id,
+                student__roles__name='Student',
+            ).order_by('student_id').values_list('student_id', flat=True).distinct()[:options['students']]
+        )
+        if len(student_ids) < options['students']:
+            self.stdout.write(self.style.WARNING(
+                f"Class {target_class.name} only has {len(student_ids)} students; merging those."
+            ))
+
+        with transaction.atomic():
+            results = {
+                name: self.run_implementation(merge, target_class, student_ids, options['repeat'])
+                for name, merge in IMPLEMENTATIONS.items()
+            }
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{'implementation':<16}{'median ms':>12}{'mean ms':>12}{'queries':>9}")
+        for name, result in results.items():
+            self.stdout.write(f"{name:<16}{result['median_ms']:>12.2f}{result['mean_ms']:>12.2f}{result['queries']:>9}")
+
+        if options['output']:
+            report = {
+                'vendor': connection.vendor, 'class_id': str(target_class.id), 'students': len(student_ids),
+                'repeat': options['repeat'], 'implementations': results,
+            }
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+    def get_class(self, class_id):
+        if class_id:
+            target_class = Class.objects.filter(id=class_id).first()
+        else:
+            target_class = (
+                Class.objects.filter(school__isnull=False, campus__isnull=False)
+                .annotate(enrolled=Count('classenrollment')).order_by('-enrolled', 'id').first()
+            )
+        if not target_class:
+            raise CommandError("Class not found; generate data first with the generate_synthetic_data command.")
+        return target_class
+
+    def run_implementation(self, merge, target_class, student_ids, repeat):
+        enrollments = ClassEnrollment.objects.filter(class_id=target_class, student_id__in=student_ids)
+        timings = []
+        for _ in range(repeat):
+            enrollments.update(status=PROMOTED)
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                merge(target_class, student_ids, target_class.school_id, target_class.campus_id)
+                timings.append((time.perf_counter() - started) * 1000)
+            if enrollments.exclude(status='existing').exists():
+                raise CommandError("Not every enrollment was merged.")
+        return {
+            'median_ms': statistics.median(timings),
+            'mean_ms': statistics.fmean(timings),
+            'runs': len(timings),
+            'queries': len(queries),
+        }
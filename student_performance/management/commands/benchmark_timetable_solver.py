@@ -0,0 +1,107 @@
+import json
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+
+from student_performance.timetable_solver import Lesson, TimetableSolver
+
+
+def synthetic_campus(classes, subjects, days, periods, fill, load, unavailable, seed):
+    """
+    Lessons and teacher unavailability of an invented campus: every class fills `fill` of its
+    week with `subjects` subjects of random weight, each subject has its own teachers who take
+    classes until they reach `load` of the week, and each teacher is away for `unavailable` of it.
+    """
+    rng = random.Random(seed)
+    slots = days * periods
+    per_class = int(slots * fill)
+    lessons = []
+    teachers = {subject: [] for subject in range(subjects)}
+    for class_id in range(classes):
+        weights = [rng.randint(2, 6) for _ in range(subjects)]
+        counts = [max(1, round(weight * per_class / sum(weights))) for weight in weights]
+        while sum(counts) > per_class:
+            counts[counts.index(max(counts))] -= 1
+        while sum(counts) < per_class:
+            counts[rng.randrange(subjects)] += 1
+
+        for subject, count in enumerate(counts):
+            pool = teachers[subject]
+            teacher = next((teacher for teacher in pool if teacher['lessons'] + count <= slots * load), None)
+            if teacher is None:
+                teacher = {'id': f"teacher-{subject}-{len(pool)}", 'lessons': 0}
+                pool.append(teacher)
+            teacher['lessons'] += count
+            lessons += [Lesson(class_id, subject, teacher['id'])] * count
+
+    blocked = {
+        teacher['id']: set(rng.sample(range(slots), int(slots * unavailable)))
+        for pool in teachers.values() for teacher in pool
+    }
+    return lessons, blocked
+
+
+def clashes(assignments, blocked, periods):
+    """Hard constraint violations in a solution; always 0 unless the solver is broken."""
+    seen, found = set(), 0
+    for lesson, day, period in assignments:
+        keys = {('class', lesson.class_id, day, period), ('teacher', lesson.teacher_id, day, period)}
+        found += len(keys & seen) + (day * periods + period in blocked.get(lesson.teacher_id, ()))
+        seen |= keys
+    return found
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the timetable solver on synthetic campuses of increasing size (no database involved) and "
+        "report how many lessons the greedy pass left over, whether the result is complete and clash-free, "
+        "its soft cost (lessons beyond a subject's fair share of a day) and the time taken."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--classes', type=int, nargs='+', default=[10, 25, 50, 100], help='Campus sizes to run.')
+        parser.add_argument('--subjects', type=int, default=8, help='Subjects per class.')
+        parser.add_argument('--days', type=int, default=5)
+        parser.add_argument('--periods', type=int, default=8, help='Periods per day.')
+        parser.add_argument('--fill', type=float, default=0.9, help='Share of the week each class has lessons.')
+        parser.add_argument('--load', type=float, default=0.8, help='Share of the week a teacher teaches at most.')
+        parser.add_argument('--unavailable', type=float, default=0.1, help='Share of the week each teacher is away.')
+        parser.add_argument('--time-limit', type=float, default=10.0, help='Solver time limit per campus, in seconds.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the report as JSON to this path.')
+
+    def handle(self, *args, **options):
+        if options['fill'] > 1 or options['load'] + options['unavailable'] > 1:
+            raise CommandError("--fill and --load + --unavailable must not exceed 1.")
+
+        results = []
+        self.stdout.write(
+            f"{'classes':>8}{'teachers':>10}{'lessons':>9}{'greedy left':>13}{'unplaced':>10}"
+            f"{'clashes':>9}{'soft cost':>11}{'seconds':>10}"
+        )
+        for classes in options['classes']:
+            lessons, blocked = synthetic_campus(
+                classes, options['subjects'], options['days'], options['periods'],
+                options['fill'], options['load'], options['unavailable'], options['seed'],
+            )
+            solver = TimetableSolver(lessons, options['days'], options['periods'], blocked, seed=options['seed'])
+            solver.solve(options['time_limit'])
+            stats = solver.stats
+            result = {
+                'classes': classes,
+                'teachers': len(blocked),
+                'lessons': len(lessons),
+                'clashes': clashes(solver.assignments(), blocked, options['periods']),
+                **stats,
+            }
+            results.append(result)
+            self.stdout.write(
+                f"{classes:>8}{result['teachers']:>10}{len(lessons):>9}{stats['greedy_unplaced']:>13}{stats['unplaced']:>10}"
+                f"{result['clashes']:>9}{stats['soft_cost']:>11}{stats['seconds']:>10.3f}"
+            )
+
+        if options['output']:
+            report = {'options': {key: options[key] for key in ('subjects', 'days', 'periods', 'fill', 'load', 'unavailable', 'time_limit', 'seed')}, 'campuses': results}
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from student_performance.refresh_queue import drain_processed_marks_queue, DEFAULT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Recalculate ProcessedMarks for every (student, class, term) key in the refresh queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Keys recalculated per transaction.')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the queue instead of exiting once it is empty.')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to wait between polls when looping.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = 0
+
+        while True:
+            processed = drain_processed_marks_queue(batch_size=batch_size)
+            total += processed
+
+            if processed:
+                continue
+            if not options['loop']:
+                break
+
+            close_old_connections()
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {total} queued ProcessedMarks key(s)."))
@@ -0,0 +1,197 @@
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from administrator.models import AcademicYear
+from school.models import School, Campus
+from student_performance.get_position_suffix import get_position_suffix
+from student_performance.models import (
+    Assessment, AssessmentName, Class, ClassEnrollment, ClassSubject, StudentParentRelation, Subject,
+    TeacherLevelClass, Terms
+)
+from student_performance.performance_summary import refresh_class_performance_summary
+from student_performance.utils import rank_processed_marks, recompute_processed_marks
+from user_auth.models import Role, User
+
+# (assessment name, total marks) cycled through when generating assessments
+ASSESSMENT_TYPES = [
+    ('Exercise', Decimal('20')),
+    ('Assignment', Decimal('20')),
+    ('Mid Term Exams', Decimal('100')),
+    ('Final Exams', Decimal('100')),
+]
+BATCH_SIZE = 2000
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic multi-school dataset (schools, campuses, staff, classes, students, parents, assessments) "
+        "for benchmarking. The same --seed always produces the same dataset; pass --flush to regenerate it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schools', type=int, default=3)
+        parser.add_argument('--campuses', type=int, default=2, help='Campuses per school.')
+        parser.add_argument('--classes', type=int, default=4, help='Classes per campus.')
+        parser.add_argument('--students', type=int, default=30, help='Students per class.')
+        parser.add_argument('--subjects', type=int, default=6, help='Subjects per campus, all taught in every class.')
+        parser.add_argument('--terms', type=int, default=2, help='Terms per campus.')
+        parser.add_argument('--assessments', type=int, default=4, help='Assessments per student, subject and term.')
+        parser.add_argument('--children-per-parent', type=int, default=2, help='Students of a class sharing one parent.')
+        parser.add_argument('--prefix', default='synthetic', help='Prefix for generated school names and emails.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--skip-results', action='store_true', help='Do not compute ProcessedMarks and performance summaries.')
+        parser.add_argument('--flush', action='store_true', help='Delete previously generated schools with the same prefix first.')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.options = options
+        self.prefix = options['prefix']
+        self.password = make_password(None)  # Unusable password; hashing per user would dominate the run
+        started = time.perf_counter()
+
+        if options['flush']:
+            deleted, _ = School.objects.filter(subdomain__startswith=f"{self.prefix}-").delete()
+            self.stdout.write(f"Deleted {deleted} previously generated row(s).")
+
+        self.roles = {name: self.get_role(name) for name in ['Student', 'Teacher', 'Parent', 'Headmaster', 'Admin']}
+        self.assessment_names = [
+            (self.get_assessment_name(name), total_marks) for name, total_marks in ASSESSMENT_TYPES
+        ]
+
+        run = self.random.randrange(16 ** 6)
+        totals = {'schools': 0, 'classes': 0, 'students': 0, 'parents': 0, 'assessments': 0}
+        for school_index in range(options['schools']):
+            with transaction.atomic():
+                school = School.objects.create(
+                    name=f"{self.prefix} school {run:06x}-{school_index}",
+                    subdomain=f"{self.prefix}-{run:06x}-{school_index}",
+                    country='Ghana', address='Synthetic address', city='Accra', postal_code='00233',
+                    num_campuses=options['campuses'],
+                )
+                for campus_index in range(options['campuses']):
+                    counts = self.generate_campus(school, campus_index)
+                    for key, value in counts.items():
+                        totals[key] += value
+            totals['schools'] += 1
+            self.stdout.write(f"Generated school {school_index + 1}/{options['schools']}: {school.subdomain}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {totals['schools']} school(s), {totals['classes']} class(es), {totals['students']} student(s), "
+            f"{totals['parents']} parent(s) and {totals['assessments']} assessment(s) in {time.perf_counter() - started:.1f}s."
+        ))
+
+    def get_role(self, name):
+        role = Role.objects.filter(name=name).first()
+        return role or Role.objects.create(name=name)
+
+    def get_assessment_name(self, name):
+        assessment_name = AssessmentName.objects.filter(
+            name=name, school__isnull=True, class_id__isnull=True, subject__isnull=True, teacher__isnull=True
+        ).first()
+        return assessment_name or AssessmentName.objects.create(name=name)
+
+    def create_users(self, school, campus, role, emails):
+        users = User.objects.bulk_create([
+            User(email=email, username=email.split('@')[0], password=self.password, school=school, campus=campus,
+                 gender='Male' if index % 2 else 'Female', email_verified=True)
+            for index, email in enumerate(emails)
+        ], batch_size=BATCH_SIZE)
+        User.roles.through.objects.bulk_create(
+            [User.roles.through(user_id=user.id, role_id=role.id) for user in users], batch_size=BATCH_SIZE
+        )
+        return users
+
+    def generate_campus(self, school, campus_index):
+        options = self.options
+        campus = Campus.objects.create(school=school, name=f"Campus {campus_index + 1}", city='Accra', address='Synthetic address')
+        academic_year = AcademicYear.objects.create(school=school, campus=campus, start_year=2025, end_year=2026, is_active=True)
+        terms = Terms.objects.bulk_create([
+            Terms(school=school, campus=campus, name=f"{get_position_suffix(index + 1)} Semester")
+            for index in range(options['terms'])
+        ])
+        subjects = Subject.objects.bulk_create([
+            Subject(school=school, campus=campus, name=f"Subject {index + 1}") for index in range(options['subjects'])
+        ])
+        classes = Class.objects.bulk_create([
+            Class(school=school, campus=campus, name=f"Class {index + 1}") for index in range(options['classes'])
+        ])
+        ClassSubject.objects.bulk_create([
+            ClassSubject(school=school, campus=campus, class_id=class_instance, subject=subject)
+            for class_instance in classes for subject in subjects
+        ], batch_size=BATCH_SIZE)
+
+        tag = f"{school.subdomain}.c{campus_index}"
+        self.create_users(school, campus, self.roles['Headmaster'], [f"headmaster.{tag}@example.com"])
+        self.create_users(school, campus, self.roles['Admin'], [f"admin.{tag}@example.com"])
+        teachers = self.create_users(
+            school, campus, self.roles['Teacher'], [f"teacher{index}.{tag}@example.com" for index in range(len(classes))]
+        )
+        teacher_level_classes = TeacherLevelClass.objects.bulk_create([
+            TeacherLevelClass(school=school, campus=campus, teacher=teacher, class_id=class_instance, is_main_teacher=True)
+            for teacher, class_instance in zip(teachers, classes)
+        ])
+        TeacherLevelClass.subjects_taught.through.objects.bulk_create([
+            TeacherLevelClass.subjects_taught.through(teacherlevelclass_id=tlc.id, subject_id=subject.id)
+            for tlc in teacher_level_classes for subject in subjects
+        ], batch_size=BATCH_SIZE)
+
+        student_count = parent_count = assessment_count = 0
+        for class_index, (class_instance, teacher) in enumerate(zip(classes, teachers)):
+            students = self.create_users(
+                school, campus, self.roles['Student'],
+                [f"student{class_index}-{index}.{tag}@example.com" for index in range(options['students'])],
+            )
+            ClassEnrollment.objects.bulk_create([
+                ClassEnrollment(school=school, campus=campus, student=student, class_id=class_instance,
+                                academic_year=academic_year, term=terms[0] if terms else None)
+                for student in students
+            ], batch_size=BATCH_SIZE)
+            student_count += len(students)
+
+            # Siblings share a parent, so some parents have several children in the class
+            children_per_parent = max(1, options['children_per_parent'])
+            families = [students[index:index + children_per_parent] for index in range(0, len(students), children_per_parent)]
+            parents = self.create_users(
+                school, campus, self.roles['Parent'],
+                [f"parent{class_index}-{index}.{tag}@example.com" for index in range(len(families))],
+            )
+            StudentParentRelation.objects.bulk_create([
+                StudentParentRelation(school=school, campus=campus, student=student, parent=parent)
+                for parent, children in zip(parents, families) for student in children
+            ], batch_size=BATCH_SIZE)
+            parent_count += len(parents)
+
+            assessments = []
+            for student in students:
+                # Each student gets a stable ability so rankings and grade bands are spread out
+                ability = self.random.uniform(0.35, 0.95)
+                for subject in subjects:
+                    for term in terms:
+                        for index in range(options['assessments']):
+                            assessment_name, total_marks = self.assessment_names[index % len(self.assessment_names)]
+                            score = min(1, max(0, self.random.gauss(ability, 0.12)))
+                            assessments.append(Assessment(
+                                school=school, campus=campus, student=student, class_id=class_instance,
+                                teacher=teacher, subject=subject, term=term, assessment_name=assessment_name,
+                                topic=f"Topic {index % 5 + 1}", total_marks=total_marks,
+                                obtained_marks=(total_marks * Decimal(score)).quantize(Decimal('0.01')),
+                            ))
+                if len(assessments) >= BATCH_SIZE:
+                    Assessment.objects.bulk_create(assessments, batch_size=BATCH_SIZE)
+                    assessment_count += len(assessments)
+                    assessments = []
+            Assessment.objects.bulk_create(assessments, batch_size=BATCH_SIZE)
+            assessment_count += len(assessments)
+
+            if not options['skip_results']:
+                for term in terms:
+                    recompute_processed_marks(class_instance.id, term.id)
+                    rank_processed_marks(class_instance.id, term.id)
+                refresh_class_performance_summary(class_instance.id)
+
+        return {'classes': len(classes), 'students': student_count, 'parents': parent_count, 'assessments': assessment_count}
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from student_performance.models import Class
+from student_performance.performance_summary import refresh_class_performance_summary
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-class, per-subject performance summaries from the Assessment table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', help='Only rebuild classes of this school id.')
+        parser.add_argument('--campus', help='Only rebuild classes of this campus id.')
+        parser.add_argument('--class-id', action='append', dest='class_ids', help='Class id to rebuild (repeatable).')
+
+    def handle(self, *args, **options):
+        classes = Class.objects.all()
+        if options['school']:
+            classes = classes.filter(school_id=options['school'])
+        if options['campus']:
+            classes = classes.filter(campus_id=options['campus'])
+        if options['class_ids']:
+            classes = classes.filter(id__in=options['class_ids'])
+
+        class_ids = list(classes.values_list('id', flat=True).order_by('id'))
+
+        # One aggregate query and one transaction per class keeps locks and memory bounded
+        rows = 0
+        for rebuilt, class_id in enumerate(class_ids, start=1):
+            rows += refresh_class_performance_summary(class_id)
+            if rebuilt % 100 == 0:
+                self.stdout.write(f"Rebuilt {rebuilt}/{len(class_ids)} class(es)...")
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} performance summary row(s) for {len(class_ids)} class(es)."))
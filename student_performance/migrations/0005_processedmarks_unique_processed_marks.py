@@ -0,0 +1,20 @@
+# Generated by Django 5.0.1 on 2026-10-17 13:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0001_initial'),
+        ('student_performance', '0004_class_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='processedmarks',
+            constraint=models.UniqueConstraint(fields=('student', 'class_id', 'term'), name='unique_processed_marks'),
+        ),
+    ]
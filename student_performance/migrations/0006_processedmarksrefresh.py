@@ -0,0 +1,29 @@
+# Generated by Django 5.0.1 on 2026-10-17 13:46
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_performance', '0005_processedmarks_unique_processed_marks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessedMarksRefresh',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('student_id', models.UUIDField()),
+                ('class_id', models.UUIDField()),
+                ('term_id', models.UUIDField(blank=True, null=True)),
+                ('queued_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='processedmarksrefresh',
+            constraint=models.UniqueConstraint(fields=('student_id', 'class_id', 'term_id'), name='unique_processed_marks_refresh'),
+        ),
+    ]
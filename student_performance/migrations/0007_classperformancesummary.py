@@ -0,0 +1,43 @@
+# Generated by Django 5.0.1 on 2026-10-17 13:52
+
+import django.db.models.deletion
+import uuid
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrator', '0001_initial'),
+        ('school', '0001_initial'),
+        ('student_performance', '0006_processedmarksrefresh'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassPerformanceSummary',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('assessment_count', models.PositiveIntegerField(default=0)),
+                ('marked_count', models.PositiveIntegerField(default=0)),
+                ('obtained_sum', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('percentage_sum', models.FloatField(default=0)),
+                ('grade_a', models.PositiveIntegerField(default=0)),
+                ('grade_b', models.PositiveIntegerField(default=0)),
+                ('grade_c', models.PositiveIntegerField(default=0)),
+                ('grade_d', models.PositiveIntegerField(default=0)),
+                ('grade_f', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('academic_year', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='administrator.academicyear')),
+                ('campus', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='campus_performance_summaries', to='school.campus')),
+                ('class_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='performance_summaries', to='student_performance.class')),
+                ('school', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='school_performance_summaries', to='school.school')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='performance_summaries', to='student_performance.subject')),
+                ('term', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='student_performance.terms')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['class_id', 'term'], name='perf_summary_class_term_idx'), models.Index(fields=['class_id', 'subject'], name='perf_summary_class_subj_idx')],
+            },
+        ),
+    ]
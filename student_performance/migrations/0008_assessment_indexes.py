@@ -0,0 +1,32 @@
+# Generated by Django 5.0.1 on 2026-10-17 13:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0001_initial'),
+        ('student_performance', '0007_classperformancesummary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assessment',
+            index=models.Index(fields=['student', 'subject', 'assessment_name', 'term'], name='assess_stu_subj_name_term_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assessment',
+            index=models.Index(fields=['student', 'class_id', 'subject', 'term'], include=('topic', 'assessment_name', 'obtained_marks', 'total_marks'), name='assess_stu_class_subj_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assessment',
+            index=models.Index(fields=['class_id', 'term', 'subject'], include=('topic', 'assessment_name', 'obtained_marks', 'total_marks'), name='assess_class_term_subj_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assessment',
+            index=models.Index(condition=models.Q(('obtained_marks__isnull', False)), fields=['class_id', 'term', 'student'], include=('subject', 'assessment_name', 'obtained_marks', 'total_marks', 'date'), name='assess_marked_class_term_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.1 on 2026-10-17 14:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0001_initial'),
+        ('student_performance', '0008_assessment_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['school', 'campus', '-created_at', '-id'], name='subject_tenant_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timetable',
+            index=models.Index(fields=['class_id', '-created_at', '-id'], name='timetable_class_created_idx'),
+        ),
+    ]
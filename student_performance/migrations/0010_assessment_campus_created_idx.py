@@ -0,0 +1,20 @@
+# Generated by Django 5.0.1 on 2026-10-17 14:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0001_initial'),
+        ('student_performance', '0009_list_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assessment',
+            index=models.Index(fields=['campus', 'created_at'], name='assess_campus_created_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.1 on 2026-10-17 14:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def remove_duplicate_no_term_rows(apps, schema_editor):
+    """Keep the most recently updated result per student and class among those without a term."""
+    ProcessedMarks = apps.get_model('student_performance', 'ProcessedMarks')
+    seen = set()
+    duplicates = []
+    rows = ProcessedMarks.objects.filter(term__isnull=True).order_by('student_id', 'class_id_id', models.F('updated_at').desc(nulls_last=True))
+    for row_id, student_id, class_id in rows.values_list('id', 'student_id', 'class_id_id'):
+        if (student_id, class_id) in seen:
+            duplicates.append(row_id)
+        seen.add((student_id, class_id))
+    ProcessedMarks.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0001_initial'),
+        ('student_performance', '0010_assessment_campus_created_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_no_term_rows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='processedmarks',
+            constraint=models.UniqueConstraint(condition=models.Q(('term__isnull', True)), fields=('student', 'class_id'), name='unique_processed_marks_no_term'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1 on 2026-10-17 14:52
+
+from django.db import migrations, models
+
+
+def remove_duplicate_no_term_keys(apps, schema_editor):
+    """Queued keys without a term are identical per student and class; keep the latest of each."""
+    ProcessedMarksRefresh = apps.get_model('student_performance', 'ProcessedMarksRefresh')
+    seen = set()
+    duplicates = []
+    rows = ProcessedMarksRefresh.objects.filter(term_id__isnull=True).order_by('student_id', 'class_id', '-queued_at')
+    for row_id, student_id, class_id in rows.values_list('id', 'student_id', 'class_id'):
+        if (student_id, class_id) in seen:
+            duplicates.append(row_id)
+        seen.add((student_id, class_id))
+    ProcessedMarksRefresh.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_performance', '0011_processedmarks_unique_no_term'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_no_term_keys, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='processedmarksrefresh',
+            constraint=models.UniqueConstraint(condition=models.Q(('term_id__isnull', True)), fields=('student_id', 'class_id'), name='unique_processed_marks_refresh_no_term'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.1 on 2026-10-17 15:15
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+def clear_summaries(apps, schema_editor):
+    """
+    Existing rows were aggregated over every teacher of a class and subject, and may hold
+    duplicates the new constraint would reject. They are derived data: the next refresh of
+    each class, or `manage.py rebuild_performance_summaries`, writes them again per teacher.
+    """
+    apps.get_model('student_performance', 'ClassPerformanceSummary').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrator', '0002_list_pagination_indexes'),
+        ('school', '0001_initial'),
+        ('student_performance', '0012_processedmarksrefresh_unique_no_term'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_summaries, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='classperformancesummary',
+            name='teacher',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='performance_summaries', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='classperformancesummary',
+            constraint=models.UniqueConstraint(models.F('class_id'), models.F('subject'), django.db.models.functions.comparison.Coalesce(django.db.models.functions.comparison.Cast('teacher', models.UUIDField()), models.Value(uuid.UUID('00000000-0000-0000-0000-000000000000'))), django.db.models.functions.comparison.Coalesce(django.db.models.functions.comparison.Cast('term', models.UUIDField()), models.Value(uuid.UUID('00000000-0000-0000-0000-000000000000'))), django.db.models.functions.comparison.Coalesce(django.db.models.functions.comparison.Cast('academic_year', models.UUIDField()), models.Value(uuid.UUID('00000000-0000-0000-0000-000000000000'))), name='unique_class_performance_summary'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 import uuid
 from django.db import models
+from django.db.models.functions import Cast, Coalesce
 from decimal import Decimal
 from django.utils import timezone
 from django.conf import settings
@@ -60,6 +61,11 @@ class Subject(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['school', 'campus', '-created_at', '-id'], name='subject_tenant_created_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -256,6 +262,34 @@ class Assessment(models.Model):
     created_at = models.DateField(auto_now_add=True, null=True, blank=True)
     updated_at = models.DateField(auto_now=True, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Per-student lookups by subject and assessment name (optionally narrowed by term)
+            models.Index(fields=['student', 'subject', 'assessment_name', 'term'], name='assess_stu_subj_name_term_idx'),
+            # Per-student topic/average aggregations within a class and subject; the included
+            # columns let Postgres answer them with an index-only scan
+            models.Index(
+                fields=['student', 'class_id', 'subject', 'term'],
+                include=['topic', 'assessment_name', 'obtained_marks', 'total_marks'],
+                name='assess_stu_class_subj_idx',
+            ),
+            # Class-wide topic averages and performance summaries for a term and subject
+            models.Index(
+                fields=['class_id', 'term', 'subject'],
+                include=['topic', 'assessment_name', 'obtained_marks', 'total_marks'],
+                name='assess_class_term_subj_idx',
+            ),
+            # ProcessedMarks recalculation only reads marked assessments of a class and term
+            models.Index(
+                fields=['class_id', 'term', 'student'],
+                include=['subject', 'assessment_name', 'obtained_marks', 'total_marks', 'date'],
+                condition=models.Q(obtained_marks__isnull=False),
+                name='assess_marked_class_term_idx',
+            ),
+            # Recent assessment activity of a campus (headmaster dashboard)
+            models.Index(fields=['campus', 'created_at'], name='assess_campus_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.subject.name} - {self.assessment_type} - {self.term_id} - {self.date}"
 
@@ -278,10 +312,106 @@ class ProcessedMarks(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
 
+    class Meta:
+        constraints = [
+            # One result per student, class and term; lets recalculations upsert in bulk
+            models.UniqueConstraint(fields=['student', 'class_id', 'term'], name='unique_processed_marks'),
+            # NULLs are distinct in the constraint above, so results without a term need their own
+            models.UniqueConstraint(
+                fields=['student', 'class_id'], condition=models.Q(term__isnull=True), name='unique_processed_marks_no_term',
+            ),
+        ]
+
     def __str__(self):
         return f"{self.student.username} - {self.class_id.name} - {self.semester}"
 
 
+class ProcessedMarksRefresh(models.Model):
+    """
+    Dirty (student, class, term) keys waiting for their ProcessedMarks to be recalculated.
+    Plain UUIDs are stored rather than foreign keys so keys queued by a cascade delete
+    can still be written after the referenced rows are gone.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    student_id = models.UUIDField()
+    class_id = models.UUIDField()
+    term_id = models.UUIDField(null=True, blank=True)
+    queued_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student_id', 'class_id', 'term_id'], name='unique_processed_marks_refresh'),
+            # Coalesces keys of assessments without a term, which the constraint above lets through
+            models.UniqueConstraint(
+                fields=['student_id', 'class_id'], condition=models.Q(term_id__isnull=True),
+                name='unique_processed_marks_refresh_no_term',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} - {self.class_id} - {self.term_id} (queued {self.queued_at})"
+
+
+def _summary_key_part(field):
+    # NULLs never conflict in a unique index, so the nullable parts of the key are compared
+    # as the nil UUID; one constraint then covers rows with and without a term/year/teacher.
+    # The cast gives both sides of the COALESCE the same type
+    return Coalesce(Cast(field, models.UUIDField()), models.Value(uuid.UUID(int=0)))
+
+
+class ClassPerformanceSummary(models.Model):
+    """
+    Pre-aggregated assessment marks per class, subject, teacher, term and academic year.
+    Kept up to date by the ProcessedMarks refresh queue and rebuilt with the
+    `rebuild_performance_summaries` command, so class and teacher performance
+    reports never have to scan the raw Assessment table.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    school = models.ForeignKey(School, on_delete=models.CASCADE, related_name='school_performance_summaries', null=True, blank=True)
+    campus = models.ForeignKey(Campus, on_delete=models.CASCADE, related_name='campus_performance_summaries', null=True, blank=True)
+    class_id = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='performance_summaries')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='performance_summaries')
+    teacher = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='performance_summaries', null=True, blank=True
+    )  # The teacher who recorded the assessments
+    term = models.ForeignKey(Terms, on_delete=models.CASCADE, null=True, blank=True)
+    academic_year = models.ForeignKey(AcademicYear, on_delete=models.CASCADE, null=True, blank=True)
+    assessment_count = models.PositiveIntegerField(default=0)
+    marked_count = models.PositiveIntegerField(default=0)  # Assessments with obtained_marks recorded
+    obtained_sum = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    percentage_sum = models.FloatField(default=0)  # Sum of obtained_marks / total_marks * 100
+    # Histogram of obtained_marks using the class performance grade bands
+    grade_a = models.PositiveIntegerField(default=0)  # >= 80
+    grade_b = models.PositiveIntegerField(default=0)  # 70 - 79
+    grade_c = models.PositiveIntegerField(default=0)  # 60 - 69
+    grade_d = models.PositiveIntegerField(default=0)  # 50 - 59
+    grade_f = models.PositiveIntegerField(default=0)  # < 50
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['class_id', 'term'], name='perf_summary_class_term_idx'),
+            models.Index(fields=['class_id', 'subject'], name='perf_summary_class_subj_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                'class_id', 'subject', _summary_key_part('teacher'), _summary_key_part('term'),
+                _summary_key_part('academic_year'), name='unique_class_performance_summary',
+            ),
+        ]
+
+    @property
+    def mean_score(self):
+        return self.obtained_sum / self.marked_count if self.marked_count else None
+
+    @property
+    def mean_percentage(self):
+        return self.percentage_sum / self.marked_count if self.marked_count else None
+
+    def __str__(self):
+        return f"{self.class_id_id} - {self.subject_id} - {self.teacher_id} - {self.term_id} - {self.academic_year_id}"
+
+
 class SubjectPerformance(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     school = models.ForeignKey(School, on_delete=models.CASCADE, related_name='school_subject_performance', null=True, blank=True)
@@ -372,5 +502,10 @@ class TimeTable(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['class_id', '-created_at', '-id'], name='timetable_class_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.class_id.name} - {self.subject.name} on {self.day}"
\ No newline at end of file
@@ -0,0 +1,117 @@
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, ExpressionWrapper, F, FloatField, IntegerField, OuterRef, Q, Subquery, Sum, When
+from django.db.models.functions import Coalesce, ExtractMonth, ExtractYear
+from django.db.models.lookups import GreaterThanOrEqual
+
+from administrator.models import AcademicYear
+from .models import Assessment, Class, ClassPerformanceSummary
+
+logger = logging.getLogger(__name__)
+
+# Grade bands on obtained_marks, matching the class performance report
+GRADE_BANDS = {
+    'grade_a': Q(obtained_marks__gte=80),
+    'grade_b': Q(obtained_marks__gte=70, obtained_marks__lt=80),
+    'grade_c': Q(obtained_marks__gte=60, obtained_marks__lt=70),
+    'grade_d': Q(obtained_marks__gte=50, obtained_marks__lt=60),
+    'grade_f': Q(obtained_marks__lt=50),
+}
+
+
+def _term_filter(term_ids):
+    """Q matching the given term ids, where None matches rows without a term."""
+    term_filter = Q(term_id__in=[term_id for term_id in term_ids if term_id is not None])
+    if None in term_ids:
+        term_filter |= Q(term__isnull=True)
+    return term_filter
+
+
+def assessment_academic_year():
+    """
+    Academic year an assessment belongs to, from its own date (or the day it was recorded):
+    the year starting in the date's calendar year from ACADEMIC_YEAR_START_MONTH on, the
+    previous one before that. The school's and campus's own year wins over a shared one.
+    Going by the date keeps a repeater's assessments from last year in last year.
+    """
+    day = Coalesce(OuterRef('date'), OuterRef('created_at'))
+    start_year = Case(
+        When(GreaterThanOrEqual(ExtractMonth(day), settings.ACADEMIC_YEAR_START_MONTH), then=ExtractYear(day)),
+        default=ExtractYear(day) - 1,
+        output_field=IntegerField(),
+    )
+    years = AcademicYear.objects.filter(
+        Q(school_id=OuterRef('school_id')) | Q(school__isnull=True),
+        Q(campus_id=OuterRef('campus_id')) | Q(campus__isnull=True),
+        start_year=start_year,
+    ).order_by(F('school_id').asc(nulls_last=True), F('campus_id').asc(nulls_last=True))
+    return Subquery(years.values('id')[:1])
+
+
+def aggregate_class_performance(class_id, term_ids=None):
+    """
+    Aggregate a class's assessments by subject, teacher, term and academic year in one query.
+    `term_ids` limits the aggregation to those terms (None in the list matches
+    assessments without a term); by default every term is aggregated.
+    """
+    assessments = Assessment.objects.filter(class_id=class_id)
+    if term_ids is not None:
+        assessments = assessments.filter(_term_filter(term_ids))
+
+    percentage = Case(
+        When(
+            obtained_marks__isnull=False, total_marks__gt=0,
+            then=ExpressionWrapper(F('obtained_marks') * 100.0 / F('total_marks'), output_field=FloatField()),
+        ),
+        output_field=FloatField(),
+    )
+    return assessments.annotate(summary_academic_year=assessment_academic_year()).values(
+        'subject_id', 'teacher_id', 'term_id', 'summary_academic_year'
+    ).annotate(
+        assessment_count=Count('id'),
+        marked_count=Count('obtained_marks'),
+        obtained_sum=Sum('obtained_marks'),
+        percentage_sum=Sum(percentage),
+        **{band: Count('id', filter=condition) for band, condition in GRADE_BANDS.items()},
+    ).order_by()
+
+
+def refresh_class_performance_summary(class_id, term_ids=None):
+    """
+    Replace the summary rows of a class (optionally only some terms) with a fresh
+    aggregate. Returns the number of summary rows written.
+    """
+    with transaction.atomic():
+        # Lock the class so concurrent refreshes of the same class cannot interleave
+        class_instance = Class.objects.select_for_update().filter(id=class_id).values('school_id', 'campus_id').first()
+        summaries = ClassPerformanceSummary.objects.filter(class_id=class_id)
+        if term_ids is not None:
+            summaries = summaries.filter(_term_filter(term_ids))
+        summaries.delete()
+
+        if not class_instance:
+            return 0
+
+        rows = [
+            ClassPerformanceSummary(
+                school_id=class_instance['school_id'],
+                campus_id=class_instance['campus_id'],
+                class_id_id=class_id,
+                subject_id=row['subject_id'],
+                teacher_id=row['teacher_id'],
+                term_id=row['term_id'],
+                academic_year_id=row['summary_academic_year'],
+                assessment_count=row['assessment_count'],
+                marked_count=row['marked_count'],
+                obtained_sum=row['obtained_sum'] or 0,
+                percentage_sum=row['percentage_sum'] or 0,
+                **{band: row[band] for band in GRADE_BANDS},
+            )
+            for row in aggregate_class_performance(class_id, term_ids)
+        ]
+        ClassPerformanceSummary.objects.bulk_create(rows, batch_size=500)
+
+    logger.debug(f"Refreshed {len(rows)} performance summary row(s) for class {class_id}")
+    return len(rows)
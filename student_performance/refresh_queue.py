@@ -0,0 +1,183 @@
+import logging
+import operator
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import reduce
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ProcessedMarksRefresh, Class
+from .utils import recompute_processed_marks, rank_processed_marks
+from .performance_summary import refresh_class_performance_summary
+from user_auth.models import User
+
+logger = logging.getLogger(__name__)
+
+SYNC = 'sync'
+THREAD = 'thread'
+WORKER = 'worker'
+
+DEFAULT_BATCH_SIZE = 500
+
+_local = threading.local()
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='processed-marks-refresh')
+_drain_lock = threading.Lock()
+_drain_scheduled = False
+
+
+def get_refresh_mode():
+    return getattr(settings, 'PROCESSED_MARKS_REFRESH_MODE', THREAD)
+
+
+def _pending_keys():
+    if not hasattr(_local, 'keys'):
+        _local.keys = set()
+    return _local.keys
+
+
+def enqueue_processed_marks_refresh(keys):
+    """
+    Mark (student_id, class_id, term_id) keys as dirty.
+
+    Keys are collected per thread and written to the queue once the surrounding
+    transaction commits, so saving the same student's marks many times in one
+    request queues a single recalculation.
+    """
+    keys = {key for key in keys if key[0] and key[1]}
+    if not keys:
+        return
+
+    if get_refresh_mode() == SYNC:
+        _recompute(keys)
+        return
+
+    # Every call registers a flush; the first one to run empties the buffer and the rest are no-ops.
+    # Keys left behind by a rolled back transaction are harmless and go out with the next flush.
+    _pending_keys().update(keys)
+    transaction.on_commit(_flush_pending_keys)
+
+
+def _flush_pending_keys():
+    pending = _pending_keys()
+    keys = list(pending)
+    pending.clear()
+    if not keys:
+        return
+
+    queued_at = timezone.now()
+    entries = [
+        ProcessedMarksRefresh(student_id=student_id, class_id=class_id, term_id=term_id, queued_at=queued_at)
+        for student_id, class_id, term_id in keys
+    ]
+    # Re-queueing an existing key only moves its timestamp forward, which stops an in-flight
+    # drain (that claimed the key earlier) from deleting it before the new change is applied.
+    with transaction.atomic():
+        ProcessedMarksRefresh.objects.bulk_create(
+            [entry for entry in entries if entry.term_id is not None],
+            update_conflicts=True,
+            unique_fields=['student_id', 'class_id', 'term_id'],
+            update_fields=['queued_at'],
+        )
+        # NULL terms never conflict on the key above; unique_processed_marks_refresh_no_term
+        # turns them into ignored duplicates, whose timestamp is then moved forward
+        no_term = [entry for entry in entries if entry.term_id is None]
+        if no_term:
+            ProcessedMarksRefresh.objects.bulk_create(no_term, ignore_conflicts=True)
+            ProcessedMarksRefresh.objects.filter(
+                reduce(operator.or_, (Q(student_id=entry.student_id, class_id=entry.class_id) for entry in no_term)),
+                term_id__isnull=True,
+            ).update(queued_at=queued_at)
+    logger.debug(f"Queued {len(keys)} ProcessedMarks refresh key(s)")
+
+    if get_refresh_mode() == THREAD:
+        schedule_drain()
+
+
+def schedule_drain():
+    """
+    Schedule a background drain after PROCESSED_MARKS_REFRESH_DELAY seconds.
+    Only one drain is pending at a time, so bursts of writes are coalesced.
+    """
+    global _drain_scheduled
+    with _drain_lock:
+        if _drain_scheduled:
+            return
+        _drain_scheduled = True
+    _executor.submit(_delayed_drain)
+
+
+def _delayed_drain():
+    global _drain_scheduled
+    time.sleep(getattr(settings, 'PROCESSED_MARKS_REFRESH_DELAY', 2))
+    with _drain_lock:
+        _drain_scheduled = False
+    try:
+        close_old_connections()
+        while drain_processed_marks_queue():
+            pass
+    except Exception as e:
+        logger.error(f"Error draining ProcessedMarks refresh queue: {str(e)}")
+    finally:
+        close_old_connections()
+
+
+def _recompute(keys):
+    """
+    Recompute keys grouped by (class, term) so each group costs one engine run,
+    then re-rank the class since any student's total can move everyone's position,
+    and refresh the class performance summary for the term.
+    """
+    groups = defaultdict(set)
+    for student_id, class_id, term_id in keys:
+        groups[(class_id, term_id)].add(student_id)
+
+    existing_classes = set(
+        Class.objects.filter(id__in={class_id for class_id, _ in groups}).values_list('id', flat=True)
+    )
+    # Students removed since their key was queued have nothing left to recalculate,
+    # but the class summary still has to drop their assessments
+    existing_students = set(
+        User.objects.filter(id__in={student_id for student_id, _, _ in keys}).values_list('id', flat=True)
+    )
+
+    written = 0
+    for (class_id, term_id), student_ids in groups.items():
+        if class_id not in existing_classes:
+            continue
+        student_ids = sorted(student_id for student_id in student_ids if student_id in existing_students)
+        if student_ids:
+            written += recompute_processed_marks(class_id, term_id, student_ids)
+        rank_processed_marks(class_id, term_id)
+        refresh_class_performance_summary(class_id, [term_id])
+    return written
+
+
+def drain_processed_marks_queue(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Recalculate up to `batch_size` queued keys and remove them from the queue.
+    Returns the number of keys processed (0 when the queue is empty).
+    """
+    claimed_at = timezone.now()
+    with transaction.atomic():
+        entries = list(
+            ProcessedMarksRefresh.objects.select_for_update(skip_locked=True)
+            .filter(queued_at__lte=claimed_at)
+            .order_by('queued_at')[:batch_size]
+        )
+        if not entries:
+            return 0
+
+        written = _recompute({(entry.student_id, entry.class_id, entry.term_id) for entry in entries})
+
+        ProcessedMarksRefresh.objects.filter(
+            id__in=[entry.id for entry in entries],
+            queued_at__lte=claimed_at,
+        ).delete()
+
+    logger.info(f"Refreshed ProcessedMarks for {len(entries)} queued key(s), {written} row(s) written")
+    return len(entries)
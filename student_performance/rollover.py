@@ -0,0 +1,193 @@
+import logging
+import uuid
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+
+from .models import Class, ClassEnrollment, HistoricalClassEnrollment
+from administrator.models import AcademicYear
+from user_auth.models import User
+
+logger = logging.getLogger(__name__)
+
+PROMOTED = 'promoted'
+REPEATED = 'repeated'
+
+
+class RolloverError(ValueError):
+    """A rollover plan that cannot be applied, e.g. it names a class that doesn't exist."""
+
+
+def resolve_academic_year(value, school_id):
+    """AcademicYear for an id or a start year (e.g. 2024); the school's own year wins over a global one."""
+    if value in (None, ''):
+        return None
+    try:
+        return AcademicYear.objects.filter(id=uuid.UUID(str(value))).first()
+    except ValueError:
+        pass
+    try:
+        start_year = int(value)
+    except (TypeError, ValueError):
+        return None
+    return (
+        AcademicYear.objects.filter(Q(school_id=school_id) | Q(school__isnull=True), start_year=start_year)
+        .order_by(F('school_id').asc(nulls_last=True))
+        .first()
+    )
+
+
+def move_students(moves, academic_year, dry_run=False):
+    """
+    Apply {student_id: (target Class or None, status)} moves in bulk: every current enrollment
+    of those students is copied into HistoricalClassEnrollment and removed, and each student
+    with a target class gets one new enrollment with the given status. A student without a
+    target (leaving the school after the final class) is only moved into history.
+
+    Costs the same four statements however many students move: read the current enrollments,
+    insert the history rows, delete the enrollments, insert the new ones. Nothing is written
+    with `dry_run`. Must run inside a transaction.
+    """
+    current = list(
+        ClassEnrollment.objects.select_for_update()
+        .filter(student_id__in=list(moves))
+        .values_list('id', 'student_id', 'class_id', 'academic_year_id', 'term_id', 'school_id', 'campus_id')
+    )
+    history = [
+        HistoricalClassEnrollment(
+            student_id=student_id, class_enrolled_id=class_id, academic_year_id=year_id, term_id=term_id,
+            school_id=school_id, campus_id=campus_id,
+        )
+        for _, student_id, class_id, year_id, term_id, school_id, campus_id in current
+        if class_id  # Enrollments whose class was deleted have nothing to keep
+    ]
+
+    counts = {'archived': len(history), PROMOTED: 0, REPEATED: 0, 'left': 0}
+    enrollments = []
+    for student_id, (target, status) in moves.items():
+        if target is None:
+            counts['left'] += 1
+            continue
+        counts[status] += 1
+        enrollments.append(ClassEnrollment(
+            student_id=student_id, class_id=target, academic_year=academic_year, status=status,
+            school_id=target.school_id, campus_id=target.campus_id,
+        ))
+
+    if not dry_run:
+        HistoricalClassEnrollment.objects.bulk_create(history, batch_size=1000)
+        ClassEnrollment.objects.filter(id__in=[row[0] for row in current]).delete()
+        ClassEnrollment.objects.bulk_create(enrollments, batch_size=1000)
+    return counts
+
+
+def _rollover_campus(plan, classes, academic_year, dry_run):
+    """Moves for one campus; see rollover()."""
+    report = {
+        class_id: {
+            'class_id': class_id, 'class_name': classes[class_id].name,
+            'next_class_id': next_class_id, 'next_class_name': classes[next_class_id].name if next_class_id else None,
+            PROMOTED: 0, REPEATED: 0, 'left': 0, 'repeaters_not_enrolled': [],
+        }
+        for class_id, (next_class_id, _) in plan.items()
+    }
+
+    with transaction.atomic():
+        # Students currently in the classes; a student enrolled twice moves with the latest enrollment
+        enrolled = (
+            ClassEnrollment.objects.select_for_update()
+            .filter(class_id__in=list(plan))
+            .order_by('student_id', F('created_at').desc(nulls_last=True))
+            .values_list('student_id', 'class_id')
+        )
+        moves = {}
+        members = defaultdict(set)
+        for student_id, class_id in enrolled:
+            members[class_id].add(student_id)
+            if student_id in moves:
+                continue
+            next_class_id, repeaters = plan[class_id]
+            if student_id in repeaters:
+                moves[student_id] = (classes[class_id], REPEATED)
+                report[class_id][REPEATED] += 1
+            elif next_class_id:
+                moves[student_id] = (classes[next_class_id], PROMOTED)
+                report[class_id][PROMOTED] += 1
+            else:
+                moves[student_id] = (None, PROMOTED)
+                report[class_id]['left'] += 1
+
+        for class_id, (_, repeaters) in plan.items():
+            report[class_id]['repeaters_not_enrolled'] = sorted(str(student_id) for student_id in repeaters - members[class_id])
+
+        counts = move_students(moves, academic_year, dry_run=dry_run)
+    return counts, list(report.values())
+
+
+def rollover(plan, academic_year, dry_run=False):
+    """
+    Year-end rollover of many classes at once.
+
+    `plan` maps class_id -> (next_class_id or None, ids of students repeating the class).
+    Everyone currently enrolled in a class moves into history and is enrolled in the next
+    class as promoted, in the same class as repeated, or nowhere when next_class_id is None.
+
+    Classes are grouped by campus and each campus is applied in its own transaction, so a
+    failure in one campus leaves it untouched without undoing the others. Returns a report
+    per campus with the counts (what would happen, with `dry_run`).
+    """
+    class_ids = set(plan) | {next_class_id for next_class_id, _ in plan.values()} - {None}
+    classes = Class.objects.select_related('campus').in_bulk(list(class_ids))
+    missing = class_ids - set(classes)
+    if missing:
+        raise RolloverError(f"Classes not found: {sorted(str(class_id) for class_id in missing)}")
+    for class_id, (next_class_id, _) in plan.items():
+        if next_class_id and classes[next_class_id].campus_id != classes[class_id].campus_id:
+            raise RolloverError(f"Class '{classes[class_id].name}' and its next class '{classes[next_class_id].name}' are in different campuses")
+
+    by_campus = defaultdict(dict)
+    for class_id, entry in plan.items():
+        by_campus[classes[class_id].campus_id][class_id] = entry
+
+    results = []
+    for campus_id, campus_plan in by_campus.items():
+        campus = classes[next(iter(campus_plan))].campus
+        result = {'campus_id': campus_id, 'campus_name': campus.name if campus else None}
+        try:
+            counts, class_reports = _rollover_campus(campus_plan, classes, academic_year, dry_run)
+        except Exception as e:
+            logger.exception(f"Rollover of campus {campus_id} failed")
+            result.update(status='failed', error=str(e))
+        else:
+            result.update(status='dry_run' if dry_run else 'applied', counts=counts, classes=class_reports)
+            logger.info(f"Rollover of campus {campus_id} to {academic_year} ({result['status']}): {counts}")
+        results.append(result)
+    return results
+
+
+def merge_into_existing(target_class, student_ids, school_id, campus_id):
+    """
+    Turn the promoted/repeated enrollments of `student_ids` in `target_class` into existing ones.
+
+    One query checks every id and returns, in request order, those that cannot be merged:
+    'not_found' (no such student) or 'not_enrolled' (not promoted/repeated in the class).
+    If there are any, nothing changes; otherwise a single UPDATE merges all of them.
+    Returns (ineligible, number of enrollments updated).
+    """
+    enrollments = ClassEnrollment.objects.filter(
+        class_id=target_class, status__in=[PROMOTED, REPEATED], school_id=school_id, campus_id=campus_id,
+    )
+    with transaction.atomic():
+        eligible = dict(
+            User.objects.filter(id__in=student_ids, roles__name='Student')
+            .annotate(enrolled=Exists(enrollments.filter(student_id=OuterRef('pk'))))
+            .values_list('id', 'enrolled')
+        )
+        ineligible = {
+            student_id: 'not_found' if student_id not in eligible else 'not_enrolled'
+            for student_id in student_ids if not eligible.get(student_id)
+        }
+        if ineligible:
+            return ineligible, 0
+        return {}, enrollments.filter(student_id__in=student_ids).update(status='existing')
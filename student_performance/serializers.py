@@ -159,6 +159,28 @@ class StudentSerializer(serializers.ModelSerializer):
         return student
 
 
+class PromotionStudentSerializer(serializers.Serializer):
+    """
+    Student of a ClassEnrollment for the promotion review lists. Flat on purpose: expects
+    `student` and `academic_year` loaded with select_related and a `previous_class_name`
+    annotation, so serializing a class needs no further queries.
+    """
+    id = serializers.UUIDField(source='student.id', read_only=True)
+    username = serializers.CharField(source='student.username', read_only=True)
+    email = serializers.EmailField(source='student.email', read_only=True)
+    gender = serializers.CharField(source='student.gender', read_only=True)
+    date_of_birth = serializers.DateField(source='student.date_of_birth', read_only=True)
+    enrollment_id = serializers.UUIDField(source='id', read_only=True)
+    status = serializers.CharField(read_only=True)
+    academic_year = serializers.SerializerMethodField()
+    previous_class_name = serializers.CharField(read_only=True, default=None)
+
+    def get_academic_year(self, obj):
+        if obj.academic_year:
+            return f"{obj.academic_year.start_year}-{obj.academic_year.end_year}"
+        return None
+
+
 class StudentParentRelationSerializer(serializers.ModelSerializer):
     student = UserSerializer()
     parent = UserSerializer()
@@ -250,10 +272,10 @@ class AssessmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Assessment
         fields = [
-            'id', 'topic', 'assessment_type', 'term_id', 'term_name', 'total_marks', 
+            'id', 'topic', 'term_id', 'term_name', 'total_marks', 
             'obtained_marks', 'teacher_id', 'teacher_name', 'subject_id', 
             'subject_name', 'date', 'student_id', 'student_name', 
-            'class_id', 'class_name', 'assessment_name_id', 'assessment_name_display'
+            'class_id', 'class_name', 'assessment_name_id', 'assessment_name_display',
             'comments', 'school', 'campus', 'created_at', 'updated_at'
         ]
 
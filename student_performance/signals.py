@@ -1,17 +1,13 @@
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from .models import Assessment, ProcessedMarks, ClassEnrollment
-from .utils import calculate_processed_marks  # A utility function to handle calculations
+from .refresh_queue import enqueue_processed_marks_refresh
 
 @receiver(post_save, sender=Assessment)
 @receiver(post_delete, sender=Assessment)
 def update_processed_marks(sender, instance, **kwargs):
     """
-    Update or create ProcessedMarks whenever an Assessment is added, updated, or deleted.
+    Queue a ProcessedMarks refresh whenever an Assessment is added, updated, or deleted.
+    Repeated saves for the same student, class and term are coalesced into one recalculation.
     """
-    class_id = instance.class_id
-    semester = instance.semester
-    student = instance.student_id
-
-    # Recalculate processed marks for the specific student
-    calculate_processed_marks(class_id, semester, student)
+    enqueue_processed_marks_refresh([(instance.student_id, instance.class_id_id, instance.term_id)])
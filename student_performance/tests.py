@@ -1,3 +1,626 @@
-from django.test import TestCase
+import datetime
+import uuid
+from decimal import Decimal
 
-# Create your tests here.
+from unittest import mock
+
+from django.db import IntegrityError, connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from administrator.models import AcademicYear
+from school.models import Campus, School
+from user_auth.models import Role, User
+
+from .bulk_assessments import bulk_create_assessments, bulk_update_assessments
+from .models import (
+    Assessment, AssessmentName, Class, ClassEnrollment, ClassPerformanceSummary, ClassSubject, HistoricalClassEnrollment, ProcessedMarks, ProcessedMarksRefresh,
+    Subject, TeacherLevelClass, Terms, TimeTable,
+)
+from . import rollover as rollover_module
+from .performance_summary import refresh_class_performance_summary
+from .refresh_queue import _flush_pending_keys, enqueue_processed_marks_refresh
+from .rollover import merge_into_existing, move_students, rollover
+from .timetable_solver import Lesson, TimetableSolver
+from .timetables import build_class_entries, find_conflicts
+from .utils import rank_processed_marks, recompute_processed_marks
+
+
+@override_settings(PROCESSED_MARKS_REFRESH_MODE='worker')
+class SchoolTestCase(TestCase):
+    """One school, campus, class and term; students and marks are added per test."""
+
+    def setUp(self):
+        self.school = School.objects.create(name='Test School', subdomain='test', country='GH', address='-', city='Accra', postal_code='0')
+        self.campus = Campus.objects.create(school=self.school, name='Main', city='Accra', address='-')
+        self.tenancy = {'school': self.school, 'campus': self.campus}
+        self.class_instance = Class.objects.create(name='JHS 1', **self.tenancy)
+        self.term = Terms.objects.create(name='1st Semester', **self.tenancy)
+        self.subject = Subject.objects.create(name='Mathematics', **self.tenancy)
+        ClassSubject.objects.create(class_id=self.class_instance, subject=self.subject, **self.tenancy)
+        self.final_exam = AssessmentName.objects.create(name='Final Exam', **self.tenancy)
+        self.student_role = Role.objects.create(name='Student')
+
+    def create_student(self, username):
+        student = User.objects.create(username=username, email=f"{username}@test.local", **self.tenancy)
+        student.roles.add(self.student_role)
+        return student
+
+    def add_final_exam(self, student, obtained, term=None, date=None, teacher=None):
+        # bulk_create skips the post_save signal that would queue a refresh
+        Assessment.objects.bulk_create([Assessment(
+            student=student, class_id=self.class_instance, subject=self.subject, assessment_name=self.final_exam,
+            term=term, total_marks=Decimal(100), obtained_marks=Decimal(obtained), date=date, teacher=teacher,
+            **self.tenancy,
+        )])
+
+
+class ProcessedMarksTests(SchoolTestCase):
+    def test_results_without_a_term_are_upserted(self):
+        student = self.create_student('ama')
+        self.add_final_exam(student, 80)
+
+        recompute_processed_marks(self.class_instance.id, None, [student.id])
+        recompute_processed_marks(self.class_instance.id, None, [student.id])
+
+        self.assertEqual(ProcessedMarks.objects.filter(student=student, term__isnull=True).count(), 1)
+
+    def test_tenancy_comes_from_the_class(self):
+        student = self.create_student('kofi')
+        self.add_final_exam(student, 60, term=self.term)
+        recompute_processed_marks(self.class_instance.id, self.term.id, [student.id])
+
+        # With no marks left the result is kept, still in the class's school and campus
+        Assessment.objects.filter(student=student).delete()
+        recompute_processed_marks(self.class_instance.id, self.term.id, [student.id])
+
+        result = ProcessedMarks.objects.get(student=student, term=self.term)
+        self.assertEqual((result.school_id, result.campus_id), (self.school.id, self.campus.id))
+        self.assertEqual(result.total_score, Decimal('0.00'))
+
+
+class RankingTests(SchoolTestCase):
+    def setUp(self):
+        super().setUp()
+        self.students = [self.create_student(username) for username in ('abena', 'akua', 'kwame')]
+        for student, obtained in zip(self.students, (80, 80, 60)):
+            self.add_final_exam(student, obtained, term=self.term)
+        recompute_processed_marks(self.class_instance.id, self.term.id, [student.id for student in self.students])
+        self.url = reverse('class_ranking', args=[self.class_instance.id, self.term.id])
+
+    def test_tied_totals_share_a_position(self):
+        rank_processed_marks(self.class_instance.id, self.term.id)
+
+        positions = dict(ProcessedMarks.objects.filter(term=self.term).values_list('student__username', 'position'))
+        self.assertEqual(positions, {'abena': '1st', 'akua': '1st', 'kwame': '3rd'})
+
+    def test_students_only_see_their_own_row(self):
+        client = APIClient()
+        client.force_authenticate(self.students[2])
+
+        response = client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(row['student_id'], row['position']) for row in response.data], [(self.students[2].id, '3rd')])
+
+    def test_only_staff_write_positions(self):
+        client = APIClient()
+        client.force_authenticate(self.students[0])
+        self.assertEqual(client.post(self.url).status_code, 403)
+
+        teacher = User.objects.create(username='teacher', email='teacher@test.local', **self.tenancy)
+        teacher.roles.add(Role.objects.create(name='Teacher'))
+        client.force_authenticate(teacher)
+        response = client.post(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['changed'], 3)
+
+
+class BulkUpdateAssessmentTests(SchoolTestCase):
+    def setUp(self):
+        super().setUp()
+        self.teacher = User.objects.create(username='teacher', email='teacher@test.local', **self.tenancy)
+        assignment = TeacherLevelClass.objects.create(teacher=self.teacher, class_id=self.class_instance, **self.tenancy)
+        assignment.subjects_taught.add(self.subject)
+        # Taught in the class, but not by this teacher
+        self.science = Subject.objects.create(name='Science', **self.tenancy)
+        self.students = [self.create_student(f"student{index}") for index in range(6)]
+        for student in self.students:
+            self.add_final_exam(student, 50, term=self.term)
+        self.assessments = {assessment.student_id: assessment for assessment in Assessment.objects.all()}
+
+    def correction(self, student, obtained, subject=None):
+        return {
+            'assessment_id': str(self.assessments[student.id].id), 'class_id': str(self.class_instance.id),
+            'subject': str((subject or self.subject).id), 'student': str(student.id),
+            'school': str(self.school.id), 'campus': str(self.campus.id), 'obtained_marks': obtained,
+        }
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        # Assessments, campuses prefetch, classes, subjects, students, assignments, savepoint, bulk_update, release
+        for students in (self.students[:2], self.students):
+            with self.assertNumQueries(9), mock.patch('student_performance.bulk_assessments.enqueue_processed_marks_refresh'):
+                updated, errors = bulk_update_assessments(self.teacher, [self.correction(student, 75) for student in students])
+            self.assertEqual((len(updated), errors), (len(students), []))
+
+        self.assertEqual(set(Assessment.objects.values_list('obtained_marks', flat=True)), {Decimal(75)})
+
+    def test_unassigned_subject_is_rejected(self):
+        updated, errors = bulk_update_assessments(self.teacher, [
+            self.correction(self.students[0], 60, subject=self.science),
+            self.correction(self.students[1], 60),
+        ])
+
+        self.assertEqual([assessment.student_id for assessment in updated], [self.students[1].id])
+        self.assertEqual(len(errors), 1)
+        self.assertIn('not assigned', errors[0]['detail'])
+        self.assertEqual(Assessment.objects.get(student=self.students[0]).subject, self.subject)
+
+    def test_refresh_is_enqueued_once_for_every_touched_key(self):
+        with mock.patch('student_performance.bulk_assessments.enqueue_processed_marks_refresh') as enqueue:
+            bulk_update_assessments(self.teacher, [self.correction(student, 65) for student in self.students[:3]])
+
+        enqueue.assert_called_once_with({
+            (student.id, self.class_instance.id, self.term.id) for student in self.students[:3]
+        })
+
+
+class PerformanceSummaryTests(SchoolTestCase):
+    @override_settings(ACADEMIC_YEAR_START_MONTH=9)
+    def test_repeaters_assessments_stay_in_their_year(self):
+        last_year = AcademicYear.objects.create(start_year=2024, end_year=2025, **self.tenancy)
+        this_year = AcademicYear.objects.create(start_year=2025, end_year=2026, is_active=True, **self.tenancy)
+        student = self.create_student('adjoa')
+        # Repeating the class: the only enrollment left is this year's
+        ClassEnrollment.objects.create(student=student, class_id=self.class_instance, academic_year=this_year, **self.tenancy)
+        self.add_final_exam(student, 40, term=self.term, date=datetime.date(2025, 3, 14))
+        self.add_final_exam(student, 70, term=self.term, date=datetime.date(2025, 11, 20))
+
+        refresh_class_performance_summary(self.class_instance.id)
+
+        summaries = ClassPerformanceSummary.objects.filter(class_id=self.class_instance)
+        self.assertEqual(
+            dict(summaries.values_list('academic_year_id', 'obtained_sum')),
+            {last_year.id: Decimal(40), this_year.id: Decimal(70)},
+        )
+
+    @override_settings(ACADEMIC_YEAR_START_MONTH=9)
+    def test_summaries_are_kept_per_teacher(self):
+        current, previous = (User.objects.create(username=name, email=f"{name}@test.local", **self.tenancy) for name in ('owusu', 'mensah'))
+        assignment = TeacherLevelClass.objects.create(teacher=current, class_id=self.class_instance, **self.tenancy)
+        assignment.subjects_taught.add(self.subject)
+        year = AcademicYear.objects.create(start_year=2025, end_year=2026, **self.tenancy)
+        student = self.create_student('efua')
+        self.add_final_exam(student, 90, term=self.term, date=datetime.date(2025, 11, 3), teacher=current)
+        self.add_final_exam(student, 30, term=self.term, date=datetime.date(2025, 11, 3), teacher=previous)
+
+        refresh_class_performance_summary(self.class_instance.id)
+
+        summaries = ClassPerformanceSummary.objects.filter(class_id=self.class_instance)
+        self.assertEqual(dict(summaries.values_list('teacher_id', 'obtained_sum')), {current.id: Decimal(90), previous.id: Decimal(30)})
+
+        client = APIClient()
+        client.force_authenticate(current)
+        response = client.get(reverse('get-teachers-performance', args=[self.class_instance.id, self.subject.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['teacher'], 'owusu')
+        self.assertEqual(response.data['performance_data'], {str(year.id): {'1st Semester': 90.0, '2nd Semester': None}})
+
+    def test_summary_key_is_unique_without_a_term(self):
+        key = {'class_id': self.class_instance, 'subject': self.subject, **self.tenancy}
+        ClassPerformanceSummary.objects.create(**key)
+
+        with self.assertRaises(IntegrityError):
+            ClassPerformanceSummary.objects.create(**key)
+
+
+class RefreshQueueTests(SchoolTestCase):
+    def test_keys_without_a_term_are_coalesced(self):
+        student = self.create_student('esi')
+        key = (student.id, self.class_instance.id, None)
+
+        for _ in range(2):
+            enqueue_processed_marks_refresh({key})
+            _flush_pending_keys()
+
+        self.assertEqual(ProcessedMarksRefresh.objects.filter(student_id=student.id, term_id__isnull=True).count(), 1)
+
+
+class BulkAssessmentTests(SchoolTestCase):
+    def setUp(self):
+        super().setUp()
+        self.teacher = User.objects.create(username='teacher', email='teacher@test.local', **self.tenancy)
+        assignment = TeacherLevelClass.objects.create(teacher=self.teacher, class_id=self.class_instance, **self.tenancy)
+        assignment.subjects_taught.add(self.subject)
+        self.student = self.create_student('yaw')
+
+    def payload(self, **fields):
+        return {
+            'class_id': str(self.class_instance.id), 'subject': str(self.subject.id), 'total_marks': 100,
+            'assessment_name': str(self.final_exam.id), 'term': str(self.term.id),
+            'student_marks': [{'id': str(self.student.id), 'obtained_marks': 70}], **fields,
+        }
+
+    def test_other_schools_names_and_terms_are_rejected(self):
+        other_school = School.objects.create(name='Other School', subdomain='other', country='GH', address='-', city='Kumasi', postal_code='0')
+        other_term = Terms.objects.create(name='1st Semester', school=other_school)
+        other_name = AssessmentName.objects.create(name='Final Exam', school=other_school)
+
+        created, errors = bulk_create_assessments(self.teacher, [
+            self.payload(term=str(other_term.id)),
+            self.payload(assessment_name=str(other_name.id)),
+            self.payload(),
+        ])
+
+        self.assertEqual(len(created), 1)
+        self.assertEqual(len(errors), 2)
+        self.assertFalse(Assessment.objects.filter(term=other_term).exists())
+
+    def test_invalid_date_is_a_row_error(self):
+        created, errors = bulk_create_assessments(self.teacher, [
+            self.payload(date='2024-02-30'),
+            self.payload(date='yesterday'),
+            self.payload(date='2024-02-28'),
+        ])
+
+        self.assertEqual([str(assessment.date) for assessment in created], ['2024-02-28'])
+        self.assertEqual(len(errors), 2)
+
+
+class RolloverTestCase(SchoolTestCase):
+    """JHS 1 -> JHS 2, and a final JHS 3 class, with students enrolled for 2024/2025."""
+
+    def setUp(self):
+        super().setUp()
+        self.last_year = AcademicYear.objects.create(school=self.school, start_year=2024, end_year=2025)
+        self.year = AcademicYear.objects.create(school=self.school, start_year=2025, end_year=2026)
+        self.jhs2 = Class.objects.create(name='JHS 2', **self.tenancy)
+        self.jhs3 = Class.objects.create(name='JHS 3', **self.tenancy)
+        self.ama, self.kofi, self.esi = (self.enroll(username, self.class_instance) for username in ('ama', 'kofi', 'esi'))
+        self.yaw = self.enroll('yaw', self.jhs3)
+
+    def enroll(self, student_or_username, class_instance):
+        student = student_or_username
+        if isinstance(student, str):
+            student = self.create_student(student)
+        ClassEnrollment.objects.create(student=student, class_id=class_instance, academic_year=self.last_year, **self.tenancy)
+        return student
+
+    def enrollments(self):
+        return set(ClassEnrollment.objects.values_list('student__username', 'class_id__name', 'status'))
+
+
+class RolloverTests(RolloverTestCase):
+    def test_students_are_promoted_repeated_or_leave(self):
+        not_enrolled = uuid.uuid4()
+        plan = {
+            self.class_instance.id: (self.jhs2.id, {self.kofi.id, not_enrolled}),
+            self.jhs3.id: (None, set()),
+        }
+
+        [campus] = rollover(plan, self.year)
+
+        self.assertEqual(campus['status'], 'applied')
+        self.assertEqual(campus['counts'], {'archived': 4, 'promoted': 2, 'repeated': 1, 'left': 1})
+        jhs1, jhs3 = sorted(campus['classes'], key=lambda report: report['class_name'])
+        self.assertEqual((jhs1['promoted'], jhs1['repeated'], jhs1['left'], jhs1['next_class_name']), (2, 1, 0, 'JHS 2'))
+        self.assertEqual(jhs1['repeaters_not_enrolled'], [str(not_enrolled)])
+        self.assertEqual((jhs3['promoted'], jhs3['left'], jhs3['next_class_id']), (0, 1, None))
+
+        self.assertEqual(self.enrollments(), {('ama', 'JHS 2', 'promoted'), ('esi', 'JHS 2', 'promoted'), ('kofi', 'JHS 1', 'repeated')})
+        self.assertEqual(set(ClassEnrollment.objects.values_list('academic_year', flat=True)), {self.year.id})
+        history = set(HistoricalClassEnrollment.objects.values_list('student__username', 'class_enrolled__name', 'academic_year'))
+        self.assertEqual(history, {
+            ('ama', 'JHS 1', self.last_year.id), ('kofi', 'JHS 1', self.last_year.id),
+            ('esi', 'JHS 1', self.last_year.id), ('yaw', 'JHS 3', self.last_year.id),
+        })
+
+    def test_dry_run_writes_nothing(self):
+        before = self.enrollments()
+
+        [campus] = rollover({self.class_instance.id: (self.jhs2.id, {self.kofi.id}), self.jhs3.id: (None, set())}, self.year, dry_run=True)
+
+        self.assertEqual(campus['status'], 'dry_run')
+        self.assertEqual(campus['counts'], {'archived': 4, 'promoted': 2, 'repeated': 1, 'left': 1})
+        self.assertEqual(self.enrollments(), before)
+        self.assertFalse(HistoricalClassEnrollment.objects.exists())
+
+    def test_failed_campus_leaves_the_other_campuses_applied(self):
+        annex = Campus.objects.create(school=self.school, name='Annex', city='Kumasi', address='-')
+        annex_jhs1 = Class.objects.create(name='JHS 1', school=self.school, campus=annex)
+        annex_jhs2 = Class.objects.create(name='JHS 2', school=self.school, campus=annex)
+        kwame = self.enroll('kwame', annex_jhs1)
+        move = rollover_module.move_students
+
+        def fail_for_the_annex(moves, *args, **kwargs):
+            counts = move(moves, *args, **kwargs)
+            if kwame.id in moves:
+                raise RuntimeError('deadlock detected')
+            return counts
+
+        with mock.patch.object(rollover_module, 'move_students', side_effect=fail_for_the_annex), \
+                self.assertLogs('student_performance.rollover', 'ERROR'):
+            campuses = rollover({self.class_instance.id: (self.jhs2.id, set()), annex_jhs1.id: (annex_jhs2.id, set())}, self.year)
+
+        by_name = {campus['campus_name']: campus for campus in campuses}
+        self.assertEqual(by_name['Main']['status'], 'applied')
+        self.assertEqual((by_name['Annex']['status'], by_name['Annex']['error']), ('failed', 'deadlock detected'))
+        # The annex's history rows and new enrollment were rolled back with its transaction
+        self.assertEqual(ClassEnrollment.objects.get(student=kwame).class_id, annex_jhs1)
+        self.assertEqual(set(HistoricalClassEnrollment.objects.values_list('student__username', flat=True)), {'ama', 'kofi', 'esi'})
+
+    def test_every_enrollment_of_a_student_is_archived(self):
+        self.enroll(self.ama, self.jhs3)
+
+        with transaction.atomic():
+            counts = move_students({self.ama.id: (self.jhs2, 'promoted')}, self.year)
+
+        self.assertEqual(counts['archived'], 2)
+        self.assertEqual(list(ClassEnrollment.objects.filter(student=self.ama).values_list('class_id__name', flat=True)), ['JHS 2'])
+        self.assertEqual(set(HistoricalClassEnrollment.objects.values_list('class_enrolled__name', flat=True)), {'JHS 1', 'JHS 3'})
+
+
+class RolloverViewTests(RolloverTestCase):
+    def setUp(self):
+        super().setUp()
+        self.headmaster = User.objects.create(username='head', email='head@test.local', **self.tenancy)
+        self.headmaster.roles.add(Role.objects.create(name='Headmaster'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.headmaster)
+
+    def post(self, classes, **data):
+        return self.client.post(reverse('year_rollover'), {'academic_year': 2025, 'classes': classes, **data}, format='json')
+
+    def test_rollover_is_reported_per_campus(self):
+        response = self.post([
+            {'class_id': str(self.class_instance.id), 'next_class_id': str(self.jhs2.id), 'repeat_student_ids': [str(self.kofi.id)]},
+            {'class_id': str(self.jhs3.id), 'next_class_id': None},
+        ], dry_run=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['academic_year'], response.data['dry_run']), ('2025/2026', True))
+        self.assertEqual(response.data['campuses'][0]['counts'], {'archived': 4, 'promoted': 2, 'repeated': 1, 'left': 1})
+        self.assertFalse(HistoricalClassEnrollment.objects.exists())
+
+    def test_classes_outside_the_users_campus_are_forbidden(self):
+        annex = Campus.objects.create(school=self.school, name='Annex', city='Kumasi', address='-')
+        other_school = School.objects.create(name='Other School', subdomain='other', country='GH', address='-', city='Accra', postal_code='0')
+        outside = {
+            'another campus': Class.objects.create(name='JHS 2', school=self.school, campus=annex),
+            'another school': Class.objects.create(name='JHS 2', school=other_school),
+        }
+        for label, next_class in outside.items():
+            with self.subTest(label), self.assertLogs('student_performance.views', 'WARNING'):
+                response = self.post([{'class_id': str(self.class_instance.id), 'next_class_id': str(next_class.id)}])
+                self.assertEqual(response.status_code, 403)
+        self.assertFalse(HistoricalClassEnrollment.objects.exists())
+
+    def test_invalid_plans_are_rejected(self):
+        plans = {
+            'no next_class_id': [{'class_id': str(self.class_instance.id)}],
+            'repeated class': [{'class_id': str(self.jhs3.id), 'next_class_id': None}] * 2,
+            'unknown class': [{'class_id': str(uuid.uuid4()), 'next_class_id': None}],
+        }
+        for label, classes in plans.items():
+            with self.subTest(label):
+                self.assertEqual(self.post(classes).status_code, 400)
+
+
+class PromoteAndRepeatViewTests(RolloverTestCase):
+    def setUp(self):
+        super().setUp()
+        self.teacher = User.objects.create(username='teacher', email='teacher@test.local', **self.tenancy)
+        self.teacher.roles.add(Role.objects.create(name='Teacher'))
+        TeacherLevelClass.objects.create(teacher=self.teacher, class_id=self.class_instance, **self.tenancy)
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def test_promote_skips_ids_that_are_not_students(self):
+        missing = uuid.uuid4()
+        with self.assertLogs('student_performance.views', 'WARNING') as logs:
+            response = self.client.post(reverse('promote_students'), {
+                'class_id': str(self.class_instance.id), 'new_class_id': str(self.jhs2.id), 'academic_year': str(self.year.id),
+                'student_ids': [str(self.ama.id), str(self.kofi.id), str(missing), str(self.teacher.id)],
+            }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({row['student_id'] for row in response.data['promoted_students']}, {self.ama.id, self.kofi.id})
+        self.assertEqual(len([line for line in logs.output if 'is not a student' in line]), 2)
+        self.assertEqual(self.enrollments(), {
+            ('ama', 'JHS 2', 'promoted'), ('kofi', 'JHS 2', 'promoted'), ('esi', 'JHS 1', 'existing'), ('yaw', 'JHS 3', 'existing'),
+        })
+        self.assertEqual(HistoricalClassEnrollment.objects.count(), 2)
+
+    def test_repeat_moves_every_enrollment_into_history(self):
+        self.enroll(self.esi, self.jhs3)
+
+        response = self.client.post(reverse('repeat_students'), {
+            'class_id': str(self.class_instance.id), 'academic_year': 2025, 'student_ids': [str(self.esi.id)],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(ClassEnrollment.objects.filter(student=self.esi).values_list('class_id__name', 'status', 'academic_year')), [
+            ('JHS 1', 'repeated', self.year.id),
+        ])
+        self.assertEqual(HistoricalClassEnrollment.objects.filter(student=self.esi).count(), 2)
+
+    def test_unknown_class_or_year(self):
+        data = {'class_id': str(self.class_instance.id), 'academic_year': 2025, 'student_ids': [str(self.esi.id)]}
+        self.assertEqual(self.client.post(reverse('repeat_students'), {**data, 'academic_year': 1999}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(reverse('repeat_students'), {**data, 'class_id': str(uuid.uuid4())}, format='json').status_code, 404)
+        self.assertFalse(HistoricalClassEnrollment.objects.exists())
+
+
+class MergeIntoExistingTests(SchoolTestCase):
+    def setUp(self):
+        super().setUp()
+        self.teacher = User.objects.create(username='teacher', email='teacher@test.local', **self.tenancy)
+        self.teacher.roles.add(Role.objects.create(name='Teacher'))
+        TeacherLevelClass.objects.create(teacher=self.teacher, class_id=self.class_instance, **self.tenancy)
+        self.students = {}
+        for username, status in (('ama', 'promoted'), ('kofi', 'repeated'), ('esi', 'existing'), ('yaw', 'promoted')):
+            self.students[username] = self.create_student(username)
+            ClassEnrollment.objects.create(student=self.students[username], class_id=self.class_instance, status=status, **self.tenancy)
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def statuses(self):
+        return dict(ClassEnrollment.objects.values_list('student__username', 'status'))
+
+    def merge(self, *students):
+        return self.client.post(reverse('merge_promoted_repeated_students'), {
+            'class_id': str(self.class_instance.id), 'student_ids': [str(getattr(student, 'id', student)) for student in students],
+        }, format='json')
+
+    def test_all_students_are_merged_with_one_update(self):
+        ids = [self.students['ama'].id, self.students['kofi'].id]
+
+        with CaptureQueriesContext(connection) as queries:
+            ineligible, updated = merge_into_existing(self.class_instance, ids, self.school.id, self.campus.id)
+
+        self.assertEqual((ineligible, updated), ({}, 2))
+        statements = [query['sql'].split()[0] for query in queries.captured_queries]
+        self.assertEqual((statements.count('SELECT'), statements.count('UPDATE')), (1, 1))
+        self.assertEqual(self.statuses(), {'ama': 'existing', 'kofi': 'existing', 'esi': 'existing', 'yaw': 'promoted'})
+
+    def test_ineligible_students_are_reported_in_request_order(self):
+        missing = uuid.uuid4()
+        ids = [self.students['ama'].id, self.students['esi'].id, missing, self.teacher.id]
+
+        ineligible, updated = merge_into_existing(self.class_instance, ids, self.school.id, self.campus.id)
+
+        self.assertEqual(list(ineligible.items()), [
+            (self.students['esi'].id, 'not_enrolled'), (missing, 'not_found'), (self.teacher.id, 'not_found'),
+        ])
+        self.assertEqual(updated, 0)
+        self.assertEqual(self.statuses()['ama'], 'promoted')
+
+    def test_view_merges_the_students(self):
+        response = self.merge(self.students['ama'], self.students['yaw'])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.statuses(), {'ama': 'existing', 'kofi': 'repeated', 'esi': 'existing', 'yaw': 'existing'})
+
+    def test_view_rejects_ids_that_are_not_students(self):
+        response = self.merge(self.students['ama'], self.teacher, self.students['esi'])
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['error'], f"Student {self.teacher.id} not found.")
+        self.assertEqual(response.data['student_ids'], [str(self.teacher.id), str(self.students['esi'].id)])
+        self.assertEqual(self.statuses()['ama'], 'promoted')
+
+    def test_view_rejects_students_not_promoted_or_repeated_in_the_class(self):
+        jhs2 = Class.objects.create(name='JHS 2', **self.tenancy)
+        ClassEnrollment.objects.filter(student=self.students['yaw']).update(class_id=jhs2)
+
+        response = self.merge(self.students['kofi'], self.students['esi'], self.students['yaw'], uuid.uuid4())
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], f"Student {self.students['esi'].id} is not enrolled as 'promoted' or 'repeated' in this class.")
+        self.assertEqual(len(response.data['student_ids']), 3)
+        # Nothing is merged while any student fails
+        self.assertEqual(self.statuses()['kofi'], 'repeated')
+
+    def test_view_rejects_malformed_ids(self):
+        response = self.merge('not-a-uuid')
+
+        self.assertEqual(response.status_code, 400)
+
+
+class TimetableTests(SchoolTestCase):
+    def entry(self, **fields):
+        return {'subject': str(self.subject.id), 'day': 'Monday', 'startTime': '08:30', 'endTime': '09:30', **fields}
+
+    def test_legacy_lowercase_days_still_clash(self):
+        TimeTable.objects.create(
+            class_id=self.class_instance, subject=self.subject, day='monday',
+            start_time=datetime.time(8), end_time=datetime.time(9), **self.tenancy,
+        )
+
+        entries = build_class_entries(self.class_instance, [self.entry()])
+        conflicts = find_conflicts(entries, [self.class_instance.id])
+
+        self.assertEqual([(conflict['type'], conflict['conflicts_with']['day']) for conflict in conflicts], [('class', 'Monday')])
+
+    def test_other_schools_subjects_are_rejected(self):
+        other_school = School.objects.create(name='Other School', subdomain='other', country='GH', address='-', city='Kumasi', postal_code='0')
+        other_subject = Subject.objects.create(name='Mathematics', school=other_school)
+
+        with self.assertRaises(Subject.DoesNotExist):
+            build_class_entries(self.class_instance, [self.entry(subject=str(other_subject.id))])
+
+
+class TimetableSolverTests(SimpleTestCase):
+    days, periods = 2, 3
+
+    def solve(self, lessons, unavailable=None, time_limit=1):
+        solver = TimetableSolver(lessons, self.days, self.periods, unavailable)
+        unplaced = solver.solve(time_limit)
+        return unplaced, [(lesson, day * self.periods + period) for lesson, day, period in solver.assignments()]
+
+    def test_no_class_or_teacher_is_double_booked(self):
+        # Two classes filling every slot, sharing a teacher who has as many lessons as there are slots
+        lessons = (
+            [Lesson('A', 'maths', 'mensah')] * 3 + [Lesson('A', 'english', 'owusu')] * 3
+            + [Lesson('B', 'maths', 'mensah')] * 3 + [Lesson('B', 'science', 'boateng')] * 3
+        )
+
+        unplaced, placed = self.solve(lessons)
+
+        self.assertEqual(unplaced, [])
+        self.assertEqual(len(placed), len(lessons))
+        for owner in ('class_id', 'teacher_id'):
+            booked = [(getattr(lesson, owner), slot) for lesson, slot in placed]
+            self.assertEqual(len(booked), len(set(booked)), f"{owner} double-booked")
+
+    def test_blocked_slots_are_never_used(self):
+        blocked = {'mensah': {0, 1, 2, 3}}
+        lessons = [Lesson('A', 'maths', 'mensah')] * 2 + [Lesson('A', 'english', 'owusu')] * 4
+
+        unplaced, placed = self.solve(lessons, blocked)
+
+        self.assertEqual(unplaced, [])
+        self.assertEqual(sorted(slot for lesson, slot in placed if lesson.teacher_id == 'mensah'), [4, 5])
+
+    def test_infeasible_lessons_are_returned_unplaced(self):
+        # Three lessons for a teacher who is only free in two slots
+        blocked = {'mensah': {0, 1, 2, 3}}
+        lessons = [Lesson('A', 'maths', 'mensah'), Lesson('B', 'maths', 'mensah'), Lesson('C', 'maths', 'mensah')]
+
+        unplaced, placed = self.solve(lessons, blocked, time_limit=0.2)
+
+        self.assertEqual(len(unplaced), 1)
+        self.assertEqual(sorted(slot for _, slot in placed), [4, 5])
+        self.assertNotIn(lessons[unplaced[0]], [lesson for lesson, _ in placed])
+
+
+class TimetableGeneratorTests(SchoolTestCase):
+    def setUp(self):
+        super().setUp()
+        admin = User.objects.create(username='admin', email='admin@test.local', **self.tenancy)
+        admin.roles.add(Role.objects.create(name='Admin'))
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+
+    def generate(self, **fields):
+        return self.client.post(reverse('generate_timetable'), {
+            'campus_id': str(self.campus.id), 'dry_run': True,
+            'periods': [{'startTime': '08:00', 'endTime': '09:00'}, {'startTime': '09:00', 'endTime': '10:00'}],
+            'requirements': [{'class_id': str(self.class_instance.id), 'subject': str(self.subject.id), 'periods': 3}],
+            **fields,
+        }, format='json')
+
+    def test_periods_beyond_the_week_are_rejected(self):
+        requirement = {'class_id': str(self.class_instance.id), 'subject': str(self.subject.id)}
+
+        for periods in (0, 11, 10 ** 9):
+            self.assertEqual(self.generate(requirements=[{**requirement, 'periods': periods}]).status_code, 400)
+        self.assertEqual(self.generate(requirements=[{**requirement, 'periods': 6}] * 2).status_code, 400)
+
+    def test_time_limit_must_be_positive_and_finite(self):
+        for time_limit in (-1, 'nan', 'inf'):
+            self.assertEqual(self.generate(time_limit=time_limit).status_code, 400)
+        self.assertEqual(self.generate(time_limit=0.5).status_code, 200)
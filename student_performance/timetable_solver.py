@@ -0,0 +1,280 @@
+import math
+import random
+import time
+from collections import defaultdict, deque, namedtuple
+
+Lesson = namedtuple('Lesson', ['class_id', 'subject_id', 'teacher_id'])
+
+FREE = -1
+
+
+class TimetableSolver:
+    """
+    Places a campus's weekly lessons into (day, period) slots.
+
+    Hard constraints: a class has at most one lesson per slot, a teacher teaches at most one
+    lesson per slot and never in a slot they are unavailable (`unavailable` maps a teacher to
+    slot numbers, day * periods + period). Soft: the lessons of a subject are spread over the
+    week, a class gets at most ceil(lessons / days) of a subject on one day.
+
+    solve() works in three steps, all within `time_limit` seconds:
+    1. greedy: lessons whose teacher has the fewest free slots go first, each into the free
+       slot that adds the least soft cost;
+    2. repair: lessons left over take the slot with the fewest lessons in the way, which are
+       evicted and queued again (min-conflicts, weighing lessons by how often they were
+       evicted, and a tabu list so evicted lessons don't go straight back);
+    3. improve: moves to free slots and swaps within a class that lower the soft cost, with
+       sideways moves to get past plateaus.
+    """
+
+    def __init__(self, lessons, days, periods, unavailable=None, seed=0):
+        self.lessons = list(lessons)
+        self.days = days
+        self.periods = periods
+        self.slots = days * periods
+        self.random = random.Random(seed)
+
+        # Dense ids keep the hot loops on lists instead of hashing UUIDs
+        class_index, teacher_index, group_index = {}, {}, {}
+        self.lesson_class, self.lesson_teacher, self.lesson_group = [], [], []
+        for lesson in self.lessons:
+            self.lesson_class.append(class_index.setdefault(lesson.class_id, len(class_index)))
+            teacher = lesson.teacher_id
+            self.lesson_teacher.append(teacher_index.setdefault(teacher, len(teacher_index)) if teacher is not None else None)
+            self.lesson_group.append(group_index.setdefault((lesson.class_id, lesson.subject_id), len(group_index)))
+
+        self.blocked = [set() for _ in teacher_index]
+        for teacher, slots in (unavailable or {}).items():
+            if teacher in teacher_index:
+                self.blocked[teacher_index[teacher]] = set(slots)
+
+        group_sizes = defaultdict(int)
+        for group in self.lesson_group:
+            group_sizes[group] += 1
+        self.cap = [math.ceil(group_sizes[group] / days) for group in range(len(group_index))]
+
+        self.slot_of = [FREE] * len(self.lessons)
+        self.class_at = [[FREE] * self.slots for _ in class_index]
+        self.teacher_at = [[FREE] * self.slots for _ in teacher_index]
+        self.per_day = [[0] * days for _ in group_index]
+        self.soft_cost = 0
+        self.stats = {}
+
+    # State
+
+    def _penalty(self, group, count):
+        return max(0, count - self.cap[group])
+
+    def place(self, lesson, slot):
+        group, day = self.lesson_group[lesson], slot // self.periods
+        self.soft_cost += self._penalty(group, self.per_day[group][day] + 1) - self._penalty(group, self.per_day[group][day])
+        self.per_day[group][day] += 1
+        self.slot_of[lesson] = slot
+        self.class_at[self.lesson_class[lesson]][slot] = lesson
+        teacher = self.lesson_teacher[lesson]
+        if teacher is not None:
+            self.teacher_at[teacher][slot] = lesson
+
+    def remove(self, lesson):
+        slot = self.slot_of[lesson]
+        group, day = self.lesson_group[lesson], slot // self.periods
+        self.soft_cost += self._penalty(group, self.per_day[group][day] - 1) - self._penalty(group, self.per_day[group][day])
+        self.per_day[group][day] -= 1
+        self.slot_of[lesson] = FREE
+        self.class_at[self.lesson_class[lesson]][slot] = FREE
+        teacher = self.lesson_teacher[lesson]
+        if teacher is not None:
+            self.teacher_at[teacher][slot] = FREE
+
+    def allowed(self, lesson, slot):
+        """The teacher is available (not necessarily free) in the slot."""
+        teacher = self.lesson_teacher[lesson]
+        return teacher is None or slot not in self.blocked[teacher]
+
+    def is_free(self, lesson, slot):
+        teacher = self.lesson_teacher[lesson]
+        return (
+            self.class_at[self.lesson_class[lesson]][slot] == FREE
+            and (teacher is None or (self.teacher_at[teacher][slot] == FREE and slot not in self.blocked[teacher]))
+        )
+
+    def added_cost(self, lesson, day):
+        group = self.lesson_group[lesson]
+        return 1 if self.per_day[group][day] >= self.cap[group] else 0
+
+    def move_delta(self, lesson, to_day):
+        """Soft cost change of moving a placed lesson to another day."""
+        group, from_day = self.lesson_group[lesson], self.slot_of[lesson] // self.periods
+        if from_day == to_day:
+            return 0
+        counts = self.per_day[group]
+        return (
+            self._penalty(group, counts[from_day] - 1) + self._penalty(group, counts[to_day] + 1)
+            - self._penalty(group, counts[from_day]) - self._penalty(group, counts[to_day])
+        )
+
+    # Search
+
+    def solve(self, time_limit=10.0):
+        started = time.perf_counter()
+        deadline = started + time_limit
+
+        unplaced = self.greedy()
+        self.stats['greedy_unplaced'] = len(unplaced)
+        self.stats['greedy_soft_cost'] = self.soft_cost
+        unplaced = self.repair(unplaced, deadline)
+        self.stats['improve_moves'] = self.improve(deadline) if not unplaced else 0
+        self.stats.update(unplaced=len(unplaced), soft_cost=self.soft_cost, seconds=time.perf_counter() - started)
+        return unplaced
+
+    def greedy(self):
+        teacher_load = defaultdict(int)
+        for teacher in self.lesson_teacher:
+            teacher_load[teacher] += 1
+
+        def room(lesson):
+            teacher = self.lesson_teacher[lesson]
+            if teacher is None:
+                return self.slots
+            return self.slots - len(self.blocked[teacher]) - teacher_load[teacher]
+
+        order = sorted(range(len(self.lessons)), key=lambda lesson: (room(lesson), self.random.random()))
+        unplaced = []
+        for lesson in order:
+            best, best_key = FREE, None
+            for slot in range(self.slots):
+                if not self.is_free(lesson, slot):
+                    continue
+                key = (self.added_cost(lesson, slot // self.periods), self.random.random())
+                if best_key is None or key < best_key:
+                    best, best_key = slot, key
+            if best == FREE:
+                unplaced.append(lesson)
+            else:
+                self.place(lesson, best)
+        return unplaced
+
+    def repair(self, unplaced, deadline, tenure=10):
+        # A teacher blocked in every slot leaves nothing to search for
+        stuck = [lesson for lesson in unplaced if not any(self.allowed(lesson, slot) for slot in range(self.slots))]
+        queue = deque(lesson for lesson in unplaced if lesson not in stuck)
+        tabu = {}
+        # Lessons evicted often weigh more, so the search stops pushing the same ones around
+        evictions = defaultdict(int)
+        iteration = 0
+        while queue and time.perf_counter() < deadline:
+            iteration += 1
+            lesson = queue.popleft()
+            cls, teacher = self.lesson_class[lesson], self.lesson_teacher[lesson]
+
+            best, best_key = FREE, None
+            for slot in range(self.slots):
+                if not self.allowed(lesson, slot) or tabu.get((lesson, slot), 0) > iteration:
+                    continue
+                in_the_way = {self.class_at[cls][slot]}
+                if teacher is not None:
+                    in_the_way.add(self.teacher_at[teacher][slot])
+                in_the_way.discard(FREE)
+                weight = sum(1 + evictions[other] for other in in_the_way)
+                key = (weight, self.added_cost(lesson, slot // self.periods), self.random.random())
+                if best_key is None or key < best_key:
+                    best, best_key, evicted = slot, key, in_the_way
+            if best == FREE:
+                # Every allowed slot is tabu for now
+                queue.append(lesson)
+                continue
+
+            for other in evicted:
+                evictions[other] += 1
+                tabu[(other, best)] = iteration + tenure
+                self.remove(other)
+                queue.append(other)
+            self.place(lesson, best)
+        self.stats['repair_iterations'] = iteration
+        return stuck + list(queue)
+
+    def improve(self, deadline, patience=25):
+        """
+        Lower the soft cost: passes of improving moves over the lessons on crowded days, and
+        once none is left, a pass of sideways moves (same cost) to get off the plateau. Stops
+        at zero cost, the deadline, or after `patience` sideways passes without progress.
+        """
+        moves = 0
+        best, stale = self.soft_cost, 0
+        sideways = False
+        while self.soft_cost and stale < patience and time.perf_counter() < deadline:
+            crowded = [
+                lesson for lesson, slot in enumerate(self.slot_of)
+                if self.per_day[self.lesson_group[lesson]][slot // self.periods] > self.cap[self.lesson_group[lesson]]
+            ]
+            self.random.shuffle(crowded)
+            improved = False
+            for lesson in crowded:
+                if time.perf_counter() >= deadline:
+                    break
+                if self.per_day[self.lesson_group[lesson]][self.slot_of[lesson] // self.periods] <= self.cap[self.lesson_group[lesson]]:
+                    continue
+                if self._improve_lesson(lesson, sideways):
+                    moves += 1
+                    improved = True
+
+            if self.soft_cost < best:
+                best, stale = self.soft_cost, 0
+            elif sideways:
+                stale += 1
+            # Climb while it helps, otherwise take a sideways pass
+            sideways = not improved or sideways and self.soft_cost >= best
+        return moves
+
+    def _improve_lesson(self, lesson, sideways=False):
+        """
+        Apply the best cost-lowering move or swap for the lesson, or with `sideways` a random
+        one that keeps the cost; False when there is none.
+        """
+        cls, teacher = self.lesson_class[lesson], self.lesson_teacher[lesson]
+        here = self.slot_of[lesson]
+        best_delta, best, level = 0, None, []
+        for slot in range(self.slots):
+            day = slot // self.periods
+            if day == here // self.periods:
+                continue
+            other = self.class_at[cls][slot]
+            if other == FREE:
+                if not self.is_free(lesson, slot):
+                    continue
+                delta = self.move_delta(lesson, day)
+            else:
+                # Swap with the class's lesson in that slot, if both teachers can make it
+                other_teacher = self.lesson_teacher[other]
+                if self.lesson_group[other] == self.lesson_group[lesson]:
+                    continue
+                if not (self.allowed(lesson, slot) and self.allowed(other, here)):
+                    continue
+                if teacher is not None and teacher != other_teacher and self.teacher_at[teacher][slot] != FREE:
+                    continue
+                if other_teacher is not None and other_teacher != teacher and self.teacher_at[other_teacher][here] != FREE:
+                    continue
+                delta = self.move_delta(lesson, day) + self.move_delta(other, here // self.periods)
+            if delta < best_delta:
+                best_delta, best = delta, (slot, other)
+            elif delta == 0:
+                level.append((slot, other))
+        if best is None:
+            if not (sideways and level):
+                return False
+            best = self.random.choice(level)
+
+        slot, other = best
+        self.remove(lesson)
+        if other != FREE:
+            self.remove(other)
+            self.place(other, here)
+        self.place(lesson, slot)
+        return True
+
+    def assignments(self):
+        """(Lesson, day index, period index) for every placed lesson."""
+        return [
+            (self.lessons[lesson], slot // self.periods, slot % self.periods)
+            for lesson, slot in enumerate(self.slot_of) if slot != FREE
+        ]
@@ -0,0 +1,321 @@
+import bisect
+import uuid
+from collections import defaultdict
+from datetime import time
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_time
+
+from .models import Subject, TeacherLevelClass, TimeTable
+from .timetable_solver import Lesson, TimetableSolver
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+SCHOOL_DAYS = DAYS[:5]
+
+
+class TimetableError(ValueError):
+    """An entry that cannot be scheduled at all, e.g. an unknown day or an end before its start."""
+
+
+def normalize_day(value):
+    day = str(value or '').strip().capitalize()
+    if day not in DAYS:
+        raise TimetableError(f"Unknown day '{value}'")
+    return day
+
+
+def stored_day(value):
+    """The day of a stored slot in normalize_day's form; older rows may hold e.g. 'monday'."""
+    try:
+        return normalize_day(value)
+    except TimetableError:
+        return value
+
+
+def parse_slot_time(value):
+    if isinstance(value, time):
+        return value
+    try:
+        parsed = parse_time(str(value or '').strip())
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise TimetableError(f"Invalid time '{value}', expected HH:MM")
+    return parsed
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute + value.second / 60
+
+
+class IntervalIndex:
+    """
+    Time slots per (owner, day), e.g. a class or a teacher, for overlap lookups.
+
+    Each bucket keeps its slots sorted by start, plus the longest slot it holds: a slot that
+    starts more than that long before a query's start cannot reach it, so a lookup is a
+    bisect and a short backwards scan rather than a pass over the whole day. Slots are
+    half-open, back-to-back lessons (8:00-9:00, 9:00-10:00) don't overlap.
+    """
+
+    def __init__(self):
+        self._slots = defaultdict(list)
+        self._longest = defaultdict(float)
+
+    def add(self, owner, day, start, end, item):
+        start, end = _minutes(start), _minutes(end)
+        key = (owner, day)
+        # The counter keeps ties on the start from comparing the items
+        bisect.insort(self._slots[key], (start, end, len(self._slots[key]), item))
+        self._longest[key] = max(self._longest[key], end - start)
+
+    def overlapping(self, owner, day, start, end):
+        """Items of `owner` whose slot on `day` overlaps [start, end)."""
+        start, end = _minutes(start), _minutes(end)
+        key = (owner, day)
+        slots = self._slots.get(key)
+        if not slots:
+            return []
+        found = []
+        earliest = start - self._longest[key]
+        for position in range(bisect.bisect_left(slots, (end,)) - 1, -1, -1):
+            slot_start, slot_end, _, item = slots[position]
+            if slot_start <= earliest:
+                break
+            if slot_end > start:
+                found.append(item)
+        return found[::-1]
+
+
+def subject_teachers(class_instance):
+    """{subject_id: teacher} for the class, from its teacher assignments, in one query."""
+    assignments = (
+        TeacherLevelClass.subjects_taught.through.objects
+        .filter(teacherlevelclass__class_id=class_instance)
+        .select_related('teacherlevelclass__teacher')
+        .order_by('-teacherlevelclass__is_main_teacher', 'teacherlevelclass__created_at')
+    )
+    teachers = {}
+    for assignment in assignments:
+        teachers.setdefault(assignment.subject_id, assignment.teacherlevelclass.teacher)
+    return teachers
+
+
+def _describe(slot):
+    if isinstance(slot, TimeTable):
+        return {
+            'id': str(slot.id) if slot.id and not slot._state.adding else None,
+            'class_id': str(slot.class_id_id),
+            'subject_id': str(slot.subject_id) if slot.subject_id else None,
+            'teacher_id': str(slot.teacher_id) if slot.teacher_id else None,
+            'day': slot.day,
+            'start_time': slot.start_time.strftime('%H:%M'),
+            'end_time': slot.end_time.strftime('%H:%M'),
+        }
+    return slot
+
+
+def find_conflicts(entries, class_ids, replace=False):
+    """
+    Clashes of unsaved TimeTable `entries` with each other and with what is already stored:
+    two slots of the same class, or of the same teacher in any class, overlapping on a day.
+    With `replace` the stored timetables of `class_ids` are ignored, they are about to go.
+    Costs one query for the stored slots of those classes and teachers.
+    """
+    teacher_ids = {entry.teacher_id for entry in entries if entry.teacher_id}
+    if replace:
+        stored = TimeTable.objects.filter(teacher_id__in=teacher_ids).exclude(class_id__in=class_ids)
+    else:
+        stored = TimeTable.objects.filter(Q(class_id__in=class_ids) | Q(teacher_id__in=teacher_ids))
+
+    classes, teachers = IntervalIndex(), IntervalIndex()
+    for slot in stored:
+        slot.day = stored_day(slot.day)
+        classes.add(slot.class_id_id, slot.day, slot.start_time, slot.end_time, slot)
+        if slot.teacher_id:
+            teachers.add(slot.teacher_id, slot.day, slot.start_time, slot.end_time, slot)
+
+    conflicts = []
+    for position, entry in enumerate(entries):
+        clashes = [('class', other) for other in classes.overlapping(entry.class_id_id, entry.day, entry.start_time, entry.end_time)]
+        if entry.teacher_id:
+            clashes += [
+                ('teacher', other) for other in teachers.overlapping(entry.teacher_id, entry.day, entry.start_time, entry.end_time)
+                # Already reported as a class clash
+                if other.class_id_id != entry.class_id_id
+            ]
+        for kind, other in clashes:
+            conflicts.append({'type': kind, 'entry': position, 'entry_slot': _describe(entry), 'conflicts_with': _describe(other)})
+        # Later entries are checked against this one too
+        classes.add(entry.class_id_id, entry.day, entry.start_time, entry.end_time, entry)
+        if entry.teacher_id:
+            teachers.add(entry.teacher_id, entry.day, entry.start_time, entry.end_time, entry)
+    return conflicts
+
+
+def build_class_entries(class_instance, raw_entries):
+    """
+    Unsaved TimeTable rows for a class from [{subject, day, startTime, endTime}] entries; an
+    entry without a subject is a break. Teachers come from the class's teacher assignments.
+    Raises Subject.DoesNotExist naming unknown subjects (or those of another school or campus)
+    and TimetableError for bad slots.
+    """
+    try:
+        subject_ids = {uuid.UUID(str(entry['subject'])) for entry in raw_entries if entry.get('subject')}
+    except ValueError:
+        raise TimetableError("subject must be a subject id")
+    subjects = Subject.objects.filter(
+        school_id=class_instance.school_id, campus_id=class_instance.campus_id
+    ).in_bulk(list(subject_ids))
+    missing = subject_ids - set(subjects)
+    if missing:
+        raise Subject.DoesNotExist(
+            f"Subjects not found in this school and campus: {sorted(str(subject_id) for subject_id in missing)}"
+        )
+    teachers = subject_teachers(class_instance) if subjects else {}
+
+    break_subject = None
+    entries = []
+    for position, entry in enumerate(raw_entries):
+        try:
+            day = normalize_day(entry.get('day'))
+            start_time, end_time = parse_slot_time(entry.get('startTime')), parse_slot_time(entry.get('endTime'))
+        except TimetableError as e:
+            raise TimetableError(f"Entry {position}: {e}")
+        if start_time >= end_time:
+            raise TimetableError(f"Entry {position}: startTime must be before endTime")
+
+        if entry.get('subject'):
+            subject = subjects[uuid.UUID(str(entry['subject']))]
+        else:
+            if break_subject is None:
+                # Breaks share one 'Break' subject per campus
+                break_subject, _ = Subject.objects.get_or_create(
+                    name='Break', school_id=class_instance.school_id, campus_id=class_instance.campus_id,
+                )
+            subject = break_subject
+        entries.append(TimeTable(
+            school_id=class_instance.school_id, campus_id=class_instance.campus_id, class_id=class_instance,
+            subject=subject, teacher=teachers.get(subject.id) if subject is not break_subject else None,
+            day=day, start_time=start_time, end_time=end_time,
+        ))
+    return entries
+
+
+def save_timetables(entries, class_ids, replace=False):
+    """Insert `entries` in bulk, first removing the stored timetables of `class_ids` with `replace`."""
+    with transaction.atomic():
+        if replace:
+            TimeTable.objects.filter(class_id__in=class_ids).delete()
+        return TimeTable.objects.bulk_create(entries, batch_size=1000)
+
+
+def parse_periods(periods):
+    """The day's periods, [(start, end)] in order, from [{startTime, endTime}]; they may not overlap."""
+    slots = []
+    for position, period in enumerate(periods):
+        try:
+            start, end = parse_slot_time(period.get('startTime')), parse_slot_time(period.get('endTime'))
+        except TimetableError as e:
+            raise TimetableError(f"Period {position}: {e}")
+        if start >= end:
+            raise TimetableError(f"Period {position}: startTime must be before endTime")
+        slots.append((start, end))
+    slots.sort()
+    for (_, end), (start, _) in zip(slots, slots[1:]):
+        if start < end:
+            raise TimetableError(f"Periods overlap at {start.strftime('%H:%M')}")
+    return slots
+
+
+def campus_lessons(campus_id, requirements=None, periods_per_subject=None):
+    """
+    The lessons of a week to schedule: `requirements` maps (class_id, subject_id) to periods a
+    week; without it every subject taught in a class of the campus gets `periods_per_subject`.
+    Teachers come from the teacher assignments of the whole campus, in one query.
+    """
+    assignments = (
+        TeacherLevelClass.subjects_taught.through.objects
+        .filter(teacherlevelclass__class_id__campus_id=campus_id)
+        .order_by('-teacherlevelclass__is_main_teacher', 'teacherlevelclass__created_at')
+        .values_list('teacherlevelclass__class_id', 'subject_id', 'teacherlevelclass__teacher_id')
+    )
+    teachers = {}
+    for class_id, subject_id, teacher_id in assignments:
+        teachers.setdefault((class_id, subject_id), teacher_id)
+    if requirements is None:
+        requirements = dict.fromkeys(teachers, periods_per_subject)
+
+    lessons = []
+    for (class_id, subject_id), count in requirements.items():
+        lessons += [Lesson(class_id, subject_id, teachers.get((class_id, subject_id)))] * count
+    return lessons
+
+
+def blocked_slots(busy, days, periods):
+    """{teacher_id: solver slot numbers} overlapped by [(teacher_id, day, start, end)] busy times."""
+    blocked = defaultdict(set)
+    for teacher_id, day, start, end in busy:
+        if day not in days:
+            continue
+        offset = days.index(day) * len(periods)
+        for period, (period_start, period_end) in enumerate(periods):
+            if period_start < end and start < period_end:
+                blocked[teacher_id].add(offset + period)
+    return blocked
+
+
+def _check_capacity(lessons, blocked, slots):
+    per_class, per_teacher = defaultdict(int), defaultdict(int)
+    for lesson in lessons:
+        per_class[lesson.class_id] += 1
+        if lesson.teacher_id:
+            per_teacher[lesson.teacher_id] += 1
+    for class_id, count in per_class.items():
+        if count > slots:
+            raise TimetableError(f"Class {class_id} needs {count} periods a week but there are only {slots}")
+    for teacher_id, count in per_teacher.items():
+        if count > slots - len(blocked.get(teacher_id, ())):
+            raise TimetableError(f"Teacher {teacher_id} has {count} lessons a week but is available for fewer periods")
+
+
+def generate_timetable(campus, lessons, periods, days=SCHOOL_DAYS, unavailable=(), time_limit=10, dry_run=False, seed=0):
+    """
+    Schedule `lessons` into the `periods` of `days` with TimetableSolver and, unless `dry_run`,
+    replace the timetables of their classes with the result in bulk.
+
+    Teachers can't be booked during their `unavailable` [(teacher_id, day, start, end)] times,
+    nor during lessons they already have in classes outside the schedule. Nothing is saved
+    when some lessons can't be placed. Returns (solver, unplaced lessons, TimeTable entries).
+    """
+    class_ids = list({lesson.class_id for lesson in lessons})
+    teacher_ids = {lesson.teacher_id for lesson in lessons if lesson.teacher_id}
+    busy = list(unavailable) + [
+        (teacher_id, stored_day(day), start, end)
+        for teacher_id, day, start, end in TimeTable.objects.filter(teacher_id__in=teacher_ids)
+        .exclude(class_id__in=class_ids).values_list('teacher_id', 'day', 'start_time', 'end_time')
+    ]
+    blocked = blocked_slots(busy, days, periods)
+    _check_capacity(lessons, blocked, len(days) * len(periods))
+
+    solver = TimetableSolver(lessons, len(days), len(periods), blocked, seed=seed)
+    unplaced = [lessons[lesson] for lesson in solver.solve(time_limit)]
+    if unplaced:
+        return solver, unplaced, []
+
+    entries = [
+        TimeTable(
+            school_id=campus.school_id, campus_id=campus.id, class_id_id=lesson.class_id, subject_id=lesson.subject_id,
+            teacher_id=lesson.teacher_id, day=days[day], start_time=periods[period][0], end_time=periods[period][1],
+        )
+        for lesson, day, period in solver.assignments()
+    ]
+    if not dry_run:
+        with transaction.atomic():
+            # Only finds something if another request booked these teachers meanwhile
+            conflicts = find_conflicts(entries, class_ids, replace=True)
+            if conflicts:
+                raise TimetableError(f"{len(conflicts)} lesson(s) clash with timetables saved meanwhile, try again")
+            save_timetables(entries, class_ids, replace=True)
+    return solver, unplaced, entries
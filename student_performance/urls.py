@@ -59,14 +59,18 @@ urlpatterns = [
     # Fetch End of Semester Results by academic year and semester
     path('end-of-semester-results-by-academic-year/', views.SemesterResultsView.as_view(), name='end_of_semester_results'),
 
+    # Class-wide ranking for a term
+    path('class-ranking/<uuid:class_id>/<uuid:term_id>/', views.ClassRankingView.as_view(), name='class_ranking'),
+
     # Fetch Historical Subject Performances
-    path('historical-subject-performances/<int:student_id>/', views.HistoricalSubjectPerformanceView.as_view(), name='historical-subject-performances'),
+    path('historical-subject-performances/<uuid:student_id>/', views.HistoricalSubjectPerformanceView.as_view(), name='historical-subject-performances'),
 
     # Endpoints for Student Promotions
     path('promote-students/', views.promote_students, name='promote_students'),
-    path('get-promoted-existing-repeated-students/<int:class_id>/', views.get_promoted_existing_repeated_students, name='get_promoted_existing_repeated_students'),
+    path('get-promoted-existing-repeated-students/<uuid:class_id>/', views.get_promoted_existing_repeated_students, name='get_promoted_existing_repeated_students'),
     path('merge-promoted-repeated-students/', views.merge_promoted_repeated_students, name='merge_promoted_repeated_students'),
     path('repeat-students/', views.repeat_students, name='repeat_students'),
+    path('year-rollover/', views.YearRolloverView.as_view(), name='year_rollover'),
 
     # Endpoint for fetching a teacher's class in which he/she teaches a subject
     path('get-teacher-classes/', views.get_teacher_classes, name='get_teacher_classes'),
@@ -104,9 +108,10 @@ urlpatterns = [
 
     # Endpoint for TimeTable requests
     path('create-timetable/', views.create_timetable, name='create_timetable'),
-    path('view-timetable/<int:class_id>/', views.view_timetable, name='view_timetable'),
+    path('view-timetable/<uuid:class_id>/', views.view_timetable, name='view_timetable'),
     path('update-timetable/<int:pk>/', views.update_timetable, name='update-timetable'),
     path('delete-timetable/<int:pk>/', views.delete_timetable, name='delete-timetable'),
+    path('generate-timetable/', views.TimetableGeneratorView.as_view(), name='generate_timetable'),
 
     # Endpoints for Assessment CRUD operations
     path('assessment-names/', views.AssessmentNameListCreateView.as_view(), name='assessment-name-list-create'),
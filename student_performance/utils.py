@@ -1,65 +1,240 @@
-from decimal import Decimal
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
 
-from .models import ProcessedMarks, Assessment, Subject, ClassEnrollment
+from django.db import transaction
+from django.db.models import FloatField, Window
+from django.db.models.functions import Cast, Rank
+from django.utils import timezone
+
+from .models import ProcessedMarks, Assessment, Class, ClassSubject, Terms
 from .assign_grade import assign_grade
+from .get_position_suffix import get_position_suffix
+
+
+# Assessment names are free text per school, so they are normalised (lowercase, no spaces)
+# before being mapped onto the three weighted components of a subject score.
+EXERCISE_ASSIGNMENT_NAMES = {'exercise', 'exercises', 'assignment', 'assignments'}
+MIDTERM_NAMES = {'midterm', 'midterms', 'midtermexam', 'midtermexams'}
+FINAL_EXAM_NAMES = {'finalexam', 'finalexams', 'final'}
+
+# Only the best four exercises/assignments (out of 20 each) count towards the 20% component.
+BEST_EXERCISE_COUNT = 4
+EXERCISE_ASSIGNMENT_WEIGHT = 20
+MIDTERM_WEIGHT = 30
+FINAL_EXAM_WEIGHT = 50
+
+PROMOTION_TERM = '2nd Semester'
+PROMOTION_PASS_MARK = 45
 
-def calculate_processed_marks(class_id, semester, student):
+TWO_PLACES = Decimal('0.01')
+
+
+def _assessment_category(name):
+    """Map an AssessmentName.name onto 'exercise', 'midterm', 'final' or None."""
+    if not name:
+        return None
+    key = name.replace(' ', '').replace('-', '').replace('_', '').lower()
+    if key in EXERCISE_ASSIGNMENT_NAMES:
+        return 'exercise'
+    if key in MIDTERM_NAMES:
+        return 'midterm'
+    if key in FINAL_EXAM_NAMES:
+        return 'final'
+    return None
+
+
+def _subject_score(marks):
     """
-    Calculate and update ProcessedMarks for a student.
+    Apply the exercise/midterm/final weighting to the grouped marks of one subject.
+    `marks` maps a category to a list of (obtained_marks, total_marks, date) tuples.
     """
-    student_assessments = Assessment.objects.filter(
-        student_id=student,
+    exercise_marks = sorted(
+        (float(obtained) for obtained, _, _ in marks.get('exercise', [])),
+        reverse=True
+    )[:BEST_EXERCISE_COUNT]
+    exercise_assignment_score = (sum(exercise_marks) / 80) * EXERCISE_ASSIGNMENT_WEIGHT
+
+    midterms = [float(obtained) for obtained, _, _ in marks.get('midterm', [])]
+    midterm = sum(midterms) / len(midterms) if midterms else 0
+    midterm_score = (midterm / 100) * MIDTERM_WEIGHT
+
+    # Use the most recent final exam if more than one was recorded
+    final_exams = sorted(marks.get('final', []), key=lambda mark: (mark[2] is not None, mark[2]))
+    final_exam_score = 0
+    if final_exams:
+        obtained, total, _ = final_exams[-1]
+        if total:
+            final_exam_score = (float(obtained) / float(total)) * FINAL_EXAM_WEIGHT
+
+    return exercise_assignment_score, midterm_score, final_exam_score
+
+
+def build_processed_marks(class_id, term_id, student_ids=None):
+    """
+    Compute (but do not save) ProcessedMarks rows for a class and term.
+
+    All assessments are pulled in a single query and grouped in memory by student,
+    subject and assessment category. When `student_ids` is None every student with
+    assessments in the class/term is processed.
+    """
+    assessments = Assessment.objects.filter(
         class_id=class_id,
-        semester=semester
+        term_id=term_id,
+        student__isnull=False,
+        obtained_marks__isnull=False,
     )
+    if student_ids is not None:
+        assessments = assessments.filter(student_id__in=student_ids)
 
-    total_score = Decimal(0)
-    subject_data = []
+    rows = assessments.values_list(
+        'student_id', 'subject_id', 'subject__name', 'assessment_name__name',
+        'obtained_marks', 'total_marks', 'date'
+    )
 
-    for subject in Subject.objects.all():
-        assessments = student_assessments.filter(subject=subject)
+    # student -> subject -> category -> [(obtained, total, date)]
+    grouped = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+    subject_names = {}
+    for student_id, subject_id, subject_name, name, obtained, total, date in rows:
+        subject_names[subject_id] = subject_name
+        category = _assessment_category(name)
+        # Touch the subject so it is reported even if none of its assessments are weighted
+        subject_marks = grouped[student_id][subject_id]
+        if category:
+            subject_marks[category].append((obtained, total, date))
 
-        # Calculate scores (same as in your `ProcessedMarksView`)
-        exercise_assignment_scores = assessments.filter(
-            assessment_type__in=['Exercise', 'Assignment']
-        ).order_by('-obtained_marks')[:4]
+    if student_ids is None:
+        student_ids = list(grouped.keys())
+    if not student_ids:
+        return []
 
-        exercise_assignment_total = sum([float(score.obtained_marks) for score in exercise_assignment_scores])
-        exercise_assignment_score = (exercise_assignment_total / 80) * 20
+    # Every subject offered in the class counts towards the average, even without marks
+    for subject_id, subject_name in ClassSubject.objects.filter(class_id=class_id).values_list(
+        'subject_id', 'subject__name'
+    ):
+        subject_names.setdefault(subject_id, subject_name)
 
-        midterm = assessments.filter(assessment_type='MidTermExam').aggregate(total=Avg('obtained_marks'))['total'] or 0
-        midterm_score = (float(midterm) / 100) * 30
+    term_name = Terms.objects.filter(id=term_id).values_list('name', flat=True).first() if term_id else None
+    # Results belong to the class's school and campus, whether or not the student has marks left
+    school_id, campus_id = Class.objects.filter(id=class_id).values_list('school_id', 'campus_id').first() or (None, None)
+    ordered_subjects = sorted(subject_names.items(), key=lambda item: item[1] or '')
 
-        final_exam = assessments.filter(assessment_type='Final Exam').first()
-        final_exam_score = (float(final_exam.obtained_marks) / float(final_exam.total_marks)) * 50 if final_exam else 0
+    processed_marks = []
+    for student_id in student_ids:
+        student_marks = grouped.get(student_id, {})
+        total_score = Decimal(0)
+        subject_data = []
 
-        subject_score = exercise_assignment_score + midterm_score + final_exam_score
-        total_score += Decimal(subject_score)
+        for subject_id, subject_name in ordered_subjects:
+            exercise_assignment_score, midterm_score, final_exam_score = _subject_score(
+                student_marks.get(subject_id, {})
+            )
+            subject_score = exercise_assignment_score + midterm_score + final_exam_score
+            total_score += Decimal(subject_score)
 
-        grade = assign_grade(subject_score)
+            subject_data.append({
+                'subject_id': str(subject_id),
+                'subject_name': subject_name,
+                'exercise_assignment_score': exercise_assignment_score,
+                'midterm_score': midterm_score,
+                'final_exam_score': final_exam_score,
+                'total_subject_score': subject_score,
+                'grade': assign_grade(subject_score)
+            })
 
-        subject_data.append({
-            'subject_name': subject.name,
-            'exercise_assignment_score': exercise_assignment_score,
-            'midterm_score': midterm_score,
-            'final_exam_score': final_exam_score,
-            'total_subject_score': subject_score,
-            'grade': grade
-        })
+        average_total_score = (
+            (total_score / len(ordered_subjects)).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+            if ordered_subjects else Decimal('0.00')
+        )
 
-    average_total_score = float(total_score / len(Subject.objects.all()))
+        # Promotion status is only decided at the end of the academic year
+        status = 'promoted' if term_name == PROMOTION_TERM and average_total_score >= PROMOTION_PASS_MARK else 'repeated'
 
-    # Promotion status for "2nd Semester"
-    status = 'promoted' if semester == "2nd Semester" and average_total_score >= 45 else 'repeated'
+        processed_marks.append(ProcessedMarks(
+            school_id=school_id,
+            campus_id=campus_id,
+            student_id=student_id,
+            class_id_id=class_id,
+            term_id=term_id,
+            total_score=average_total_score,
+            status=status,
+            subject_data=subject_data,
+        ))
 
-    # Update or create ProcessedMarks
-    ProcessedMarks.objects.update_or_create(
-        student=student,
-        class_id=class_id,
-        semester=semester,
-        defaults={
-            'total_score': average_total_score,
-            'status': status,
-            'subject_data': subject_data,  # Ensure JSON serializable
-        }
-    )
+    return processed_marks
+
+
+def recompute_processed_marks(class_id, term_id, student_ids=None):
+    """
+    Recompute and upsert ProcessedMarks for a class and term in a fixed number of queries.
+    Returns the number of rows written.
+    """
+    processed_marks = build_processed_marks(class_id, term_id, student_ids)
+    if not processed_marks:
+        return 0
+
+    update_fields = ['school', 'campus', 'total_score', 'status', 'subject_data', 'updated_at']
+    with transaction.atomic():
+        if term_id is None:
+            # NULLs never conflict in unique_processed_marks, so rows without a term are matched
+            # by hand (unique_processed_marks_no_term keeps them to one per student and class)
+            existing = dict(
+                ProcessedMarks.objects.filter(
+                    class_id=class_id, term__isnull=True, student_id__in=[row.student_id for row in processed_marks],
+                ).values_list('student_id', 'id')
+            )
+            now = timezone.now()
+            for row in processed_marks:
+                if row.student_id in existing:
+                    # bulk_update doesn't apply auto_now
+                    row.id, row.updated_at = existing[row.student_id], now
+            ProcessedMarks.objects.bulk_update(
+                [row for row in processed_marks if row.student_id in existing], update_fields, batch_size=500,
+            )
+            ProcessedMarks.objects.bulk_create([row for row in processed_marks if row.student_id not in existing])
+        else:
+            ProcessedMarks.objects.bulk_create(
+                processed_marks,
+                update_conflicts=True,
+                unique_fields=['student', 'class_id', 'term'],
+                update_fields=update_fields,
+            )
+    return len(processed_marks)
+
+
+def ranked_processed_marks(class_id, term_id):
+    """
+    ProcessedMarks for a class and term annotated with `rank`, computed in SQL with
+    RANK() over total_score so tied students share a position (1st, 1st, 3rd, ...).
+    The window orders by total_score cast to a float: SQLite rejects ordering a window
+    by the decimal cast Django applies to the column there.
+    """
+    return ProcessedMarks.objects.filter(class_id=class_id, term_id=term_id).annotate(
+        rank=Window(expression=Rank(), order_by=Cast('total_score', FloatField()).desc())
+    ).order_by('rank', 'student__username')
+
+
+def rank_processed_marks(class_id, term_id):
+    """
+    Write the class position of every student in a class and term with one bulk_update.
+    Returns the number of positions that changed.
+    """
+    changed = []
+    for processed_mark in ranked_processed_marks(class_id, term_id).only('id', 'position', 'total_score'):
+        position = get_position_suffix(processed_mark.rank)
+        if processed_mark.position != position:
+            processed_mark.position = position
+            changed.append(processed_mark)
+
+    if changed:
+        ProcessedMarks.objects.bulk_update(changed, ['position'], batch_size=500)
+    return len(changed)
+
+
+def calculate_processed_marks(class_id, term, student):
+    """
+    Calculate and update ProcessedMarks for a student.
+    """
+    class_id = getattr(class_id, 'pk', class_id)
+    term_id = getattr(term, 'pk', term)
+    student_id = getattr(student, 'pk', student)
+    return recompute_processed_marks(class_id, term_id, [student_id])
@@ -1,9 +1,12 @@
+from django.conf import settings
 from django.db import transaction
+from django.core.exceptions import ValidationError
 import logging
+import math
+import uuid
 from urllib.parse import unquote
-from django.db.models import Avg, Sum, Count, FloatField, ExpressionWrapper, F, Q
+from django.db.models import Avg, Sum, Count, FloatField, ExpressionWrapper, F, OuterRef, Q, Subquery
 from django.db.models.functions import Round
-from decimal import Decimal, InvalidOperation
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
 from rest_framework.decorators import api_view
@@ -22,13 +25,18 @@ from rest_framework.mixins import (
 from .assign_grade import assign_grade
 from .consolidate_subject_data import consolidate_subject_data
 from .get_position_suffix import get_position_suffix
-from user_auth.permissions import IsParent, IsHeadmaster, IsTeacher, IsAssignedTeacher, IsRegisteredInSchoolOrCampus, IsTeacherOrAdminInSchoolOrCampus, IsHeadmasterInSchoolOrCampus, IsTeacherInSchoolOrCampus, IsParentInSchoolOrCampus
+from .bulk_assessments import bulk_create_assessments, bulk_update_assessments
+from .rollover import PROMOTED, REPEATED, RolloverError, merge_into_existing, move_students, resolve_academic_year, rollover
+from .timetables import SCHOOL_DAYS, TimetableError, build_class_entries, campus_lessons, find_conflicts, generate_timetable, normalize_day, parse_periods, parse_slot_time, save_timetables
+from .utils import ranked_processed_marks, rank_processed_marks
+from user_auth.permissions import IsAdmin, IsParent, IsHeadmaster, IsTeacher, IsAssignedTeacher, IsRegisteredInSchoolOrCampus, IsTeacherOrAdminInSchoolOrCampus, IsHeadmasterInSchoolOrCampus, IsTeacherInSchoolOrCampus, IsParentInSchoolOrCampus
 from .models import Class, Subject, TeacherLevelClass, Student, ClassEnrollment, HistoricalClassEnrollment, Assessment, StudentParentRelation, SubjectPerformance, ProcessedMarks, TimeTable, AssessmentName, Level, Terms, ClassSubject
 from user_auth.models import User, Role
 from user_auth.serializers import UserSerializer
-from .serializers import ClassSerializer, SubjectSerializer, TeacherLevelClassSerializer, StudentSerializer, AssessmentSerializer, PromoteStudentsSerializer, ClassEnrollmentSerializer, SubjectPerformanceSerializer, TopicPerformanceSerializer, ProcessedMarksSerializer, StudentParentRelationSerializer, TimeTableSerializer, AssessmentNameSerializer, LevelSerializer, TermsSerializer, ClassSubjectSerializer
+from .serializers import ClassSerializer, SubjectSerializer, TeacherLevelClassSerializer, StudentSerializer, AssessmentSerializer, PromoteStudentsSerializer, PromotionStudentSerializer, ClassEnrollmentSerializer, SubjectPerformanceSerializer, TopicPerformanceSerializer, ProcessedMarksSerializer, StudentParentRelationSerializer, TimeTableSerializer, AssessmentNameSerializer, LevelSerializer, TermsSerializer, ClassSubjectSerializer
 from administrator.models import AcademicYear
 from school.models import School, Campus
+from edu_performance_monitoring_app.pagination import KeysetPagination
 
 logger = logging.getLogger(__name__)
 
@@ -240,6 +248,7 @@ class SubjectCRUDView(
     """
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
+    pagination_class = KeysetPagination
 
     # Default permissions
     permission_classes = [permissions.IsAuthenticated]
@@ -556,6 +565,22 @@ def get_teacher_registered_subjects(request, class_id):
 
 ''' PROMOTE STUDENTS OR A STUDENT TO A DIFFERENT CLASS'''
 
+def _students_to_move(request, student_ids):
+    """Students among `student_ids` that exist, have the Student role and are in the user's school."""
+    students = User.objects.filter(id__in=student_ids, roles__name='Student').distinct()
+    found = set()
+    allowed = []
+    for student in students:
+        found.add(str(student.id))
+        if student.school_id != request.user.school_id and not request.user.is_superuser:
+            logger.warning(f"Student {student.id} does not belong to the same school, skipping")
+            continue
+        allowed.append(student)
+    for student_id in {str(student_id) for student_id in student_ids} - found:
+        logger.warning(f"User {student_id} is not a student, skipping")
+    return allowed
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated, IsRegisteredInSchoolOrCampus, IsAssignedTeacher])
 def promote_students(request):
@@ -567,51 +592,27 @@ def promote_students(request):
         return Response({"error": "Missing required parameters."}, status=status.HTTP_400_BAD_REQUEST)
 
     new_class = get_object_or_404(Class, id=new_class_id)
-
-    promoted_students = []
+    academic_year_obj = resolve_academic_year(academic_year, request.user.school_id)
+    if not academic_year_obj:
+        return Response({"error": f"Academic year '{academic_year}' not found."}, status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        for student_id in student_ids:
-            student = get_object_or_404(User, id=student_id)
+        students = _students_to_move(request, student_ids)
 
-            # Ensure the user has a "Student" role
-            if not student.has_role('Student'):
-                logger.warning(f"User {student.id} is not a student, skipping promotion")
-                continue
+        # Current enrollments move into history and the new ones are created in bulk
+        with transaction.atomic():
+            move_students({student.id: (new_class, PROMOTED) for student in students}, academic_year_obj)
 
-            # Ensure the student belongs to the same school/campus
-            if student.school_id != request.user.school_id:
-                logger.warning(f"Student {student.id} does not belong to the same school, skipping")
-                continue
-
-            # Check existing enrollment
-            current_class_enrollment = ClassEnrollment.objects.filter(student=student).first()
-
-            # Move current enrollment to historical
-            if current_class_enrollment:
-                HistoricalClassEnrollment.objects.create(
-                    student=student,
-                    class_enrolled=current_class_enrollment.class_id,
-                    academic_year=current_class_enrollment.academic_year
-                )
-                current_class_enrollment.delete()
-
-            # Enroll student in new class
-            new_enrollment = ClassEnrollment.objects.create(
-                student=student,
-                class_id=new_class,
-                academic_year=academic_year,
-                status='promoted'
-            )
-
-            promoted_students.append({
+        promoted_students = [
+            {
                 'student_id': student.id,
                 'student_name': student.username or student.email,
                 'new_class_id': new_class.id,
                 'new_class_name': new_class.name,
-                'enrollment_date': new_enrollment.academic_year
-            })
-
+                'enrollment_date': str(academic_year_obj),
+            }
+            for student in students
+        ]
         return Response({
             'message': 'Students promoted successfully',
             'promoted_students': promoted_students
@@ -634,25 +635,13 @@ def repeat_students(request):
 
     try:
         class_instance = Class.objects.get(id=class_id)
-        students = Student.objects.filter(id__in=student_ids)
-
-        for student in students:
-            current_class_enrollment = ClassEnrollment.objects.filter(student=student).first()
+        academic_year_obj = resolve_academic_year(academic_year, request.user.school_id)
+        if not academic_year_obj:
+            return Response({"error": f"Academic year '{academic_year}' not found."}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Move current enrollment to historical
-            if current_class_enrollment:
-                HistoricalClassEnrollment.objects.create(
-                    student=student,
-                    class_enrolled=current_class_enrollment.class_id,
-                    academic_year=current_class_enrollment.academic_year
-                )
-                current_class_enrollment.delete()
-            enroll_repeated_student = ClassEnrollment.objects.create(
-                student=student,
-                class_id=class_instance,
-                academic_year=academic_year,
-                status='repeated'
-            )
+        students = _students_to_move(request, student_ids)
+        with transaction.atomic():
+            move_students({student.id: (class_instance, REPEATED) for student in students}, academic_year_obj)
 
         return Response({"message": "Students repeated successfully"}, status=status.HTTP_200_OK)
 
@@ -661,6 +650,68 @@ def repeat_students(request):
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+
+class YearRolloverView(APIView):
+    """
+    Year-end promotion of many classes at once:
+
+        {"academic_year": "<id or start year>", "dry_run": true,
+         "classes": [{"class_id": ..., "next_class_id": ... or null, "repeat_student_ids": [...]}]}
+
+    Students of each class are promoted to its next class (a null next class means they leave
+    the school) unless they repeat. Every campus is applied in its own transaction; with
+    dry_run the counts are reported without changing anything.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdmin | IsHeadmaster]
+
+    def post(self, request):
+        user = request.user
+        academic_year = request.data.get('academic_year')
+        entries = request.data.get('classes') or []
+        dry_run = str(request.data.get('dry_run', False)).lower() in ('true', '1')
+
+        if not academic_year or not isinstance(entries, list) or not entries:
+            return Response({"error": "academic_year and a list of classes are required."}, status=status.HTTP_400_BAD_REQUEST)
+        academic_year_obj = resolve_academic_year(academic_year, user.school_id)
+        if not academic_year_obj:
+            return Response({"error": f"Academic year '{academic_year}' not found."}, status=status.HTTP_400_BAD_REQUEST)
+
+        plan = {}
+        try:
+            for entry in entries:
+                if 'next_class_id' not in entry:
+                    raise ValueError(f"next_class_id is missing for class {entry.get('class_id')} (use null for a final class)")
+                class_id = uuid.UUID(str(entry['class_id']))
+                if class_id in plan:
+                    raise ValueError(f"Class {class_id} appears more than once")
+                next_class_id = uuid.UUID(str(entry['next_class_id'])) if entry['next_class_id'] else None
+                repeaters = {uuid.UUID(str(student_id)) for student_id in entry.get('repeat_student_ids') or []}
+                plan[class_id] = (next_class_id, repeaters)
+        except (KeyError, TypeError, AttributeError, ValueError) as e:
+            return Response({"error": f"Invalid class entry: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Tenancy: every class must be in the user's school (and campus, for campus staff)
+        class_ids = set(plan) | {next_class_id for next_class_id, _ in plan.values()} - {None}
+        if not user.is_superuser:
+            outside = Class.objects.filter(id__in=class_ids).exclude(school_id=user.school_id)
+            if user.campus_id and not user.has_role('Admin'):
+                outside = outside | Class.objects.filter(id__in=class_ids).exclude(campus_id=user.campus_id)
+            if outside.exists():
+                logger.warning(f"User {user} attempted a rollover of classes outside their school or campus")
+                return Response({"error": "Some classes are not in your school or campus."}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            campuses = rollover(plan, academic_year_obj, dry_run=dry_run)
+        except RolloverError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'academic_year': str(academic_year_obj),
+            'dry_run': dry_run,
+            'campuses': campuses,
+        }, status=status.HTTP_200_OK)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated, IsRegisteredInSchoolOrCampus])
 def get_promoted_existing_repeated_students(request, class_id):
@@ -672,46 +723,28 @@ def get_promoted_existing_repeated_students(request, class_id):
         user_school_id = user.school_id
         user_campus_id = user.campus_id
 
-        # Ensure the class enrollment belongs to the same school/campus as the user
-        promoted_enrollments = ClassEnrollment.objects.filter(
-            class_id=new_class, status='promoted',
-            school_id=user_school_id, campus_id=user_campus_id
-        ).select_related('student')
+        # One query for the three lists; each student's previous class is the class of their
+        # latest history row, resolved by a correlated subquery instead of a query per student
+        previous_class = HistoricalClassEnrollment.objects.filter(
+            student_id=OuterRef('student_id')
+        ).order_by('-created_at', '-id').values('class_enrolled__name')[:1]
 
-        existing_enrollments = ClassEnrollment.objects.filter(
-            class_id=new_class, status='existing',
+        # Ensure the class enrollment belongs to the same school/campus as the user
+        enrollments = ClassEnrollment.objects.filter(
+            class_id=new_class, status__in=['promoted', 'existing', 'repeated'],
             school_id=user_school_id, campus_id=user_campus_id
-        ).select_related('student')
+        ).select_related('student', 'academic_year').annotate(
+            previous_class_name=Subquery(previous_class)
+        ).order_by('student__username', 'id')
 
-        repeated_enrollments = ClassEnrollment.objects.filter(
-            class_id=new_class, status='repeated',
-            school_id=user_school_id, campus_id=user_campus_id
-        ).select_related('student')
-
-        promoted_students_data = []
-        for enrollment in promoted_enrollments:
-            historical_enrollment = HistoricalClassEnrollment.objects.filter(student=enrollment.student).order_by('-id').first()
-            previous_class_name = historical_enrollment.class_enrolled.name if historical_enrollment else None
-            student_data = StudentSerializer(enrollment.student).data
-            student_data['previous_class_name'] = previous_class_name
-            promoted_students_data.append(student_data)
-
-        existing_students_data = StudentSerializer(
-            [enrollment.student for enrollment in existing_enrollments], many=True
-        ).data
-
-        repeated_students_data = []
-        for enrollment in repeated_enrollments:
-            historical_enrollment = HistoricalClassEnrollment.objects.filter(student=enrollment.student).order_by('-id').first()
-            previous_class_name = historical_enrollment.class_enrolled.name if historical_enrollment else None
-            student_data = StudentSerializer(enrollment.student).data
-            student_data['previous_class_name'] = previous_class_name
-            repeated_students_data.append(student_data)
+        by_status = {'promoted': [], 'existing': [], 'repeated': []}
+        for enrollment in enrollments:
+            by_status[enrollment.status].append(enrollment)
 
         return Response({
-            "promoted_students": promoted_students_data,
-            "existing_students": existing_students_data,
-            "repeated_students": repeated_students_data
+            "promoted_students": PromotionStudentSerializer(by_status['promoted'], many=True).data,
+            "existing_students": PromotionStudentSerializer(by_status['existing'], many=True).data,
+            "repeated_students": PromotionStudentSerializer(by_status['repeated'], many=True).data,
         }, status=status.HTTP_200_OK)
 
     except Exception as e:
@@ -727,6 +760,11 @@ def merge_promoted_repeated_students(request):
     if not student_ids or not class_id:
         return Response({"error": "Missing required parameters."}, status=status.HTTP_400_BAD_REQUEST)
 
+    try:
+        student_ids = list(dict.fromkeys(uuid.UUID(str(student_id)) for student_id in student_ids))
+    except ValueError:
+        return Response({"error": "student_ids must be a list of student ids."}, status=status.HTTP_400_BAD_REQUEST)
+
     try:
         # Verify that the class exists
         target_class = get_object_or_404(Class, id=class_id)
@@ -740,24 +778,18 @@ def merge_promoted_repeated_students(request):
         if target_class.school_id != user_school_id or target_class.campus_id != user_campus_id:
             return Response({"error": "Permission denied. You are not assigned to this class."}, status=status.HTTP_403_FORBIDDEN)
 
-        for student_id in student_ids:
-            student = get_object_or_404(User, id=student_id, roles__name="Student")
-
-            # Find enrollments where the student is promoted or repeated in the given class
-            class_enrollments = ClassEnrollment.objects.filter(
-                student=student,
-                class_id=target_class,
-                status__in=['promoted', 'repeated'],
-                school_id=user_school_id,
-                campus_id=user_campus_id
-            )
-
-            if not class_enrollments.exists():
-                return Response({"error": f"Student {student_id} is not enrolled as 'promoted' or 'repeated' in this class."},
-                                status=status.HTTP_400_BAD_REQUEST)
-
-            # Update status to 'existing'
-            class_enrollments.update(status='existing')
+        # Validate every student in one query, then merge them all with a single UPDATE
+        ineligible, _ = merge_into_existing(target_class, student_ids, user_school_id, user_campus_id)
+        if ineligible:
+            # Report the first offending student like before, and the full list alongside
+            student_id, reason = next(iter(ineligible.items()))
+            offending = [str(student_id) for student_id in ineligible]
+            if reason == 'not_found':
+                return Response({"error": f"Student {student_id} not found.", "student_ids": offending},
+                                status=status.HTTP_404_NOT_FOUND)
+            return Response({"error": f"Student {student_id} is not enrolled as 'promoted' or 'repeated' in this class.",
+                             "student_ids": offending},
+                            status=status.HTTP_400_BAD_REQUEST)
 
         return Response({"message": "Students merged successfully."}, status=status.HTTP_200_OK)
 
@@ -910,6 +942,10 @@ def get_student(request, student_id):
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated, IsTeacherInSchoolOrCampus])
 def create_assessments(request):
+    """
+    Create assessments for one or more classes and subjects.
+    Pass `?mode=bulk` to get a compact summary with per-row errors instead of the serialized rows.
+    """
     if request.method == 'POST':
         teacher = request.user  # Get the authenticated teacher
 
@@ -918,70 +954,17 @@ def create_assessments(request):
             return Response({'error': 'Teacher must be registered to a school and campus.'}, status=status.HTTP_403_FORBIDDEN)
 
         assessments_data = request.data.get('assessments', [])  # Get the list of assessment data from the request
-        created_assessments = []
-        errors = []
+        if not isinstance(assessments_data, list):
+            return Response({'error': 'assessments must be a list.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        for data in assessments_data:
-            # Extract class, subject, and student marks data
-            class_id = data.pop('class_id')
-            subject_id = data.pop('subject')
-            students_data = data.pop('student_marks', [])
+        # Resolve, validate and insert every row in a fixed number of queries
+        created_assessments, errors = bulk_create_assessments(teacher, assessments_data)
 
-            try:
-                # Fetch class and subject with tenancy check
-                class_obj = Class.objects.get(id=class_id, school=teacher.school, campus=teacher.campus)
-                subject = Subject.objects.get(id=subject_id, school=teacher.school, campus=teacher.campus)
-
-                # Check if the teacher is assigned to teach the subject in the specified class
-                teacher_level_class = TeacherLevelClass.objects.filter(
-                    teacher=teacher, class_id=class_obj, subjects_taught=subject
-                ).first()
-                if not teacher_level_class:
-                    errors.append({'error': f'Teacher is not assigned to teach subject ID {subject_id} in class ID {class_id} at this school/campus.'})
-                    continue
-
-                for student_data in students_data:
-                    student_id = student_data.get('id')
-                    obtained_marks = student_data.get('obtained_marks')
-
-                    try:
-                        # Fetch student with tenancy check
-                        student = User.objects.get(id=student_id, roles__name='Student', school=teacher.school, campus=teacher.campus)
-
-                        # Validate and convert total_marks and obtained_marks to Decimal
-                        total_marks = data.get('total_marks', '0.00')
-                        obtained_marks = obtained_marks if obtained_marks not in [None, ""] else "0.00"
-
-                        try:
-                            total_marks = Decimal(total_marks)
-                            obtained_marks = Decimal(obtained_marks)
-                        except InvalidOperation:
-                            errors.append({'error': f"Invalid marks format for student ID {student_id}."})
-                            continue
-
-                        # Create the assessment entry
-                        assessment_instance = Assessment.objects.create(
-                            student=student,
-                            class_id=class_obj,
-                            teacher=teacher,
-                            subject=subject,
-                            school=teacher.school,
-                            campus=teacher.campus,
-                            total_marks=total_marks,
-                            topic=data.get('topic'),
-                            assessment_name=data.get('assessment_type'),
-                            term=data.get('term'),
-                            date=data.get('date'),
-                            obtained_marks=obtained_marks
-                        )
-                        created_assessments.append(assessment_instance)
-                    except User.DoesNotExist:
-                        errors.append({'error': f"Student ID {student_id} does not exist in this school and campus."})
-
-            except Class.DoesNotExist:
-                errors.append({'error': f"Class ID {class_id} does not exist in this school and campus."})
-            except Subject.DoesNotExist:
-                errors.append({'error': f"Subject ID {subject_id} does not exist in this school and campus."})
+        if request.query_params.get('mode') == 'bulk':
+            return Response(
+                {'created': len(created_assessments), 'errors': errors},
+                status=status.HTTP_207_MULTI_STATUS if errors else status.HTTP_201_CREATED
+            )
 
         if errors:
             return Response(errors, status=status.HTTP_400_BAD_REQUEST)
@@ -1135,71 +1118,11 @@ def update_assessments(request):
         teacher = request.user  # Get the authenticated user (teacher)
 
         assessments_data = request.data.get('assessments', [])  # List of assessments to update
-        
-        updated_assessments = []
-        errors = []
-        
-        for data in assessments_data:
-            assessment_id = data.pop('assessment_id', None)
-            class_id = data.pop('class_id', None)
-            subject_id = data.pop('subject', None)
-            student_id = data.pop('student', None)
-            school_id = data.pop('school', None)
-            campus_id = data.pop('campus', None)
-            obtained_marks = data.pop('obtained_marks', None)
-
-            # Validate required fields
-            if not all([assessment_id, class_id, subject_id, student_id, school_id, campus_id]):
-                errors.append({'detail': 'Missing required fields in request data.', 'assessment_id': assessment_id})
-                continue
-
-            # Fetch related models
-            try:
-                class_instance = Class.objects.get(pk=class_id)
-                student_instance = User.objects.get(pk=student_id, roles__name='Student')
-                subject_instance = Subject.objects.get(pk=subject_id)
-
-                # Fetch assessment and ensure it matches school & campus
-                assessment_instance = Assessment.objects.get(
-                    pk=assessment_id, school_id=school_id, campus_id=campus_id
-                )
-            except Class.DoesNotExist:
-                errors.append({'detail': f'Class with ID {class_id} not found.', 'assessment_id': assessment_id})
-                continue
-            except User.DoesNotExist:
-                errors.append({'detail': f'Student with ID {student_id} not found.', 'assessment_id': assessment_id})
-                continue
-            except Subject.DoesNotExist:
-                errors.append({'detail': f'Subject with ID {subject_id} not found.', 'assessment_id': assessment_id})
-                continue
-            except Assessment.DoesNotExist:
-                errors.append({'detail': f'Assessment with ID {assessment_id} does not exist in the specified school and campus.', 'assessment_id': assessment_id})
-                continue
-
-            # Ensure the teacher is assigned to teach this subject in the class
-            teacher_level_class = TeacherLevelClass.objects.filter(
-                teacher=teacher, class_id=class_instance, subjects_taught=subject_instance
-            ).exists()
+        if not isinstance(assessments_data, list):
+            return Response({'detail': 'assessments must be a list.'}, status=status.HTTP_400_BAD_REQUEST)
 
-            if not teacher_level_class:
-                errors.append({'detail': f'Teacher is not assigned to teach subject {subject_id} in class {class_id}.', 'assessment_id': assessment_id})
-                continue
-
-            # Update the assessment instance
-            update_data = {
-                'obtained_marks': obtained_marks,
-                'student': student_instance.pk,
-                'teacher': teacher.pk,
-                'subject': subject_instance.pk,
-                'class_id': class_instance.pk,
-            }
-
-            serializer = AssessmentSerializer(assessment_instance, data=update_data, partial=True)
-            if serializer.is_valid():
-                updated_instance = serializer.save()
-                updated_assessments.append(updated_instance)
-            else:
-                errors.append({'assessment_id': assessment_id, 'errors': serializer.errors})
+        # Fetch, authorise and save the whole batch in a fixed number of queries
+        updated_assessments, errors = bulk_update_assessments(teacher, assessments_data)
 
         if errors:
             return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
@@ -1897,18 +1820,92 @@ class SemesterResultsView(APIView):
 
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
+
+
+class ClassRankingView(APIView):
+    """
+    Class-wide ranking for a term. Positions are computed in the database with a
+    RANK() window over total_score, so tied students share a position.
+    Teachers, headmasters and admins see the whole class; students only see their own
+    row and parents their children's. POST writes the positions back onto ProcessedMarks.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsRegisteredInSchoolOrCampus]
+
+    def get_permissions(self):
+        if self.request.method == "POST":
+            return [permissions.IsAuthenticated(), IsTeacherOrAdminInSchoolOrCampus()]
+        return super().get_permissions()
+
+    def check_class(self, user, class_id):
+        class_instance = Class.objects.filter(id=class_id).values('school_id', 'campus_id').first()
+        if not class_instance:
+            return Response({'error': 'Class not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        if not user.is_superuser and (
+            class_instance['school_id'] != user.school_id or class_instance['campus_id'] != user.campus_id
+        ):
+            return Response({'error': 'You can only view rankings for your school and campus.'}, status=status.HTTP_403_FORBIDDEN)
+        return None
+
+    def get(self, request, class_id, term_id):
+        user = request.user
+        error = self.check_class(user, class_id)
+        if error:
+            return error
+
+        rows = ranked_processed_marks(class_id, term_id).values(
+            'rank', 'student_id', 'student__first_name', 'student__last_name', 'student__username',
+            'total_score', 'status'
+        )
+        ranking = [
+            {
+                'position': get_position_suffix(row['rank']),
+                'rank': row['rank'],
+                'student_id': row['student_id'],
+                'student_name': f"{row['student__first_name']} {row['student__last_name']}".strip() or row['student__username'],
+                'total_score': row['total_score'],
+                'status': row['status'],
+            }
+            for row in rows
+        ]
+
+        if not (user.is_superuser or any(user.has_role(role) for role in ('Teacher', 'Headmaster', 'Admin'))):
+            # Ranks are computed over the whole class first, then narrowed to the user's own students
+            visible = {user.id}
+            if user.has_role('Parent'):
+                visible.update(StudentParentRelation.objects.filter(parent=user).values_list('student_id', flat=True))
+            ranking = [row for row in ranking if row['student_id'] in visible]
+        return Response(ranking, status=status.HTTP_200_OK)
+
+    def post(self, request, class_id, term_id):
+        error = self.check_class(request.user, class_id)
+        if error:
+            return error
+
+        changed = rank_processed_marks(class_id, term_id)
+        logger.info(f"Ranked class {class_id} for term {term_id}: {changed} positions changed")
+        return Response({'message': 'Class positions updated.', 'changed': changed}, status=status.HTTP_200_OK)
+
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated, IsAssignedTeacher])
 def create_timetable(request):
+    """
+    Create a class's timetable entries in bulk. Entries that overlap another slot of the class,
+    or another lesson of the same teacher in any class, are returned as conflicts (409) and
+    nothing is saved. With `replace` the class's current timetable is swapped for the entries.
+    """
     user = request.user  # Get the requesting user
     class_id = request.data.get('class_id')
     timetable_entries = request.data.get('timetable_entries', [])
+    replace = str(request.data.get('replace', '')).lower() in ('1', 'true', 'yes')
+
+    if not isinstance(timetable_entries, list) or not all(isinstance(entry, dict) for entry in timetable_entries):
+        return Response({"error": "timetable_entries must be a list of entries."}, status=status.HTTP_400_BAD_REQUEST)
 
     try:
         class_instance = Class.objects.get(id=class_id)
-    except Class.DoesNotExist:
+    except (Class.DoesNotExist, ValidationError):
         return Response({"error": "Class not found"}, status=status.HTTP_404_NOT_FOUND)
 
     # Ensure the requesting user belongs to the same school and campus as the class
@@ -1918,54 +1915,36 @@ def create_timetable(request):
             status=status.HTTP_403_FORBIDDEN
         )
 
-    # Assign a default class for the 'Break' subject
-    break_subject, _ = Subject.objects.get_or_create(
-        name='Break',
-        defaults={'class_id': class_instance}
-    )
-
-    created_entries = []  # Track created entries for response
-
-    for entry in timetable_entries:
-        subject_id = entry.get('subject')
-        day = entry.get('day')
-        start_time = entry.get('startTime')
-        end_time = entry.get('endTime')
-
-        subject_instance = break_subject if not subject_id else get_object_or_404(Subject, id=subject_id)
-
-        # Retrieve the teacher if applicable
-        teacher = None
-        if subject_id:
-            teacher_class = TeacherLevelClass.objects.filter(
-                class_id=class_instance,
-                subjects_taught=subject_instance
-            ).first()
-            teacher = teacher_class.teacher if teacher_class else None
-
-        # Create the timetable entry with school and campus details
-        timetable_entry = TimeTable.objects.create(
-            school_id=user.school_id,  # Assign school ID
-            campus_id=user.campus_id,  # Assign campus ID
-            class_id=class_instance,
-            subject=subject_instance,
-            teacher=teacher,
-            day=day,
-            start_time=start_time,
-            end_time=end_time,
-        )
+    try:
+        entries = build_class_entries(class_instance, timetable_entries)
+    except Subject.DoesNotExist as e:
+        return Response({"error": str(e)}, status=status.HTTP_404_NOT_FOUND)
+    except TimetableError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    with transaction.atomic():
+        conflicts = find_conflicts(entries, [class_instance.id], replace=replace)
+        if conflicts:
+            return Response(
+                {"error": "Timetable entries clash with existing slots.", "conflicts": conflicts},
+                status=status.HTTP_409_CONFLICT
+            )
+        save_timetables(entries, [class_instance.id], replace=replace)
 
-        created_entries.append({
+    created_entries = [
+        {
+            "id": entry.id,
             "class_id": class_instance.id,
-            "school_id": user.school_id,
-            "campus_id": user.campus_id,
-            "subject": subject_instance.name,
-            "teacher": teacher.username if teacher else None,
-            "day": day,
-            "start_time": start_time,
-            "end_time": end_time,
-        })
-
+            "school_id": class_instance.school_id,
+            "campus_id": class_instance.campus_id,
+            "subject": entry.subject.name,
+            "teacher": entry.teacher.username if entry.teacher else None,
+            "day": entry.day,
+            "start_time": entry.start_time,
+            "end_time": entry.end_time,
+        }
+        for entry in entries
+    ]
     return Response(
         {"message": "Timetable entries created successfully", "created_entries": created_entries},
         status=status.HTTP_201_CREATED
@@ -1975,9 +1954,10 @@ def create_timetable(request):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated, IsRegisteredInSchoolOrCampus])
 def view_timetable(request, class_id):
-    timetable = TimeTable.objects.filter(class_id=class_id)
+    paginator = KeysetPagination()
+    timetable = paginator.paginate_queryset(TimeTable.objects.filter(class_id=class_id), request)
     serializer = TimeTableSerializer(timetable, many=True)
-    return Response(serializer.data)
+    return paginator.get_paginated_response(serializer.data)
 
 @api_view(['PUT'])
 @permission_classes([permissions.IsAuthenticated, IsAssignedTeacher])
@@ -2007,6 +1987,121 @@ def delete_timetable(request, pk):
     return Response({"message": "TimeTable entry deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
 
 
+class TimetableGeneratorView(APIView):
+    """
+    Generate the timetables of a campus's classes, replacing the ones they have:
+
+        {"campus_id": ..., "dry_run": true, "time_limit": 5,
+         "days": ["Monday", ...], "periods": [{"startTime": "08:00", "endTime": "08:45"}, ...],
+         "requirements": [{"class_id": ..., "subject": ..., "periods": 4}, ...],
+         "teacher_unavailable": [{"teacher": ..., "day": "Friday", "startTime": "12:00", "endTime": "15:00"}]}
+
+    Without requirements every subject taught in a class gets `periods_per_subject` periods a
+    week. Teachers come from the class assignments. If some lessons can't be placed without a
+    clash they are returned (409) and nothing is saved; with dry_run the timetable is returned
+    instead of saved.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdmin | IsHeadmaster]
+
+    def post(self, request):
+        user = request.user
+        data = request.data
+        dry_run = str(data.get('dry_run', False)).lower() in ('true', '1')
+
+        try:
+            campus_id = uuid.UUID(str(data.get('campus_id') or user.campus_id))
+        except ValueError:
+            campus_id = None
+        campus = Campus.objects.filter(id=campus_id).first() if campus_id else None
+        if not campus:
+            return Response({"error": "Campus not found."}, status=status.HTTP_404_NOT_FOUND)
+        if not user.is_superuser and (
+            campus.school_id != user.school_id or (user.campus_id and not user.has_role('Admin') and campus.id != user.campus_id)
+        ):
+            logger.warning(f"User {user} attempted to generate a timetable for campus {campus.id}")
+            return Response({"error": "You can only generate timetables for your school or campus."}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            days = [normalize_day(day) for day in data.get('days') or SCHOOL_DAYS]
+            periods = parse_periods(data.get('periods') or [])
+            if not periods or len(set(days)) != len(days):
+                raise TimetableError("periods are required and days may not repeat")
+            slots = len(days) * len(periods)
+
+            time_limit = float(data.get('time_limit') or settings.TIMETABLE_SOLVER_TIME_LIMIT)
+            if not math.isfinite(time_limit) or time_limit <= 0:
+                raise TimetableError("time_limit must be a positive number of seconds")
+            time_limit = min(time_limit, settings.TIMETABLE_SOLVER_TIME_LIMIT)
+
+            # A class can't have more lessons of a subject than there are periods in the week,
+            # and the lessons are expanded one by one, so anything larger is refused up front
+            requirements = None
+            if data.get('requirements'):
+                requirements = {}
+                for entry in data['requirements']:
+                    key = (uuid.UUID(str(entry['class_id'])), uuid.UUID(str(entry['subject'])))
+                    count = int(entry['periods'])
+                    # Repeated entries of a class and subject add up
+                    if count < 1 or requirements.get(key, 0) + count > slots:
+                        raise TimetableError(f"periods of a class and subject must be between 1 and {slots}")
+                    requirements[key] = requirements.get(key, 0) + count
+            periods_per_subject = int(data.get('periods_per_subject') or 0)
+            if requirements is None and not 1 <= periods_per_subject <= slots:
+                raise TimetableError(f"Either requirements or periods_per_subject (1 to {slots}) is required")
+
+            unavailable = [
+                (uuid.UUID(str(entry['teacher'])), normalize_day(entry['day']),
+                 parse_slot_time(entry['startTime']), parse_slot_time(entry['endTime']))
+                for entry in data.get('teacher_unavailable') or []
+            ]
+        except (TimetableError, KeyError, TypeError, AttributeError, ValueError) as e:
+            return Response({"error": f"Invalid timetable request: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if requirements:
+            class_ids = {class_id for class_id, _ in requirements}
+            if Class.objects.filter(id__in=class_ids, campus=campus).count() != len(class_ids):
+                return Response({"error": "Some classes are not in this campus."}, status=status.HTTP_400_BAD_REQUEST)
+            subject_ids = {subject_id for _, subject_id in requirements}
+            if Subject.objects.filter(id__in=subject_ids, school_id=campus.school_id, campus=campus).count() != len(subject_ids):
+                return Response({"error": "Some subjects were not found in this campus."}, status=status.HTTP_400_BAD_REQUEST)
+
+        lessons = campus_lessons(campus.id, requirements, periods_per_subject)
+        if not lessons:
+            return Response({"error": "There are no lessons to schedule."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            solver, unplaced, entries = generate_timetable(
+                campus, lessons, periods, days=days, unavailable=unavailable, time_limit=time_limit, dry_run=dry_run,
+            )
+        except TimetableError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        stats = solver.stats
+        logger.info(f"Timetable for campus {campus.id} ({len(lessons)} lessons, dry_run={dry_run}): {stats}")
+        result = {
+            'campus_id': campus.id,
+            'dry_run': dry_run,
+            'lessons': len(lessons),
+            'placed': len(lessons) - len(unplaced),
+            'soft_cost': stats['soft_cost'],
+            'seconds': round(stats['seconds'], 3),
+        }
+        if unplaced:
+            result['error'] = "Some lessons could not be placed without a clash; nothing was saved."
+            result['unplaced'] = [lesson._asdict() for lesson in unplaced]
+            return Response(result, status=status.HTTP_409_CONFLICT)
+        if dry_run:
+            result['timetable'] = [
+                {
+                    'class_id': entry.class_id_id, 'subject_id': entry.subject_id, 'teacher_id': entry.teacher_id,
+                    'day': entry.day, 'start_time': entry.start_time, 'end_time': entry.end_time,
+                }
+                for entry in entries
+            ]
+            return Response(result, status=status.HTTP_200_OK)
+        return Response(result, status=status.HTTP_201_CREATED)
+
+
 class AssessmentNameListCreateView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsTeacherOrAdminInSchoolOrCampus]
 
@@ -1,17 +1,19 @@
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.db.models import Avg, F
+from django.db.models import Sum
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from rest_framework.views import APIView
 import logging
 
 from user_auth.serializers import UserSerializer
+from user_auth.utils import serializable_users
+from edu_performance_monitoring_app.pagination import KeysetPagination
 from student_performance.serializers import TeacherLevelClassSerializer
 from teachers.serializers import MainTeacherAssignmentSerializer
 from user_auth.models import Role
-from student_performance.models import TeacherLevelClass, Class, Subject, ClassEnrollment, HistoricalClassEnrollment, Assessment
+from student_performance.models import TeacherLevelClass, Class, Subject, ClassPerformanceSummary
 from user_auth.permissions import IsAdmin, IsTeacherOrAdmin
 
 logger = logging.getLogger(__name__)
@@ -61,13 +63,15 @@ class TeacherListView(APIView):
             return Response({"error": "Teacher role does not exist."}, status=404)
 
         # Filter users with the "Teacher" role
-        teachers = User.objects.filter(roles=teacher_role)
+        teachers = serializable_users(User.objects.filter(roles=teacher_role))
 
-        # Serialize the queryset
-        serializer = UserSerializer(teachers, many=True)
+        # Serialize one cursor page of the queryset
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(teachers, request, view=self)
+        serializer = UserSerializer(page, many=True)
 
         # Return the serialized data
-        return Response(serializer.data)
+        return paginator.get_paginated_response(serializer.data)
     
 
 class AssignMainTeacherView(APIView):
@@ -133,35 +137,25 @@ class TeacherPerformanceView(APIView):
 
             teacher = teacher_level_class.teacher
 
-            # Fetch all academic years from both current and historical enrollments for this class
-            academic_years = list(
-                ClassEnrollment.objects.filter(class_id=class_id).values_list('academic_year', flat=True)
-            ) + list(
-                HistoricalClassEnrollment.objects.filter(class_enrolled=class_id).values_list('academic_year', flat=True)
-            )
+            # Mean percentage (obtained / total * 100) of the teacher's assessments per academic year
+            # and term, read from the pre-aggregated class summaries rather than the raw assessments
+            summaries = ClassPerformanceSummary.objects.filter(
+                class_id=class_id, subject_id=subject_id, teacher=teacher
+            ).values('academic_year', 'term__name').annotate(
+                total_percentage=Sum('percentage_sum'),
+                total_marked=Sum('marked_count'),
+            ).order_by()
 
-            # Fetch performance data for each academic year and both semesters, scaling to 100%
+            # Prepare structure to hold data for both semesters in each academic year
             performance_data = {}
-            for academic_year in academic_years:
-                assessments = Assessment.objects.filter(
-                    class_id=class_id,
-                    subject_id=subject_id,
-                    teacher=teacher,
-                    class_id__classenrollment__academic_year=academic_year
-                ).values('semester').annotate(
-                    average_score=Avg((F('obtained_marks') / F('total_marks')) * 100)
-                )
-
-                # Prepare structure to hold data for both semesters in each academic year
-                performance_data[academic_year] = {
+            for summary in summaries:
+                academic_year = str(summary['academic_year']) if summary['academic_year'] else None
+                semesters = performance_data.setdefault(academic_year, {
                     '1st Semester': None,
                     '2nd Semester': None,
-                }
-
-                for assessment in assessments:
-                    semester = assessment['semester']
-                    avg_score = assessment['average_score']
-                    performance_data[academic_year][semester] = avg_score
+                })
+                if summary['total_marked']:
+                    semesters[summary['term__name']] = summary['total_percentage'] / summary['total_marked']
 
             return Response({
                 "teacher": teacher.username,
@@ -0,0 +1,18 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+
+class RoleClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that seeds `user.role_names` from the token's `roles` claim.
+
+    The claim is only trusted when the token's `role_version` matches the user row that
+    JWTAuthentication loads anyway, so permission checks cost no role queries while a
+    role change still takes effect immediately for tokens issued before it.
+    """
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        roles = validated_token.get('roles')
+        if roles is not None and validated_token.get('role_version') == user.role_version:
+            user._role_names = frozenset(roles)
+        return user
@@ -0,0 +1,125 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .importers import StudentParentImporter, UserImporter
+from .models import ImportJob
+from .spreadsheets import SpreadsheetReader
+
+logger = logging.getLogger(__name__)
+
+THREAD = 'thread'
+WORKER = 'worker'
+
+IMPORTERS = {
+    ImportJob.USERS: UserImporter,
+    ImportJob.STUDENT_PARENTS: StudentParentImporter,
+}
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='import-jobs')
+
+
+def get_import_job_mode():
+    return getattr(settings, 'IMPORT_JOB_MODE', THREAD)
+
+
+def enqueue_import_job(kind, upload, user):
+    """
+    Store an uploaded spreadsheet as a queued ImportJob. In 'thread' mode the job is run by
+    a background thread of this process once the transaction commits; in 'worker' mode it
+    is left to `manage.py run_import_jobs`.
+    """
+    job = ImportJob.objects.create(kind=kind, file=upload, file_name=upload.name, created_by=user)
+    logger.info(f"Queued {kind} import {job.id} ({upload.name}) for {user}")
+    if get_import_job_mode() == THREAD:
+        transaction.on_commit(lambda: _executor.submit(_drain))
+    return job
+
+
+def _drain():
+    try:
+        close_old_connections()
+        while run_next_import_job():
+            pass
+    except Exception as e:
+        logger.error(f"Error running queued import jobs: {str(e)}")
+    finally:
+        close_old_connections()
+
+
+def claim_import_job():
+    """
+    Mark the oldest queued job as running and return it (None when the queue is empty).
+    Running jobs without a heartbeat for IMPORT_JOB_STALE_AFTER seconds belonged to a worker
+    that died and are claimed again; rows imported before that are skipped as existing users.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=getattr(settings, 'IMPORT_JOB_STALE_AFTER', 1800))
+    with transaction.atomic():
+        job = (
+            ImportJob.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=ImportJob.QUEUED) | Q(status=ImportJob.RUNNING, updated_at__lt=stale))
+            .order_by('created_at')
+            .first()
+        )
+        if not job:
+            return None
+        job.status = ImportJob.RUNNING
+        job.started_at = now
+        job.error = None
+        job.save(update_fields=['status', 'started_at', 'error', 'updated_at'])
+    return job
+
+
+def run_next_import_job():
+    """Claim and run one job; returns it, or None when nothing is queued."""
+    job = claim_import_job()
+    if job:
+        run_import_job(job)
+    return job
+
+
+def _save_counts(job, result, **fields):
+    counts = result.counts
+    ImportJob.objects.filter(pk=job.pk).update(
+        rows_processed=counts['processed'],
+        created_count=counts['created'],
+        skipped_count=counts['skipped'],
+        failed_count=counts['failed'],
+        updated_at=timezone.now(),
+        **fields,
+    )
+
+
+def run_import_job(job):
+    """Stream the job's file through its importer chunk by chunk, saving the counts after every chunk."""
+    importer = None
+    try:
+        if job.created_by is None:
+            raise ValueError("The user who uploaded the file no longer exists")
+        importer_class = IMPORTERS[job.kind]
+        with job.file.open('rb') as f, SpreadsheetReader(f, job.file_name, importer_class.columns) as reader:
+            ImportJob.objects.filter(pk=job.pk).update(rows_total=reader.total_rows, updated_at=timezone.now())
+            importer = importer_class(job.created_by, progress=lambda result: _save_counts(job, result))
+            result = importer.run(reader.rows())
+    except Exception as e:
+        logger.exception(f"Import job {job.id} failed")
+        fields = {'status': ImportJob.FAILED, 'error': str(e), 'finished_at': timezone.now()}
+        if importer:
+            _save_counts(job, importer.result, skipped=importer.result.skipped, errors=importer.result.errors, **fields)
+        else:
+            ImportJob.objects.filter(pk=job.pk).update(**fields)
+        return
+
+    # The upload holds personal data and isn't needed once imported (failed uploads are kept to look into)
+    job.file.delete(save=False)
+    _save_counts(
+        job, result, status=ImportJob.COMPLETED, skipped=result.skipped, errors=result.errors,
+        finished_at=timezone.now(), file='',
+    )
+    logger.info(f"Import job {job.id} completed: {result.counts}")
@@ -0,0 +1,409 @@
+import logging
+import math
+from itertools import islice
+
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+from django.utils.crypto import get_random_string
+
+from .models import Role, User
+from .passwords import generate_default_password, hash_passwords
+from .signals import bump_role_version
+from administrator.models import AcademicYear
+from school.models import Campus, School
+from student_performance.models import Class, ClassEnrollment, StudentParentRelation
+
+logger = logging.getLogger(__name__)
+
+USER_COLUMNS = ['email', 'username', 'phone', 'gender', 'location', 'roles', 'school_name', 'campus_name']
+STUDENT_PARENT_COLUMNS = [
+    'parent_email', 'parent_username', 'parent_phone', 'parent_gender', 'parent_location',
+    'student_email', 'student_username', 'student_phone', 'student_gender', 'student_location',
+    'class_name', 'academic_year', 'school_name', 'campus_name',
+]
+IMPORT_CHUNK_SIZE = 500
+
+
+def clean_cell(value):
+    """Spreadsheet cell -> stripped string or None (blank cells, NaN, '12.0' style numbers)."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    value = str(value).strip()
+    return value or None
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class ImportResult:
+    """What an import did so far; filled in chunk by chunk."""
+
+    def __init__(self):
+        self.rows_processed = 0
+        self.created = []  # Per imported row: the user id, or (parent_id, student_id)
+        self.relations = []  # (relation_id, parent_id, student_id)
+        self.skipped = []
+        self.errors = []  # {'row': spreadsheet row number, 'error': message}
+
+    @property
+    def counts(self):
+        return {
+            'processed': self.rows_processed,
+            'created': len(self.created),
+            'skipped': len(self.skipped),
+            'failed': len(self.errors),
+        }
+
+
+def create_users_with_roles(pending, batch_size=IMPORT_CHUNK_SIZE):
+    """
+    Insert unsaved (user, roles) pairs whose `passcode` holds the plain default password.
+    The passwords are hashed together (spread over a process pool, see hash_passwords) and
+    the users and their role links are bulk inserted in one transaction.
+    """
+    users = [user for user, _ in pending]
+    for user, password in zip(users, hash_passwords(user.passcode for user in users)):
+        user.password = password
+
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=batch_size)
+        User.roles.through.objects.bulk_create(
+            [User.roles.through(user_id=user.id, role_id=role.id) for user, roles in pending for role in roles],
+            batch_size=batch_size,
+        )
+        # bulk_create sends no m2m_changed, so invalidate cached role sets here
+        bump_role_version([user.id for user in users])
+    for user in users:
+        user.role_version += 1
+    return users
+
+
+class ChunkedImporter:
+    """
+    Base of the spreadsheet importers. Rows are cleaned and handled `chunk_size` at a time:
+    resolve() loads whatever a chunk refers to in bulk, save() writes the chunk. If a chunk
+    fails in the database, its rows are retried one by one so that only the offending rows
+    end up in `errors`.
+    """
+    columns = []
+
+    def __init__(self, uploader, chunk_size=IMPORT_CHUNK_SIZE, progress=None):
+        self.uploader = uploader
+        self.chunk_size = chunk_size
+        self.progress = progress  # Called as progress(result) after every chunk
+        self.result = ImportResult()
+
+        self._schools = {}
+        self._campuses = {}
+        self._users_by_email = {}
+        self._users_by_username = {}
+
+    def run(self, rows):
+        """Import (row_number, {column: value}) pairs; returns the ImportResult."""
+        for chunk in batched(rows, self.chunk_size):
+            self.import_chunk(chunk)
+            self.result.rows_processed += len(chunk)
+            logger.info(f"{type(self).__name__} run by {self.uploader}: {self.result.counts}")
+            if self.progress:
+                self.progress(self.result)
+        return self.result
+
+    def import_chunk(self, chunk):
+        rows = []
+        for row_number, values in chunk:
+            row = {column: clean_cell(values.get(column)) for column in self.columns}
+            row['row'] = row_number
+            for column in self.columns:
+                if column.endswith('email') and row[column]:
+                    row[column] = row[column].lower()
+            rows.append(row)
+
+        self.resolve(rows)
+        try:
+            self.save(rows)
+        except DatabaseError as e:
+            if len(rows) == 1:
+                self.result.errors.append({'row': rows[0]['row'], 'error': str(e)})
+                return
+            logger.warning(f"{type(self).__name__} chunk failed ({e}), retrying its {len(rows)} rows one by one")
+            for row_number, values in chunk:
+                self.import_chunk([(row_number, values)])
+
+    def resolve(self, rows):
+        """Load everything the rows refer to that earlier chunks haven't loaded yet."""
+        raise NotImplementedError
+
+    def save(self, rows):
+        raise NotImplementedError
+
+    def resolve_schools(self, rows, school_ids=()):
+        """Schools by name, and campuses by (school id, name) within those schools and `school_ids`."""
+        school_names = {row['school_name'] for row in rows if row['school_name']} - set(self._schools)
+        for school in School.objects.filter(name__in=school_names):
+            self._schools[school.name] = school
+
+        school_ids = ({school.id for school in self._schools.values()} | set(school_ids)) - {None}
+        campus_names = {row['campus_name'] for row in rows if row['campus_name']}
+        missing = {(school_id, name) for school_id in school_ids | {None} for name in campus_names} - set(self._campuses)
+        if missing:
+            campuses = Campus.objects.filter(
+                Q(school_id__in={key[0] for key in missing} - {None}) | Q(school__isnull=True),
+                name__in={key[1] for key in missing},
+            )
+            for campus in campuses:
+                self._campuses[(campus.school_id, campus.name)] = campus
+        return school_ids
+
+    def resolve_users(self, emails, usernames):
+        """Existing users with any of the emails or usernames."""
+        emails = set(emails) - {None} - set(self._users_by_email)
+        usernames = set(usernames) - {None} - set(self._users_by_username)
+        if emails or usernames:
+            for user in User.objects.filter(Q(email__in=emails) | Q(username__in=usernames)).order_by('date_joined', 'id'):
+                self.remember_user(user)
+
+    def remember_user(self, user):
+        if user.email:
+            self._users_by_email.setdefault(user.email, user)
+        if user.username:
+            self._users_by_username.setdefault(user.username, user)
+
+    def existing_user(self, staged, email, username):
+        # Same rule as before: match on email first, then on username
+        if email:
+            user = staged['by_email'].get(email) or self._users_by_email.get(email)
+            if user:
+                return user
+        if username:
+            return staged['by_username'].get(username) or self._users_by_username.get(username)
+        return None
+
+    def stage(self, staged, user):
+        if user.email:
+            staged['by_email'][user.email] = user
+        if user.username:
+            staged['by_username'][user.username] = user
+        return user
+
+
+class UserImporter(ChunkedImporter):
+    """
+    Creates users from spreadsheet rows (see USER_COLUMNS) with the comma separated roles
+    of each row. Rows of users that already exist, or whose school or campus is unknown,
+    are skipped.
+    """
+    columns = USER_COLUMNS
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.roles = {role.name: role for role in Role.objects.all()}
+
+    def resolve(self, rows):
+        self.resolve_schools(rows)
+        self.resolve_users({row['email'] for row in rows}, {row['username'] for row in rows})
+
+    def save(self, rows):
+        staged = {'by_email': {}, 'by_username': {}}
+        pending, skipped = [], []
+
+        for row in rows:
+            email, username = row['email'], row['username']
+            if self.existing_user(staged, email, username):
+                skipped.append({'row': row['row'], 'email': email, 'username': username, 'reason': 'User already exists'})
+                continue
+
+            school = campus = None
+            if row['school_name']:
+                school = self._schools.get(row['school_name'])
+                if not school:
+                    skipped.append({'row': row['row'], 'email': email, 'username': username, 'reason': f"School '{row['school_name']}' not found"})
+                    continue
+            if row['campus_name']:
+                campus = self._campuses.get((school.id if school else None, row['campus_name']))
+                if not campus:
+                    skipped.append({'row': row['row'], 'email': email, 'username': username, 'reason': f"Campus '{row['campus_name']}' not found"})
+                    continue
+
+            role_names = [name.strip() for name in row['roles'].split(',')] if row['roles'] else []
+            # `passcode` keeps the plain default password; create_users_with_roles() hashes it
+            user = self.stage(staged, User(
+                email=email, username=username, phone=row['phone'], gender=row['gender'], location=row['location'],
+                passcode=generate_default_password(), school=school, campus=campus,
+            ))
+            pending.append((user, [self.roles[name] for name in role_names if name in self.roles]))
+
+        users = create_users_with_roles(pending, batch_size=self.chunk_size)
+
+        # Only remember users once they are committed, a failed chunk is retried
+        for user in users:
+            self.remember_user(user)
+        self.result.created.extend(user.id for user in users)
+        self.result.skipped.extend(skipped)
+
+
+class StudentParentImporter(ChunkedImporter):
+    """
+    Creates parents and students from spreadsheet rows (see STUDENT_PARENT_COLUMNS), enrolls
+    new students in their class and links each student to the parent.
+
+    The schools, campuses, classes, academic years and existing users a chunk refers to are
+    resolved with one query each (and remembered for later chunks), new passwords are hashed
+    in a process pool, and the users, role links, enrollments and relations are inserted
+    with bulk_create in one transaction per chunk.
+    """
+    columns = STUDENT_PARENT_COLUMNS
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        roles = {role.name: role for role in Role.objects.filter(name__in=['Parent', 'Student'])}
+        self.roles = {name: roles.get(name) or Role.objects.create(name=name) for name in ['Parent', 'Student']}
+
+        self._classes = {}
+        self._years = {}
+
+    def resolve(self, rows):
+        school_ids = self.resolve_schools(rows, {self.uploader.school_id})
+
+        class_names = {row['class_name'] for row in rows if row['class_name']} - {key[2] for key in self._classes}
+        if class_names:
+            for class_obj in Class.objects.filter(school_id__in=school_ids, name__in=class_names).order_by('created_at', 'id'):
+                self._classes.setdefault((class_obj.school_id, class_obj.campus_id, class_obj.name), class_obj)
+                self._classes.setdefault((class_obj.school_id, None, class_obj.name), class_obj)
+
+        years = {self.parse_year(row['academic_year']) for row in rows} - {None} - {key[2] for key in self._years}
+        if years:
+            for year in AcademicYear.objects.filter(Q(school_id__in=school_ids) | Q(school__isnull=True), start_year__in=years):
+                self._years.setdefault((year.school_id, year.campus_id, year.start_year), year)
+                self._years.setdefault((year.school_id, None, year.start_year), year)
+
+        self.resolve_users(
+            {row[f'{who}_email'] for row in rows for who in ('parent', 'student')},
+            {row[f'{who}_username'] for row in rows for who in ('parent', 'student')},
+        )
+
+    @staticmethod
+    def parse_year(value):
+        try:
+            return int(value) if value else None
+        except ValueError:
+            return None
+
+    def tenant(self, row):
+        """(school, campus, error) for a row; blank names fall back to the uploader's school/campus."""
+        uploader = self.uploader
+        if row['school_name']:
+            school = self._schools.get(row['school_name'])
+            if not school:
+                return None, None, f"School '{row['school_name']}' does not exist"
+        else:
+            school = uploader.school
+        if school and uploader.school_id and school.id != uploader.school_id and not uploader.is_superuser:
+            return None, None, "You can only import users into your own school"
+
+        if row['campus_name']:
+            campus = self._campuses.get((school.id if school else None, row['campus_name']))
+            if not campus:
+                return None, None, f"Campus '{row['campus_name']}' does not exist"
+        else:
+            campus = uploader.campus if school and school.id == uploader.school_id else None
+        return school, campus, None
+
+    def lookup(self, resolved, school, campus, key):
+        school_id = school.id if school else None
+        campus_id = campus.id if campus else None
+        return (
+            resolved.get((school_id, campus_id, key))
+            or resolved.get((school_id, None, key))
+            or resolved.get((None, None, key))
+        )
+
+    def stage_user(self, staged, row, who, school, campus, password):
+        # `passcode` keeps the plain password, create_users_with_roles() hashes it
+        return self.stage(staged, User(
+            email=row[f'{who}_email'], username=row[f'{who}_username'], phone=row[f'{who}_phone'],
+            gender=row[f'{who}_gender'], location=row[f'{who}_location'], passcode=password,
+            school=school, campus=campus,
+        ))
+
+    def save(self, rows):
+        result = self.result
+        staged = {'by_email': {}, 'by_username': {}}
+        pending, enrollments, pairs = [], [], []
+        skipped, errors, created = [], [], []
+
+        for row in rows:
+            student_ref = {"email": row['student_email'], "username": row['student_username']}
+            parent_ref = {"email": row['parent_email'], "username": row['parent_username']}
+            if not (row['student_email'] or row['student_username']) or not (row['parent_email'] or row['parent_username']):
+                errors.append({'row': row['row'], 'error': "Parent and student each need an email or a username"})
+                continue
+
+            school, campus, error = self.tenant(row)
+            if error:
+                errors.append({'row': row['row'], 'error': error})
+                continue
+
+            class_obj = None
+            if row['class_name']:
+                class_obj = self.lookup(self._classes, school, campus, row['class_name'])
+                if not class_obj:
+                    skipped.append({"row": row['row'], "student": student_ref, "reason": f"Class '{row['class_name']}' does not exist"})
+                    continue
+
+            academic_year = None
+            if row['academic_year']:
+                academic_year = self.lookup(self._years, school, campus, self.parse_year(row['academic_year']))
+                if not academic_year:
+                    skipped.append({"row": row['row'], "student": student_ref, "reason": f"Academic year '{row['academic_year']}' does not exist"})
+                    continue
+
+            parent = self.existing_user(staged, row['parent_email'], row['parent_username'])
+            student = self.existing_user(staged, row['student_email'], row['student_username'])
+            if parent and student:
+                skipped.append({
+                    "row": row['row'], "parent": parent_ref, "student": student_ref,
+                    "reason": "Both parent and student already exist",
+                })
+                continue
+
+            # Both new accounts of a row start with the same generated password
+            default_password = get_random_string(8)
+            if not parent:
+                parent = self.stage_user(staged, row, 'parent', school, campus, default_password)
+                pending.append((parent, [self.roles['Parent']]))
+            if not student:
+                student = self.stage_user(staged, row, 'student', school, campus, default_password)
+                pending.append((student, [self.roles['Student']]))
+                if class_obj:
+                    enrollments.append(ClassEnrollment(
+                        school=school, campus=campus, student=student, class_id=class_obj,
+                        academic_year=academic_year, status='existing',
+                    ))
+
+            pairs.append((parent, student, school, campus))
+            created.append((parent.id, student.id))
+
+        # Rows where both users already existed were skipped above, so every pair involves a
+        # new user and can't be linked yet
+        relations = [
+            StudentParentRelation(school=school, campus=campus, student=student, parent=parent)
+            for parent, student, school, campus in pairs
+        ]
+
+        with transaction.atomic():
+            new_users = create_users_with_roles(pending, batch_size=self.chunk_size)
+            ClassEnrollment.objects.bulk_create(enrollments, batch_size=self.chunk_size)
+            StudentParentRelation.objects.bulk_create(relations, batch_size=self.chunk_size)
+
+        # Only remember users once they are committed, a failed chunk is retried
+        for user in new_users:
+            self.remember_user(user)
+        result.created.extend(created)
+        result.relations.extend((relation.id, relation.parent_id, relation.student_id) for relation in relations)
+        result.skipped.extend(skipped)
+        result.errors.extend(errors)
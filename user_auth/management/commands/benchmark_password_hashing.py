@@ -0,0 +1,56 @@
+import os
+import time
+
+from django.contrib.auth.hashers import check_password, get_hasher
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.crypto import get_random_string
+
+from user_auth.passwords import hash_passwords, hashing_workers
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure default-password hashing throughput of bulk user creation: serial make_password calls "
+        "against the process pool of hash_passwords() at several worker counts (pool start-up included)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--passwords', type=int, default=200, help='Passwords hashed per run.')
+        parser.add_argument(
+            '--workers', default='',
+            help='Comma separated worker counts to try (defaults to 2, 4, ... up to PASSWORD_HASHING_WORKERS).',
+        )
+        parser.add_argument('--batch-size', type=int, help='Passwords per worker round trip (PASSWORD_HASHING_BATCH_SIZE).')
+
+    def handle(self, *args, **options):
+        count = options['passwords']
+        if count < 1:
+            raise CommandError("--passwords must be at least 1.")
+        try:
+            worker_counts = [int(value) for value in options['workers'].split(',') if value.strip()]
+        except ValueError:
+            raise CommandError("--workers must be a comma separated list of numbers.")
+        if not worker_counts:
+            top = max(2, hashing_workers())
+            worker_counts = sorted({2 ** n for n in range(1, top.bit_length())} | {top})
+
+        passwords = [get_random_string(12) for _ in range(count)]
+        self.stdout.write(
+            f"{count} password(s), hasher {get_hasher().algorithm}, {os.cpu_count()} CPU(s), "
+            f"PASSWORD_HASHING_WORKERS resolves to {hashing_workers()}"
+        )
+        self.stdout.write(f"{'workers':<10}{'seconds':>10}{'hashes/s':>12}{'speed-up':>10}")
+
+        serial_seconds = None
+        for workers in [1] + [workers for workers in worker_counts if workers > 1]:
+            started = time.perf_counter()
+            hashes = hash_passwords(passwords, workers=workers, batch_size=options['batch_size'])
+            seconds = time.perf_counter() - started
+
+            # Spot-check that the pool returns hashes in input order
+            for index in {0, count // 2, count - 1}:
+                if not check_password(passwords[index], hashes[index]):
+                    raise CommandError(f"Hash {index} does not match its password with {workers} worker(s).")
+
+            serial_seconds = serial_seconds or seconds
+            self.stdout.write(f"{workers:<10}{seconds:>10.2f}{count / seconds:>12.1f}{serial_seconds / seconds:>9.2f}x")
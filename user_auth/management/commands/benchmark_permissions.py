@@ -0,0 +1,84 @@
+import statistics
+import time
+from contextlib import nullcontext
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from user_auth.authentication import RoleClaimsJWTAuthentication
+from user_auth.models import User, get_role_names
+from user_auth.permissions import (
+    IsAdmin, IsHeadmasterInSchoolOrCampus, IsRegisteredInSchoolOrCampus, IsTeacher, IsTeacherOrAdmin
+)
+from user_auth.tokens import CustomRefreshToken
+
+# Permission stacks as the views declare them; every simulated request runs all of them
+PERMISSION_STACKS = [
+    [IsAuthenticated, IsTeacher],
+    [IsAuthenticated, IsTeacherOrAdmin, IsRegisteredInSchoolOrCampus],
+    [IsAuthenticated, IsTeacher | IsAdmin],
+    [IsAuthenticated, IsHeadmasterInSchoolOrCampus],
+]
+
+
+def legacy_has_role(self, role_name):
+    """has_role as it was before the role cache: one EXISTS query per call."""
+    return self.roles.filter(name=role_name).exists()
+
+
+class Command(BaseCommand):
+    help = (
+        "Time JWT authentication plus the role permission checks of a request in three modes: one query per "
+        "has_role call (the previous behaviour), the cached role set, and the roles claim of the token."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Simulated requests per mode.')
+        parser.add_argument('--email', help='User to authenticate as (defaults to the first teacher).')
+
+    def handle(self, *args, **options):
+        users = User.objects.select_related('school', 'campus').order_by('email')
+        user = users.filter(email=options['email']).first() if options['email'] else users.filter(roles__name='Teacher').first()
+        if not user:
+            raise CommandError("User not found; generate data first with the generate_synthetic_data command.")
+
+        claims_token = CustomRefreshToken.for_user(user).access_token
+        # Without role_version the claim is never trusted, so roles come from the cache
+        cache_token = CustomRefreshToken.for_user(user).access_token
+        del cache_token['role_version']
+
+        modes = [
+            ('query', cache_token, mock.patch.object(User, 'has_role', legacy_has_role)),
+            ('cached', cache_token, nullcontext()),
+            ('claims', claims_token, nullcontext()),
+        ]
+
+        self.stdout.write(f"User {user.email}, roles: {', '.join(sorted(user.role_names)) or '-'}")
+        self.stdout.write(f"{'mode':<10}{'mean us':>10}{'p95 us':>10}{'queries/request':>17}")
+        for mode, token, patch in modes:
+            get_role_names.cache_clear()
+            request = APIRequestFactory().get('/api/', HTTP_AUTHORIZATION=f"Bearer {token}")
+            with patch, CaptureQueriesContext(connection) as queries:
+                timings = []
+                for _ in range(options['requests']):
+                    started = time.perf_counter()
+                    self.check_request(request)
+                    timings.append((time.perf_counter() - started) * 1_000_000)
+            timings.sort()
+            self.stdout.write(
+                f"{mode:<10}{statistics.fmean(timings):>10.1f}{timings[int(0.95 * (len(timings) - 1))]:>10.1f}"
+                f"{len(queries.captured_queries) / options['requests']:>17.2f}"
+            )
+
+    def check_request(self, django_request):
+        # A fresh Request per iteration, so nothing memoized on the user survives between requests
+        request = Request(django_request, authenticators=[RoleClaimsJWTAuthentication()])
+        request.user
+        for stack in PERMISSION_STACKS:
+            for permission in stack:
+                permission().has_permission(request, None)
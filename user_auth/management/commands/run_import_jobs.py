@@ -0,0 +1,59 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from user_auth.import_jobs import run_next_import_job
+from user_auth.passwords import shutdown_hashing_pool
+
+logger = logging.getLogger(__name__)
+
+
+def _work():
+    """Run queued import jobs until none is left; returns how many ran."""
+    ran = 0
+    try:
+        while run_next_import_job():
+            ran += 1
+    except Exception as e:
+        # Failures inside a job are recorded on the job; this is the queue itself (e.g. the database)
+        logger.error(f"Error claiming import jobs: {str(e)}")
+    finally:
+        close_old_connections()
+    return ran
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued spreadsheet import jobs (see IMPORT_JOB_MODE). Each worker thread claims one job at a time; "
+        "password hashing inside the jobs is spread over one shared process pool (PASSWORD_HASHING_WORKERS)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help='Jobs run at the same time.')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the queue instead of exiting once it is empty.')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to wait between polls when looping.')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        total = 0
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='import-jobs') as pool:
+                while True:
+                    ran = sum(future.result() for future in [pool.submit(_work) for _ in range(workers)])
+                    total += ran
+
+                    if ran:
+                        continue
+                    if not options['loop']:
+                        break
+
+                    close_old_connections()
+                    time.sleep(options['interval'])
+        finally:
+            shutdown_hashing_pool()
+
+        self.stdout.write(self.style.SUCCESS(f"Ran {total} import job(s)."))
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-17 14:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('school', '0001_initial'),
+        ('user_auth', '0002_user_role_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['school', 'campus', '-created_at', '-id'], name='user_tenant_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['-created_at', '-id'], name='user_created_idx'),
+        ),
+    ]
@@ -1,5 +1,8 @@
 import uuid
+from functools import lru_cache
+
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 
 from school.models import School, Campus
@@ -37,12 +40,89 @@ class User(AbstractUser):
     email_verification_token = models.CharField(max_length=100, blank=True, null=True)
     password_reset_code = models.CharField(max_length=6, null=True, blank=True)
     is_active = models.BooleanField(default=True)
+    role_version = models.PositiveIntegerField(default=0)  # Bumped whenever the user's roles change, see user_auth.signals
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['password']
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Keyset pagination of user lists, tenant-scoped and global
+            models.Index(fields=['school', 'campus', '-created_at', '-id'], name='user_tenant_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='user_created_idx'),
+        ]
+
     def __str__(self):
         return self.email or self.username or str(self.id)
 
+    @property
+    def role_names(self):
+        """
+        Names of the user's roles, resolved once per instance: from verified JWT claims
+        (set by RoleClaimsJWTAuthentication), prefetched roles, or the role cache.
+        """
+        if not hasattr(self, '_role_names'):
+            prefetched = getattr(self, '_prefetched_objects_cache', {}).get('roles')
+            if prefetched is not None:
+                self._role_names = frozenset(role.name for role in prefetched)
+            else:
+                self._role_names = get_role_names(self.pk, self.role_version)
+        return self._role_names
+
     def has_role(self, role_name):
-        return self.roles.filter(name=role_name).exists()
\ No newline at end of file
+        return role_name in self.role_names
+
+
+@lru_cache(maxsize=4096)
+def get_role_names(user_id, role_version):
+    """
+    Role names of a user at a given role_version. The version is part of the key, so a
+    role change (which bumps it) makes every process miss and reload instead of going stale.
+    """
+    return frozenset(Role.objects.filter(users__id=user_id).values_list('name', flat=True))
+
+class ImportJob(models.Model):
+    """
+    A spreadsheet upload waiting to be imported, or being imported, in the background.
+    Queued by the upload endpoints and processed by user_auth.import_jobs, which keeps the
+    row counts up to date after every chunk so clients can poll the job for progress.
+    """
+    USERS = 'users'
+    STUDENT_PARENTS = 'student_parents'
+    KIND_CHOICES = [(USERS, 'Users'), (STUDENT_PARENTS, 'Students and parents')]
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (COMPLETED, 'Completed'), (FAILED, 'Failed')]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    file = models.FileField(upload_to='imports/')
+    file_name = models.CharField(max_length=255)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, related_name='import_jobs', null=True, blank=True)
+
+    rows_total = models.PositiveIntegerField(null=True, blank=True)
+    rows_processed = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    skipped_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    skipped = models.JSONField(default=list, blank=True)  # Rows skipped, with the reason
+    errors = models.JSONField(default=list, blank=True)  # {'row': ..., 'error': ...} per failed row
+    error = models.TextField(null=True, blank=True)  # Why the job as a whole failed
+
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)  # Heartbeat while running
+
+    class Meta:
+        indexes = [
+            # Workers claim the oldest queued job
+            models.Index(fields=['status', 'created_at'], name='import_job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} import {self.file_name} ({self.status})"
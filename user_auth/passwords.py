@@ -0,0 +1,94 @@
+import logging
+import math
+import multiprocessing
+import os
+import random
+import string
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+logger = logging.getLogger(__name__)
+
+# Below this many passwords, starting worker processes costs more than it saves
+PARALLEL_HASHING_THRESHOLD = 8
+
+
+def generate_default_password(length=12):
+    """Generate a random default password."""
+    characters = string.ascii_letters + string.digits + string.punctuation
+    return ''.join(random.choice(characters) for _ in range(length))
+
+
+def hashing_workers():
+    """Worker processes to hash with: PASSWORD_HASHING_WORKERS, or one per CPU when unset/0."""
+    return getattr(settings, 'PASSWORD_HASHING_WORKERS', 0) or os.cpu_count() or 1
+
+
+def _init_worker():
+    # Workers start from a fresh interpreter (see _get_pool), not a copy of the caller
+    django.setup()
+
+
+# One pool per process, started on first use and kept for later imports
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    """The shared hashing pool, (re)started when it is missing or sized differently."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # Forking a threaded process (a web server, the run_import_jobs threads) copies locks
+            # and open connections in whatever state they are in; a forkserver or spawned
+            # interpreter starts clean
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context(method), initializer=_init_worker,
+            )
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_hashing_pool():
+    """Stop the shared hashing pool, if one was started."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool, _pool_workers = None, 0
+
+
+def hash_passwords(passwords, workers=None, batch_size=None):
+    """
+    make_password() for each password, in order.
+
+    Hashing is CPU-bound (PBKDF2 at Django's iteration count), so larger lists are spread
+    over a process pool that is kept between calls, each worker getting `batch_size`
+    passwords per round trip (PASSWORD_HASHING_BATCH_SIZE). Small lists, a single worker or
+    a pool that cannot be started fall back to hashing in this process.
+    """
+    passwords = list(passwords)
+    workers = workers or hashing_workers()
+    if workers <= 1 or len(passwords) < PARALLEL_HASHING_THRESHOLD:
+        return [make_password(password) for password in passwords]
+
+    batch_size = batch_size or getattr(settings, 'PASSWORD_HASHING_BATCH_SIZE', 16)
+    # Smaller batches when there are too few passwords to give every worker a full one. The
+    # pool itself keeps its full size so that a short list doesn't restart it
+    chunksize = max(1, min(batch_size, math.ceil(len(passwords) / workers)))
+    try:
+        return list(_get_pool(workers).map(make_password, passwords, chunksize=chunksize))
+    except (BrokenProcessPool, OSError) as e:
+        # Started again by the next call
+        shutdown_hashing_pool()
+        logger.warning(f"Password hashing pool unavailable ({e}), hashing {len(passwords)} password(s) in-process")
+        return [make_password(password) for password in passwords]
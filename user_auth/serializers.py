@@ -2,7 +2,7 @@ from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 
-from .models import User, Role
+from .models import ImportJob, User, Role
 from student_performance.models import ClassEnrollment
 from school.models import School, Campus
 from school.serializers import SchoolSerializer, CampusSerializer
@@ -34,7 +34,11 @@ class UserSerializer(serializers.ModelSerializer):
     def get_class_name(self, obj):
         """
         Fetch the class name where the student has enrollment status 'existing'.
+        Uses the `current_class_name` annotation of serializable_users() when present.
         """
+        if hasattr(obj, 'current_class_name'):
+            return obj.current_class_name
+
         enrollment = ClassEnrollment.objects.filter(
             student=obj, status="existing"
         ).select_related('class_id').first()
@@ -102,3 +106,24 @@ class PasswordResetSerializer(serializers.Serializer):
         except ValidationError as e:
             raise serializers.ValidationError({'new_password': e.messages})
         return data
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id', 'kind', 'status', 'file_name', 'rows_total', 'rows_processed', 'progress',
+            'created_count', 'skipped_count', 'failed_count', 'skipped', 'errors', 'error',
+            'created_at', 'started_at', 'finished_at',
+        ]
+        read_only_fields = fields
+
+    def get_progress(self, obj):
+        """Percentage of rows processed, once the file has been read."""
+        if obj.status == ImportJob.COMPLETED:
+            return 100
+        if not obj.rows_total:
+            return 0
+        return round(100 * obj.rows_processed / obj.rows_total, 1)
@@ -0,0 +1,45 @@
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import User, Role
+
+
+def bump_role_version(user_ids):
+    """Invalidate cached role sets (and the roles claim of issued tokens) for these users."""
+    if user_ids:
+        User.objects.filter(pk__in=user_ids).update(role_version=F('role_version') + 1)
+
+
+@receiver(m2m_changed, sender=User.roles.through)
+def user_roles_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+
+    if not reverse:
+        # user.roles.add/remove/clear
+        if action == 'pre_clear':
+            return
+        bump_role_version([instance.pk])
+        instance.__dict__.pop('_role_names', None)
+        instance.refresh_from_db(fields=['role_version'])
+    elif action == 'pre_clear':
+        # role.users.clear(): the affected users are only known before the rows go
+        instance._cleared_user_ids = list(instance.users.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        bump_role_version(getattr(instance, '_cleared_user_ids', []))
+    else:
+        # role.users.add/remove
+        bump_role_version(pk_set)
+
+
+@receiver(post_save, sender=Role)
+def role_renamed(sender, instance, created, **kwargs):
+    if not created:
+        bump_role_version(list(instance.users.values_list('pk', flat=True)))
+
+
+@receiver(pre_delete, sender=Role)
+def role_deleted(sender, instance, **kwargs):
+    # Cascade deletes of the through rows don't send m2m_changed
+    bump_role_version(list(instance.users.values_list('pk', flat=True)))
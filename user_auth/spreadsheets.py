@@ -0,0 +1,88 @@
+import csv
+import io
+import os
+from zipfile import BadZipFile
+
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+SPREADSHEET_EXTENSIONS = ('.xlsx', '.csv')
+
+
+class SpreadsheetError(ValueError):
+    """The upload is not a readable spreadsheet, or lacks required columns."""
+
+
+class SpreadsheetReader:
+    """
+    Streams the rows of an uploaded .xlsx (first sheet) or .csv file.
+
+    The header row is read and checked against `required_columns` up front (column names
+    are matched case-insensitively). Rows then come one at a time from a read-only workbook
+    or a csv reader, with the cell types openpyxl gives them, so memory use does not grow
+    with the size of the file. Use as a context manager, the workbook keeps the file open.
+    """
+
+    def __init__(self, file, name, required_columns):
+        self.extension = os.path.splitext(name)[1].lower()
+        if self.extension not in SPREADSHEET_EXTENSIONS:
+            raise SpreadsheetError("File must be an Excel (.xlsx) or CSV (.csv) file.")
+
+        self._workbook = None
+        self._text = None
+        if self.extension == '.xlsx':
+            try:
+                self._workbook = load_workbook(file, read_only=True, data_only=True)
+            except (InvalidFileException, BadZipFile, KeyError, OSError) as e:
+                raise SpreadsheetError(f"Could not read the Excel file: {e}")
+            sheet = self._workbook.worksheets[0]
+            # From the sheet's stored dimension; includes trailing blank rows, None when not stored
+            self.total_rows = sheet.max_row - 1 if sheet.max_row else None
+            self._rows = sheet.iter_rows(values_only=True)
+        else:
+            self.total_rows = self._count_csv_rows(file)
+            self._text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+            self._rows = csv.reader(self._text)
+
+        try:
+            header = next(self._rows, None) or ()
+        except (UnicodeDecodeError, csv.Error) as e:
+            self.close()
+            raise SpreadsheetError(f"Could not read the CSV file: {e}")
+        self.columns = [str(column).strip().lower() if column is not None else '' for column in header]
+        if not all(column in self.columns for column in required_columns):
+            self.close()
+            raise SpreadsheetError(f"File must contain the following columns: {required_columns}")
+
+    @staticmethod
+    def _count_csv_rows(file):
+        # One cheap pass for progress reporting, then back to the start
+        text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+        try:
+            return max(sum(1 for _ in csv.reader(text)) - 1, 0)
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise SpreadsheetError(f"Could not read the CSV file: {e}")
+        finally:
+            text.detach()
+            file.seek(0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Release the file; a CSV upload itself stays open so it can still be saved."""
+        if self._workbook is not None:
+            self._workbook.close()
+        if self._text is not None:
+            self._text.detach()
+            self._text = None
+
+    def rows(self):
+        """(spreadsheet row number, {column: value}) for every non-blank row; row 1 is the header."""
+        for row_number, values in enumerate(self._rows, start=2):
+            if all(value is None or value == '' for value in values):
+                continue
+            yield row_number, dict(zip(self.columns, values))
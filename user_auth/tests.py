@@ -1,3 +1,377 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import check_password
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError
+from django.db.models.query import QuerySet
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from openpyxl import Workbook
+
+from administrator.models import AcademicYear
+from school.models import Campus, School
+from student_performance.models import Class, ClassEnrollment, StudentParentRelation
+
+from . import import_jobs, importers, passwords
+from .import_jobs import claim_import_job, enqueue_import_job, run_next_import_job
+from .importers import StudentParentImporter, UserImporter, clean_cell, create_users_with_roles
+from .models import ImportJob, Role, User, get_role_names
+from .passwords import hash_passwords
+from .spreadsheets import SpreadsheetError, SpreadsheetReader
+
+
+def csv_upload(*lines):
+    return io.BytesIO('\n'.join(lines).encode())
+
+
+@override_settings(PASSWORD_HASHING_WORKERS=1)
+class ImportedRolesTests(TestCase):
+    def test_bulk_inserted_roles_invalidate_cached_role_names(self):
+        role = Role.objects.create(name='Teacher')
+        user = User(email='ama@test.local', username='ama', passcode='secret')
+        # Looked up before the role rows exist, e.g. by a concurrent request
+        self.assertEqual(get_role_names(user.id, user.role_version), frozenset())
+
+        create_users_with_roles([(user, [role])])
+
+        stored = User.objects.get(id=user.id)
+        self.assertEqual(stored.role_version, user.role_version)
+        self.assertTrue(stored.has_role('Teacher'))
+
+
+def xlsx_upload(*rows):
+    workbook = Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    upload = io.BytesIO()
+    workbook.save(upload)
+    upload.seek(0)
+    return upload
+
+
+class SpreadsheetReaderTests(SimpleTestCase):
+    columns = ['email', 'username', 'phone']
+
+    def read(self, upload, name):
+        with SpreadsheetReader(upload, name, self.columns) as reader:
+            return reader.total_rows, list(reader.rows())
+
+    def test_missing_header_is_rejected(self):
+        uploads = {
+            'CSV': (csv_upload('email,phone', 'ama@test.local,0244000000'), 'users.csv'),
+            'Excel': (xlsx_upload(['email', 'phone'], ['ama@test.local', '0244000000']), 'users.xlsx'),
+            'empty CSV': (io.BytesIO(), 'users.csv'),
+        }
+        for label, (upload, name) in uploads.items():
+            with self.subTest(label), self.assertRaisesMessage(SpreadsheetError, "['email', 'username', 'phone']"):
+                SpreadsheetReader(upload, name, self.columns)
+
+    def test_unreadable_uploads_are_rejected(self):
+        uploads = {
+            'wrong extension': (csv_upload('email,username,phone'), 'users.txt'),
+            'not a workbook': (csv_upload('email,username,phone'), 'users.xlsx'),
+            'not UTF-8': (io.BytesIO('email,username,phone\nkwabena,Kwabéna,\n'.encode('utf-16')), 'users.csv'),
+        }
+        for label, (upload, name) in uploads.items():
+            with self.subTest(label), self.assertRaises(SpreadsheetError):
+                SpreadsheetReader(upload, name, self.columns)
+
+    def test_excel_and_csv_give_the_same_rows(self):
+        header = ['Email', ' USERNAME ', 'Phone', 'Notes']
+        csv_total, csv_rows = self.read(csv_upload(
+            '\ufeff' + ','.join(header),
+            'ama@test.local,ama,244000000,',
+            'kofi@test.local,kofi,,Transferred',
+        ), 'users.csv')
+        xlsx_total, xlsx_rows = self.read(xlsx_upload(
+            header,
+            ['ama@test.local', 'ama', 244000000.0],
+            ['kofi@test.local', 'kofi', None, 'Transferred'],
+        ), 'USERS.XLSX')
+
+        def cleaned(rows):
+            return [(row_number, {column: clean_cell(value) for column, value in values.items()}) for row_number, values in rows]
+
+        self.assertEqual((csv_total, xlsx_total), (2, 2))
+        self.assertEqual(cleaned(csv_rows), cleaned(xlsx_rows))
+        self.assertEqual(cleaned(csv_rows), [
+            (2, {'email': 'ama@test.local', 'username': 'ama', 'phone': '244000000', 'notes': None}),
+            (3, {'email': 'kofi@test.local', 'username': 'kofi', 'phone': None, 'notes': 'Transferred'}),
+        ])
+
+    def test_blank_rows_are_skipped_and_row_numbers_kept(self):
+        _, csv_rows = self.read(csv_upload('email,username,phone', '', 'ama@test.local,ama,', ',,', 'kofi@test.local,kofi,', ''), 'users.csv')
+        _, xlsx_rows = self.read(xlsx_upload(
+            ['email', 'username', 'phone'], [None, None], ['ama@test.local', 'ama'], ['', None, None], ['kofi@test.local', 'kofi'],
+        ), 'users.xlsx')
+
+        for rows in (csv_rows, xlsx_rows):
+            self.assertEqual([(row_number, values['username']) for row_number, values in rows], [(3, 'ama'), (5, 'kofi')])
+
+    def test_csv_upload_stays_open_after_reading(self):
+        upload = csv_upload('email,username,phone', 'ama@test.local,ama,')
+        self.read(upload, 'users.csv')
+
+        self.assertFalse(upload.closed)
+        upload.seek(0)
+        self.assertTrue(upload.read().startswith(b'email'))
+
+
+class PasswordHashingTests(SimpleTestCase):
+    def setUp(self):
+        self.passwords = [f"password-{index}" for index in range(20)]
+        self.addCleanup(passwords.shutdown_hashing_pool)
+
+    def assertHashes(self, hashes):
+        self.assertEqual(len(hashes), len(self.passwords))
+        for password, hashed in zip(self.passwords, hashes):
+            self.assertTrue(check_password(password, hashed))
+
+    def test_pool_hashes_in_order_and_is_reused(self):
+        self.assertHashes(hash_passwords(self.passwords, workers=2, batch_size=3))
+        pool = passwords._pool
+
+        # The next import reuses the running workers
+        self.assertHashes(hash_passwords(self.passwords, workers=2))
+        self.assertIs(passwords._pool, pool)
+
+    def test_pool_that_cannot_start_falls_back_to_this_process(self):
+        with mock.patch.object(passwords, 'ProcessPoolExecutor', side_effect=OSError('no semaphores')), \
+                self.assertLogs('user_auth.passwords', 'WARNING'):
+            self.assertHashes(hash_passwords(self.passwords, workers=2))
+        self.assertIsNone(passwords._pool)
+
+    def test_broken_pool_is_discarded(self):
+        broken = mock.Mock(**{'map.side_effect': BrokenProcessPool('worker died')})
+        with mock.patch.object(passwords, '_get_pool', return_value=broken), self.assertLogs('user_auth.passwords', 'WARNING'):
+            self.assertHashes(hash_passwords(self.passwords, workers=2))
+
+        self.assertHashes(hash_passwords(self.passwords, workers=2))
+        self.assertIsNot(passwords._pool, broken)
+
+
+@override_settings(PASSWORD_HASHING_WORKERS=1)
+class ImporterTestCase(TestCase):
+    """One school and campus with an admin who uploads the spreadsheets."""
+
+    def setUp(self):
+        self.school = School.objects.create(name='Test School', subdomain='test', country='GH', address='-', city='Accra', postal_code='0')
+        self.campus = Campus.objects.create(school=self.school, name='Main', city='Accra', address='-')
+        self.admin = User.objects.create(username='admin', email='admin@test.local', school=self.school, campus=self.campus)
+
+    def run_importer(self, importer_class, upload, chunk_size=2):
+        with SpreadsheetReader(upload, 'upload.csv', importer_class.columns) as reader:
+            return importer_class(self.admin, chunk_size=chunk_size).run(reader.rows())
+
+
+class UserImporterTests(ImporterTestCase):
+    def setUp(self):
+        super().setUp()
+        Role.objects.create(name='Teacher')
+        User.objects.create(username='kofi', email='kofi@test.local')
+
+    def upload(self):
+        return csv_upload(
+            'email,username,phone,gender,location,roles,school_name,campus_name',
+            'ama@test.local,ama,,,,Teacher,Test School,Main',
+            'KOFI@test.local,kofi,,,,Teacher,Test School,Main',
+            'yaw@test.local,yaw,,,,Teacher,Unknown School,',
+            'esi@test.local,esi,,,,"Teacher, Unknown Role",Test School,',
+        )
+
+    def test_counts_of_created_and_skipped_rows(self):
+        result = self.run_importer(UserImporter, self.upload())
+
+        self.assertEqual(result.counts, {'processed': 4, 'created': 2, 'skipped': 2, 'failed': 0})
+        self.assertEqual([(skip['row'], skip['reason']) for skip in result.skipped], [
+            (3, 'User already exists'), (4, "School 'Unknown School' not found"),
+        ])
+        ama = User.objects.get(email='ama@test.local')
+        self.assertEqual((ama.school, ama.campus, ama.has_role('Teacher')), (self.school, self.campus, True))
+
+    def test_failing_chunk_is_retried_row_by_row(self):
+        create = importers.create_users_with_roles
+
+        def fail_on_esi(pending, **kwargs):
+            if any(user.username == 'esi' for user, _ in pending):
+                raise DatabaseError('value too long')
+            return create(pending, **kwargs)
+
+        with mock.patch.object(importers, 'create_users_with_roles', side_effect=fail_on_esi):
+            result = self.run_importer(UserImporter, csv_upload(
+                'email,username,phone,gender,location,roles,school_name,campus_name',
+                'ama@test.local,ama,,,,Teacher,,',
+                'esi@test.local,esi,,,,Teacher,,',
+                'abena@test.local,abena,,,,Teacher,,',
+            ))
+
+        self.assertEqual(result.counts, {'processed': 3, 'created': 2, 'skipped': 0, 'failed': 1})
+        self.assertEqual(result.errors, [{'row': 3, 'error': 'value too long'}])
+        self.assertEqual(set(User.objects.filter(username__in=['ama', 'esi', 'abena']).values_list('username', flat=True)), {'ama', 'abena'})
+
+
+class StudentParentImporterTests(ImporterTestCase):
+    def setUp(self):
+        super().setUp()
+        self.class_instance = Class.objects.create(name='JHS 1', school=self.school, campus=self.campus)
+        self.year = AcademicYear.objects.create(school=self.school, campus=self.campus, start_year=2025, end_year=2026)
+        self.parent = User.objects.create(username='mensah', email='mensah@test.local', school=self.school, campus=self.campus)
+
+    def test_counts_enrollments_and_links(self):
+        result = self.run_importer(StudentParentImporter, csv_upload(
+            'parent_email,parent_username,parent_phone,parent_gender,parent_location,'
+            'student_email,student_username,student_phone,student_gender,student_location,'
+            'class_name,academic_year,school_name,campus_name',
+            'owusu@test.local,owusu,,,,adjoa@test.local,adjoa,,,,JHS 1,2025,,',
+            # An existing parent with a new student
+            'mensah@test.local,mensah,,,,kwame@test.local,kwame,,,,JHS 1,2025,,',
+            # Both already exist, one of them from the row above
+            'mensah@test.local,mensah,,,,adjoa@test.local,adjoa,,,,JHS 1,2025,,',
+            ',,,,,efua@test.local,efua,,,,JHS 1,2025,,',
+            'boateng@test.local,boateng,,,,akua@test.local,akua,,,,JHS 9,2025,,',
+        ))
+
+        self.assertEqual(result.counts, {'processed': 5, 'created': 2, 'skipped': 2, 'failed': 1})
+        self.assertEqual([skip['row'] for skip in result.skipped], [4, 6])
+        self.assertEqual(result.errors[0]['row'], 5)
+        links = set(StudentParentRelation.objects.values_list('parent__username', 'student__username'))
+        self.assertEqual(links, {('owusu', 'adjoa'), ('mensah', 'kwame')})
+        enrolled = ClassEnrollment.objects.filter(class_id=self.class_instance, academic_year=self.year)
+        self.assertEqual(set(enrolled.values_list('student__username', flat=True)), {'adjoa', 'kwame'})
+        self.assertFalse(User.objects.filter(username='boateng').exists())
+
+
+class SmallChunkUserImporter(UserImporter):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, chunk_size=2, **kwargs)
+
+
+@override_settings(IMPORT_JOB_MODE='worker', IMPORT_JOB_STALE_AFTER=600)
+class ImportJobTests(ImporterTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        Role.objects.create(name='Teacher')
+        patcher = mock.patch.dict(import_jobs.IMPORTERS, {ImportJob.USERS: SmallChunkUserImporter})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def enqueue(self, *lines, name='users.csv'):
+        lines = lines or (
+            'email,username,phone,gender,location,roles,school_name,campus_name',
+            'ama@test.local,ama,,,,Teacher,,',
+            'kofi@test.local,kofi,,,,Teacher,,',
+            'yaw@test.local,yaw,,,,Teacher,Unknown School,',
+            'esi@test.local,esi,,,,Teacher,,',
+            'abena@test.local,abena,,,,Teacher,,',
+        )
+        upload = SimpleUploadedFile(name, '\n'.join(lines).encode(), content_type='text/csv')
+        return enqueue_import_job(ImportJob.USERS, upload, self.admin)
+
+    def test_completed_job_saves_counts_and_deletes_the_file(self):
+        job = self.enqueue()
+        storage, name = job.file.storage, job.file.name
+        self.assertEqual(job.status, ImportJob.QUEUED)
+
+        self.assertEqual(run_next_import_job(), job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.COMPLETED)
+        self.assertEqual((job.rows_total, job.rows_processed, job.created_count, job.skipped_count, job.failed_count), (5, 5, 4, 1, 0))
+        self.assertEqual(job.skipped[0]['row'], 4)
+        self.assertIsNotNone(job.started_at)
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(job.file.name, '')
+        self.assertFalse(storage.exists(name))
+        self.assertIsNone(run_next_import_job())
+
+    def test_counts_are_saved_after_every_chunk(self):
+        job = self.enqueue()
+        save_counts = import_jobs._save_counts
+        seen = []
+
+        def record(job, result, **fields):
+            save_counts(job, result, **fields)
+            seen.append(ImportJob.objects.values_list('status', 'rows_processed', 'updated_at').get(pk=job.pk))
+
+        with mock.patch.object(import_jobs, '_save_counts', side_effect=record):
+            run_next_import_job()
+
+        self.assertEqual([(status, processed) for status, processed, _ in seen], [
+            (ImportJob.RUNNING, 2), (ImportJob.RUNNING, 4), (ImportJob.RUNNING, 5), (ImportJob.COMPLETED, 5),
+        ])
+        heartbeats = [updated_at for _, _, updated_at in seen]
+        self.assertEqual(heartbeats, sorted(heartbeats))
+        self.assertGreater(heartbeats[0], job.updated_at)
+
+    def test_failed_job_keeps_the_file_and_the_counts_so_far(self):
+        job = self.enqueue()
+        resolve = SmallChunkUserImporter.resolve
+        calls = []
+
+        def fail_second_chunk(importer, rows):
+            calls.append(rows)
+            if len(calls) == 2:
+                raise ValueError('Spreadsheet went away')
+            return resolve(importer, rows)
+
+        with mock.patch.object(SmallChunkUserImporter, 'resolve', fail_second_chunk), self.assertLogs('user_auth.import_jobs', 'ERROR'):
+            run_next_import_job()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.FAILED)
+        self.assertEqual(job.error, 'Spreadsheet went away')
+        self.assertEqual((job.rows_processed, job.created_count), (2, 2))
+        self.assertIsNotNone(job.finished_at)
+        self.assertTrue(job.file.storage.exists(job.file.name))
+
+    def test_unreadable_spreadsheet_fails_the_job(self):
+        job = self.enqueue('name,email', 'Ama,ama@test.local')
+
+        with self.assertLogs('user_auth.import_jobs', 'ERROR'):
+            run_next_import_job()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.FAILED)
+        self.assertIn('username', job.error)
+        self.assertEqual(job.rows_processed, 0)
+        self.assertTrue(job.file.storage.exists(job.file.name))
+
+    def test_claim_skips_locked_rows_and_takes_the_oldest_job(self):
+        newer = self.enqueue()
+        older = self.enqueue()
+        ImportJob.objects.filter(pk=older.pk).update(created_at=newer.created_at - timedelta(minutes=1))
+
+        with mock.patch.object(QuerySet, 'select_for_update', autospec=True, side_effect=QuerySet.select_for_update) as lock:
+            self.assertEqual(claim_import_job(), older)
+
+        lock.assert_called_once()
+        self.assertEqual(lock.call_args.kwargs, {'skip_locked': True})
+        self.assertEqual(ImportJob.objects.get(pk=older.pk).status, ImportJob.RUNNING)
+        self.assertEqual(claim_import_job(), newer)
+        self.assertIsNone(claim_import_job())
+
+    def test_stale_running_job_is_claimed_again(self):
+        stale, busy = self.enqueue(), self.enqueue()
+        ImportJob.objects.filter(pk=stale.pk).update(
+            status=ImportJob.RUNNING, error='worker died', updated_at=timezone.now() - timedelta(seconds=601),
+        )
+        ImportJob.objects.filter(pk=busy.pk).update(status=ImportJob.RUNNING, updated_at=timezone.now() - timedelta(seconds=599))
+
+        self.assertEqual(claim_import_job(), stale)
+        self.assertIsNone(claim_import_job())
+
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, ImportJob.RUNNING)
+        self.assertIsNone(stale.error)
+        self.assertGreater(stale.updated_at, timezone.now() - timedelta(seconds=60))
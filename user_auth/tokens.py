@@ -11,7 +11,8 @@ class CustomRefreshToken(RefreshToken):
         # Add user details to the token payload
         token['email'] = user.email
         token['username'] = user.username or ''
-        token['roles'] = [role.name for role in user.roles.all()]
+        token['roles'] = sorted(user.role_names)
+        token['role_version'] = user.role_version  # Lets RoleClaimsJWTAuthentication tell if `roles` is still current
         
         # Add school and campus details
         token['school_id'] = str(user.school_id) if user.school_id else None
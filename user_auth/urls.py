@@ -14,6 +14,7 @@ urlpatterns = [
     path('student-parent-sign-up/', views.RegisterStudentsAndParentsView.as_view(), name='student-parent-sign-up'),
     path('bulk-user-upload/', views.bulk_user_upload, name='bulk_user_upload'),
     path('bulk-student-parent-upload/', views.bulk_student_parent_upload, name='bulk-student-parent-upload'),
+    path('import-jobs/<uuid:job_id>/', views.import_job_status, name='import-job-status'),
     path('login/', views.login, name='login'),
     path('logout/', views.logout, name='logout'),
     # path('personal-details/', views.personal_details, name='personal_details'),
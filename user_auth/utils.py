@@ -1,9 +1,29 @@
 import secrets
 import string
 
+from django.db.models import OuterRef, Subquery
+
+from .models import User
+from student_performance.models import ClassEnrollment
+
 def generate_verification_token():
     # Generate a random token
     alphabet = string.ascii_letters + string.digits
     token = ''.join(secrets.choice(alphabet) for i in range(32))
     return token
 
+
+def serializable_users(queryset=None):
+    """
+    Users with everything UserSerializer reads loaded up front: the current class name
+    as a subquery annotation plus roles, school (with its campuses) and campus, so
+    serializing a list takes a constant number of queries.
+    """
+    if queryset is None:
+        queryset = User.objects.all()
+    current_class = ClassEnrollment.objects.filter(
+        student=OuterRef('pk'), status='existing'
+    ).order_by('pk').values('class_id__name')[:1]
+    return queryset.select_related('school', 'campus').prefetch_related(
+        'roles', 'school__campuses'
+    ).annotate(current_class_name=Subquery(current_class))
@@ -2,8 +2,6 @@ import datetime
 import logging
 import random
 import jwt
-import string
-import pandas as pd
 from django.urls import reverse
 from django.utils.crypto import get_random_string
 from django.conf import settings
@@ -29,31 +27,31 @@ from smtplib import SMTPException
 from django.db.models import Q
 from django.db import transaction
 
-from .models import User, Role
+from .models import ImportJob, User, Role
 from school.models import School, Campus
-from .serializers import UserSerializer, PasswordResetSerializer, RoleSerializer
+from .serializers import ImportJobSerializer, UserSerializer, PasswordResetSerializer, RoleSerializer
 from student_performance.serializers import TeacherLevelClassSerializer, StudentSerializer, ClassEnrollment, HistoricalClassEnrollment, Class, StudentParentRelationSerializer
 from student_performance.models import TeacherLevelClass, Student, StudentParentRelation, ClassEnrollment, HistoricalClassEnrollment, Class
 from administrator.models import AcademicYear
 from .tokens import create_jwt_pair_for_user
-from .utils import generate_verification_token
+from .utils import generate_verification_token, serializable_users
+from .importers import STUDENT_PARENT_COLUMNS, USER_COLUMNS, create_users_with_roles
+from .import_jobs import enqueue_import_job
+from .passwords import generate_default_password
+from .spreadsheets import SpreadsheetError, SpreadsheetReader
 from .permissions import IsAdmin, IsTeacherOrAdmin
 
 logger = logging.getLogger(__name__)
 
 # Register new user
-def generate_default_password(length=12):
-    """Generate a random default password."""
-    characters = string.ascii_letters + string.digits + string.punctuation
-    return ''.join(random.choice(characters) for _ in range(length))
-
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
 def sign_up(request):
     try:
         data = request.data
         users_data = data if isinstance(data, list) else [data]  # Handle single or multiple users
-        created_users = []
+        pending = []
+        pending_emails, pending_usernames = set(), set()
         skipped_users = []
 
         for user_data in users_data:
@@ -65,8 +63,11 @@ def sign_up(request):
             if isinstance(role_names, str):
                 role_names = [role_names]
 
-            # Check if user already exists by email or username
-            existing_user = User.objects.filter(email=email).first() or User.objects.filter(username=username).first()
+            # Check if user already exists by email or username (including earlier entries of this request)
+            existing_user = (
+                (email and email in pending_emails) or (username and username in pending_usernames)
+                or User.objects.filter(email=email).first() or User.objects.filter(username=username).first()
+            )
             if existing_user:
                 skipped_users.append({'email': email, 'username': username, 'reason': 'User already exists'})
                 continue
@@ -106,34 +107,32 @@ def sign_up(request):
                 })
                 continue
 
-            # Generate a default password
+            # Generate a default password; it is hashed with the others once all entries are checked
             default_password = generate_default_password()
-
-            with transaction.atomic():
-                # Create the user with school and campus IDs
-                user = User.objects.create(
-                    email=email,
-                    username=username,
-                    password=make_password(default_password),
-                    phone=user_data.get('phone'),
-                    gender=user_data.get('gender'),
-                    location=user_data.get('location'),
-                    passcode=default_password,  # Store plain password
-                    school=school,  # Assign School instance
-                    campus=campus   # Assign Campus instance
-                )
-                user.roles.set(roles)
-                user.save()
-                created_users.append(user)
-
-            # Log success
-            logger.info(f"User '{email}' created with school '{school_name}' and campus '{campus_name}'")
+            user = User(
+                email=email,
+                username=username,
+                phone=user_data.get('phone'),
+                gender=user_data.get('gender'),
+                location=user_data.get('location'),
+                passcode=default_password,  # Store plain password
+                school=school,  # Assign School instance
+                campus=campus   # Assign Campus instance
+            )
+            pending.append((user, list(roles)))
+            pending_emails.add(email)
+            pending_usernames.add(username)
 
             # Send default password to email (optional)
             # Example: send_email(user.email, "Your Password", f"Your default password is: {default_password}")
 
-        # Serialize the created users
-        serializer = UserSerializer(created_users, many=True)
+        created_users = create_users_with_roles(pending)
+        for user in created_users:
+            logger.info(f"User '{user.email}' created with school '{user.school}' and campus '{user.campus}'")
+
+        # Serialize the created users, reloaded in one go so the serializer needs no per-user queries
+        users_by_id = serializable_users().in_bulk([user.pk for user in created_users])
+        serializer = UserSerializer([users_by_id[user.pk] for user in created_users], many=True)
         response_data = {
             'created_users': serializer.data,
             'skipped_users': skipped_users,
@@ -375,6 +374,30 @@ class RegisterStudentsAndParentsView(APIView):
             )
 
 
+def import_job_accepted(request, job):
+    """202 response for a queued spreadsheet import, pointing at its status endpoint."""
+    return Response(
+        {
+            'message': 'File uploaded, the import runs in the background',
+            'job': ImportJobSerializer(job).data,
+            'status_url': request.build_absolute_uri(reverse('import-job-status', args=[job.id])),
+        },
+        status=status.HTTP_202_ACCEPTED,
+    )
+
+
+# Status and progress of a background spreadsheet import
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def import_job_status(request, job_id):
+    job = ImportJob.objects.filter(id=job_id).first()
+    if not job:
+        return Response({'error': 'Import job not found.'}, status=status.HTTP_404_NOT_FOUND)
+    if job.created_by_id != request.user.id and not request.user.is_superuser:
+        return Response({'error': 'You do not have access to this import job.'}, status=status.HTTP_403_FORBIDDEN)
+    return Response(ImportJobSerializer(job).data, status=status.HTTP_200_OK)
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated, IsAdmin])
 @parser_classes([MultiPartParser])
@@ -384,298 +407,46 @@ def bulk_user_upload(request):
             return Response(data={'error': 'No file uploaded.'}, status=status.HTTP_400_BAD_REQUEST)
 
         file = request.FILES['file']
-        if not file.name.endswith('.xlsx'):
-            return Response(data={'error': 'File must be an Excel file (.xlsx).'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Read the Excel file
-        df = pd.read_excel(file)
-
-        # Convert all column names to lowercase
-        df.columns = df.columns.str.lower()
-
-        required_columns = ['email', 'username', 'phone', 'gender', 'location', 'roles', 'school_name', 'campus_name']
-        if not all(column in df.columns for column in required_columns):
-            return Response(
-                data={'error': f'File must contain the following columns: {required_columns}'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        created_users = []
-        skipped_users = []
 
-        for _, row in df.iterrows():
-            email = row['email']
-            username = row['username']
-
-            # Check if user already exists by email or username
-            existing_user = User.objects.filter(email=email).first() or User.objects.filter(username=username).first()
-            if existing_user:
-                skipped_users.append({'email': email, 'username': username, 'reason': 'User already exists'})
-                continue
-
-            # Generate a default password
-            default_password = generate_default_password()
-
-            # Create the user
-            user = User.objects.create(
-                email=email,
-                username=username,
-                password=make_password(default_password),
-                phone=row['phone'],
-                gender=row['gender'],
-                location=row['location'],
-                passcode=default_password,  # Store plain password
-                school=row['school_name'],
-                campus=row['campus_name']
-            )
-
-            # Assign roles properly
-            if isinstance(row['roles'], str):  
-                roles = [role.strip() for role in row['roles'].split(',')]  # Split and remove extra spaces
-                print(f"Extracted roles: {roles}")  # Debugging
-            elif isinstance(row['roles'], list):  
-                roles = row['roles']  # Already a list
-            else:
-                roles = []  # Ensure roles is always a list
-
-            role_objects = Role.objects.filter(name__in=roles)
-            with transaction.atomic():
-                user.roles.set(role_objects)
-
-            # if not existing_user:
-                #  send_mail(
-                    #         "Welcome to Our School Platform",
-                    #         f"Hello {parent.username},\n\n"
-                    #         f"Your account has been created successfully.\n"
-                    #         f"Login Email: {parent.email}\n"
-                    #         f"Temporary Password: {default_password}\n\n"
-                    #         "Please change your password after logging in.",
-                    #         settings.DEFAULT_FROM_EMAIL,
-                    #         [parent.email],
-                    #         fail_silently=True,
-                    #     )
-            created_users.append(user)
-
-        # Serialize the created users
-        serializer = UserSerializer(created_users, many=True)
-        response_data = {
-            'created_users': serializer.data,
-            'skipped_users': skipped_users,
-            'message': f'{len(created_users)} user(s) created successfully.'
-        }
+        # Only the header row is read here, the rows are imported in the background
+        try:
+            with SpreadsheetReader(file, file.name, USER_COLUMNS):
+                pass
+        except SpreadsheetError as e:
+            return Response(data={'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response(data=response_data, status=status.HTTP_201_CREATED)
+        file.seek(0)
+        job = enqueue_import_job(ImportJob.USERS, file, request.user)
+        return import_job_accepted(request, job)
 
     except Exception as e:
         return Response(data={'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
 
-# Bulk Student & Parent Registration or Sign Up(Excel File)
+# Bulk Student & Parent Registration or Sign Up(Excel or CSV File)
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 @parser_classes([MultiPartParser])
 def bulk_student_parent_upload(request):
     try:
         if 'file' not in request.FILES:
-            print('file not received')
             return Response({'error': 'No file uploaded.'}, status=status.HTTP_400_BAD_REQUEST)
 
         file = request.FILES['file']
-        if not file.name.endswith('.xlsx'):
-            return Response({'error': 'File must be an Excel file (.xlsx).'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Read the Excel file
-        df = pd.read_excel(file)
-        print(df)
-
-        # Convert all column names to lowercase
-        df.columns = df.columns.str.lower()
-
-        required_columns = ['parent_email', 'parent_username', 'parent_phone', 'parent_gender', 'parent_location',
-                            'student_email', 'student_username', 'student_phone', 'student_gender', 'student_location',
-                            'class_name', 'academic_year', 'school_name', 'campus_name']
-        
-        if not all(column in df.columns for column in required_columns):
-            return Response(
-                {'error': f'File must contain the following columns: {required_columns}'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        created_users = []
-        skipped_users = []
-        relationships_created = []
-
-        with transaction.atomic():
-            for _, row in df.iterrows():
-                parent_email = str(row['parent_email']).strip().lower() if pd.notna(row['parent_email']) else None
-                parent_username = str(row['parent_username']).strip() if pd.notna(row['parent_username']) else None
-                student_email = str(row['student_email']).strip().lower() if pd.notna(row['student_email']) else None
-                student_username = str(row['student_username']).strip() if pd.notna(row['student_username']) else None
-
-                parent_phone = row.get('parent_phone')
-                parent_gender = row.get('parent_gender')
-                parent_location = row.get('parent_location')
-
-                student_phone = row.get('student_phone')
-                student_gender = row.get('student_gender')
-                student_location = row.get('student_location')
-
-                school_name = row.get('school_name')
-                campus_name = row.get('campus_name')
-
-                class_name = str(row.get('class_name')).strip() if pd.notna(row.get('class_name')) else None
-                academic_year = row.get('academic_year')
-
-                # Fetch the class ID using the class name
-                if class_name:
-                    class_obj = Class.objects.filter(name=class_name).first()
-                    if not class_obj:
-                        skipped_users.append({
-                            "student": {"email": student_email, "username": student_username},
-                            "reason": f"Class '{class_name}' does not exist"
-                        })
-                        continue  # Skip if class not found
-                    class_id = class_obj.id
-                else:
-                    class_id = None
-
-                # Fetch the academic year object
-                if academic_year:
-                    academic_year_obj = AcademicYear.objects.filter(start_year=academic_year).first()
-                    if not academic_year_obj:
-                        skipped_users.append({
-                            "student": {"email": student_email, "username": student_username},
-                            "reason": f"Academic year '{academic_year}' does not exist"
-                        })
-                        continue  # Skip if academic year not found
-                else:
-                    academic_year_obj = None
-
-                # Check if users already exist
-                existing_parent = User.objects.filter(email=parent_email).first() or User.objects.filter(username=parent_username).first()
-                existing_student = User.objects.filter(email=student_email).first() or User.objects.filter(username=student_username).first()
-
-                if existing_parent and existing_student:
-                    skipped_users.append({
-                        "parent": {"email": parent_email, "username": parent_username},
-                        "student": {"email": student_email, "username": student_username},
-                        "reason": "Both parent and student already exist"
-                    })
-                    continue  # Skip this pair
-
-                # Generate a default password for both users
-                default_password = get_random_string(8)
-
-                # CREATE PARENT USER (if not exists)
-                if not existing_parent:
-                    parent = User.objects.create(
-                        email=parent_email if parent_email else None,
-                        username=parent_username,
-                        phone=parent_phone,
-                        gender=parent_gender,
-                        location=parent_location,
-                        passcode=default_password,
-                        password=make_password(default_password),
-                        school=school_name,
-                        campus=campus_name
-                    )
-                    parent_role, _ = Role.objects.get_or_create(name="Parent")
-                    parent.roles.add(parent_role)
-                else:
-                    parent = existing_parent
-
-                # CREATE STUDENT USER (if not exists)
-                if not existing_student:
-                    student = User.objects.create(
-                        email=student_email if student_email else None,
-                        username=student_username,
-                        phone=student_phone,
-                        gender=student_gender,
-                        location=student_location,
-                        passcode=default_password,
-                        password=make_password(default_password),
-                        school=school_name,
-                        campus=campus_name
-                    )
-                    student_role, _ = Role.objects.get_or_create(name="Student")
-                    student.roles.add(student_role)
-                else:
-                    student = existing_student
-
-                # HANDLE CLASS ENROLLMENT (Only for new students)
-                if not existing_student and class_id:
-                    current_enrollment = ClassEnrollment.objects.filter(student=student, status='existing').first()
-
-                    if current_enrollment:
-                        # Move previous class enrollment to history
-                        HistoricalClassEnrollment.objects.create(
-                            student=student,
-                            class_enrolled=current_enrollment.class_id,
-                            academic_year=current_enrollment.academic_year,
-                        )
-                        current_enrollment.status = 'promoted'
-                        current_enrollment.save()
-
-                    # Enroll student in the new class
-                    ClassEnrollment.objects.create(
-                        student=student,
-                        class_id=class_obj,
-                        academic_year=academic_year_obj,
-                        status='existing'
-                    )
-
-                # CREATE STUDENT-PARENT RELATIONSHIP
-                student_parent_relation, created = StudentParentRelation.objects.get_or_create(
-                    student=student, parent=parent
-                )
-
-                if created:
-                    relationships_created.append(StudentParentRelationSerializer(student_parent_relation).data)
-
-                # SEND EMAILS (if email exists)
-                    # if not existing_parent and parent_email:
-                    #     send_mail(
-                    #         "Welcome to Our School Platform",
-                    #         f"Hello {parent.username},\n\n"
-                    #         f"Your account has been created successfully.\n"
-                    #         f"Login Email: {parent.email}\n"
-                    #         f"Temporary Password: {default_password}\n\n"
-                    #         "Please change your password after logging in.",
-                    #         settings.DEFAULT_FROM_EMAIL,
-                    #         [parent.email],
-                    #         fail_silently=True,
-                    #     )
-
-                    # if not existing_student and student_email:
-                    #     send_mail(
-                    #         "Welcome to Our School Platform",
-                    #         f"Hello {student.username},\n\n"
-                    #         f"Your account has been created successfully.\n"
-                    #         f"Login Email: {student.email}\n"
-                    #         f"Temporary Password: {default_password}\n\n"
-                    #         "Please change your password after logging in.",
-                    #         settings.DEFAULT_FROM_EMAIL,
-                    #         [student.email],
-                    #         fail_silently=True,
-                    #     )
 
-                # Store created users for response
-                created_users.append({
-                    "parent": UserSerializer(parent).data,
-                    "student": UserSerializer(student).data
-                })
+        # Only the header row is read here, the rows are imported in the background
+        try:
+            with SpreadsheetReader(file, file.name, STUDENT_PARENT_COLUMNS):
+                pass
+        except SpreadsheetError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response(
-            {
-                "message": "Bulk registration completed",
-                "users_created": created_users,
-                "users_skipped": skipped_users,
-                "relationships_created": relationships_created,
-            },
-            status=status.HTTP_201_CREATED,
-        )
+        file.seek(0)
+        job = enqueue_import_job(ImportJob.STUDENT_PARENTS, file, request.user)
+        return import_job_accepted(request, job)
 
     except Exception as e:
+        logger.exception(f"Bulk student/parent upload by {request.user} failed")
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
@@ -949,10 +720,10 @@ def search(request):
     query = request.GET.get('q', '')
     print(f"Query: {query}")  # Debugging line
     if query:
-        user_results = User.objects.filter(
+        user_results = serializable_users(User.objects.filter(
             Q(username__icontains=query) |
             Q(email__icontains=query)
-        )
+        ))
         student_results = Student.objects.filter(
             Q(username__icontains=query)
         )